@@ -640,6 +640,14 @@ def _render_multi_repo_results(multi_data: dict) -> None:
                 fws = repo.get("frameworks", [])
                 if fws:
                     st.caption("Frameworks: " + ", ".join(fws[:5]))
+                if multi_data.get("format") == "jsonl" and "offset" in repo:
+                    # Streamed scan: the full report is one line of the JSONL file
+                    if st.button("Load full report", key=f"load_report_{repo.get('repo_url')}"):
+                        from step_1_analyze import read_streamed_report
+                        try:
+                            st.json(read_streamed_report(Path(multi_data["reports_file"]), repo))
+                        except (OSError, ValueError, KeyError) as e:
+                            st.error(f"Could not read report: {e}")
 
     with st.expander("📄 Full Multi-Repo Report JSON"):
         st.json(multi_data)
@@ -772,7 +780,8 @@ def render_analyze():
                 cols = st.columns(min(len(children), 4) or 1)
                 for i, (name, node) in enumerate(list(children.items())[:12]):
                     icon = "📁" if node.get("type") == "dir" else "📄"
-                    cols[i % len(cols)].markdown(f"{icon} **{name}**")
+                    count = f" ({node['files']} files)" if "files" in node and node.get("type") == "dir" else ""
+                    cols[i % len(cols)].markdown(f"{icon} **{name}**{count}")
 
             with tab3:
                 code_index = analysis.get("code_index", {})
@@ -806,14 +815,28 @@ def render_analyze():
                         return
                     children = node.get("children", {})
                     for name, child in list(children.items())[:30]:
-                        icon = "📁" if child.get("type") == "dir" else "📄"
-                        st.text(f"{prefix}{icon} {name}")
                         if child.get("type") == "dir":
+                            count = f"  ({child['files']} files)" if "files" in child else ""
+                            st.text(f"{prefix}📁 {name}{count}")
                             render_tree(child, prefix + "  ", max_depth, current_depth + 1)
+                        else:
+                            st.text(f"{prefix}📄 {name}")
+                    hidden = max(len(children) - 30, 0) + node.get("truncated", 0)
+                    if hidden:
+                        st.text(f"{prefix}… {hidden} more")
 
                 render_tree(analysis.get("directory_tree", {}))
 
             with tab5:
+                phases = analysis.get("metrics", {}).get("phases", [])
+                if phases:
+                    with st.expander("⏱️ Phase timings"):
+                        st.table([
+                            {"phase": p["name"], "wall (s)": round(p["wall_s"], 3),
+                             "cpu (s)": round(p["cpu_s"], 3), "files": p["files"],
+                             "bytes": p["bytes"], "peak RSS (MB)": p.get("peak_rss_mb")}
+                            for p in phases
+                        ])
                 st.json(analysis)
 
     # ════════════════════════════════════════════════════════════════════════════
@@ -848,6 +871,12 @@ def render_analyze():
                     value=False,
                     help="By default each repo is deleted after analysis to save disk space.",
                 )
+                stream_reports = st.checkbox(
+                    "Stream per-repo reports (JSONL)",
+                    value=False,
+                    help="Write each repo's full report to a .jsonl file as it finishes; "
+                         "the output file keeps only summaries. Recommended for large scans.",
+                )
             with col_r:
                 multi_out = st.text_input(
                     "Output file",
@@ -864,6 +893,8 @@ def render_analyze():
                         args += ["--project-keys"] + keys
                 if keep_clones:
                     args.append("--no-cleanup")
+                if stream_reports:
+                    args += ["--multi-format", "jsonl"]
                 if multi_out.strip():
                     args += ["--multi-output", multi_out.strip()]
                 if config.get("workspace_dir"):
@@ -0,0 +1,1278 @@
+#!/usr/bin/env python3
+"""
+bench_analyze.py — Micro-benchmarks for the analysis pipeline.
+
+Each sub-command builds its own synthetic input, times the current
+implementation against the approach it replaced, checks both produce the same
+answer and prints a small results table (optionally saved as JSON).
+
+    python bench_analyze.py line-index --lines 20000 50000
+    python bench_analyze.py git-metadata --repos . ../other-repo
+    python bench_analyze.py catalog-memory --files 100000 1000000
+    python bench_analyze.py mmap-scan --mb 2 20
+    python bench_analyze.py scanner-fuzz --chars 10000 1000000
+    python bench_analyze.py keyword-match --keywords 20 50 150 300
+    python bench_analyze.py ignore-match --paths 100000
+    python bench_analyze.py detect --files 100000 500000
+    python bench_analyze.py synthetic-repo --files 2000 --json-out baseline.json
+    python bench_analyze.py map-score --files 2000
+    python bench_analyze.py map-rank --files 2000 --top-k 30 300
+    python bench_analyze.py name-score --elements 10000 100000
+    python bench_analyze.py synthetic-repo --files 2000 --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+try:
+    import pathspec
+    HAS_PATHSPEC = True
+except ImportError:
+    HAS_PATHSPEC = False
+
+
+# ── Helpers ─────────────────────────────────────────────────────────────────────
+
+def best_of(fn, repeat: int = 3) -> float:
+    """Return the fastest wall time of `repeat` calls to fn()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_table(title: str, rows: list) -> None:
+    print(f"\n{title}")
+    if not rows:
+        return
+    headers = list(rows[0].keys())
+    widths = [max(len(str(h)), *(len(str(r[h])) for r in rows)) for h in headers]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in rows:
+        print("  ".join(str(r[h]).ljust(w) for h, w in zip(headers, widths)))
+
+
+# ── Synthetic sources ───────────────────────────────────────────────────────────
+
+def synthetic_java(n_lines: int) -> str:
+    """A large generated Java controller: one annotated method per ~4 lines."""
+    out = ["package com.example.generated;", "", "@RestController",
+           "public class GeneratedController {"]
+    i = 0
+    while len(out) < n_lines - 1:
+        out.append(f'    @GetMapping("/generated/{i}")')
+        out.append(f"    public String handler{i}(String arg) {{")
+        out.append(f"        return service.call{i}(arg);")
+        out.append("    }")
+        i += 1
+    out.append("}")
+    return "\n".join(out)
+
+
+def synthetic_ts(n_lines: int) -> str:
+    """A large generated TypeScript module of classes, functions and routes."""
+    out = []
+    i = 0
+    while len(out) < n_lines:
+        out.append(f"export class Model{i} {{ id: string }}")
+        out.append(f"function build{i}(a) {{ return a; }}")
+        out.append(f"router.get('/model/{i}', handler{i});")
+        i += 1
+    return "\n".join(out[:n_lines])
+
+
+# The regex indexers step_1 used before its token scanners, kept as the
+# baseline for line-index and scanner-fuzz
+LEGACY_JAVA_PATTERNS = {
+    "classes": re.compile(r"(?:public\s+)?(?:abstract\s+)?(?:final\s+)?(?:class|interface|enum)\s+(\w+)"),
+    "methods": re.compile(r"(?:public|protected|private|static|final|synchronized|\s)+\s+\w[\w<>,\[\]]*\s+(\w+)\s*\("),
+    "endpoints": re.compile(r'@(?:RequestMapping|GetMapping|PostMapping|PutMapping|DeleteMapping|PatchMapping)\s*\(\s*(?:value\s*=\s*)?["\']([^"\']+)["\']'),
+    "entity_classes": re.compile(r"@(?:Entity|Table)[\s\S]{0,200}?class\s+(\w+)"),
+}
+
+LEGACY_JS_TS_PATTERNS = {
+    "classes": re.compile(r"(?:^|\s)class\s+(\w+)"),
+    "functions": re.compile(r"(?:function\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s*)?\(|(\w+)\s*:\s*(?:async\s*)?\()"),
+    "express_routes": re.compile(r'(?:app|router)\.\s*(?:get|post|put|delete|patch|use)\s*\(\s*["\']([^"\']+)["\']'),
+    "interfaces": re.compile(r"(?:^|\s)interface\s+(\w+)"),
+}
+
+
+def synthetic_rel_paths(n_files: int) -> list:
+    """POSIX rel paths of a generated multi-module repository."""
+    layouts = (
+        ("services/svc{m}/src/main/java/com/acme/svc{m}/pkg{p}", "Handler{i}.java"),
+        ("services/svc{m}/src/test/java/com/acme/svc{m}/pkg{p}", "Handler{i}Test.java"),
+        ("web/packages/app{m}/src/components/group{p}", "Widget{i}.tsx"),
+        ("tools/py{m}/lib/mod{p}", "task_{i}.py"),
+        ("docs/section{m}", "page{i}.md"),
+    )
+    rels = []
+    for i in range(n_files):
+        d, name = layouts[i % len(layouts)]
+        rels.append(d.format(m=i % 97, p=i % 13) + "/" + name.format(i=i))
+    return rels
+
+
+# ── line-index ──────────────────────────────────────────────────────────────────
+
+def bench_line_index(args) -> list:
+    """Line-number resolution: LineIndex binary search vs content[:pos].count()."""
+    from step_1_analyze import LineIndex
+
+    def legacy(content, pattern):
+        return [content[:m.start()].count("\n") + 1 for m in pattern.finditer(content)]
+
+    def current(content, pattern):
+        lines = LineIndex(content)
+        return [lines.line_of(m.start()) for m in pattern.finditer(content)]
+
+    rows = []
+    for n_lines in args.lines:
+        for lang, content, pattern in (
+            ("java", synthetic_java(n_lines), LEGACY_JAVA_PATTERNS["endpoints"]),
+            ("ts", synthetic_ts(n_lines), LEGACY_JS_TS_PATTERNS["functions"]),
+        ):
+            if legacy(content, pattern) != current(content, pattern):
+                raise AssertionError(f"line numbers differ for {lang} / {n_lines} lines")
+            t_old = best_of(lambda: legacy(content, pattern), args.repeat)
+            t_new = best_of(lambda: current(content, pattern), args.repeat)
+            rows.append({
+                "file": f"{lang} {n_lines} lines",
+                "size_kb": round(len(content) / 1024),
+                "matches": len(current(content, pattern)),
+                "count_s": round(t_old, 4),
+                "line_index_s": round(t_new, 4),
+                "speedup": f"{t_old / t_new:.1f}x" if t_new else "n/a",
+            })
+    print_table("Line-number resolution (best of %d)" % args.repeat, rows)
+    return rows
+
+
+# ── git-metadata ────────────────────────────────────────────────────────────────
+
+def bench_git_metadata(args) -> list:
+    """get_git_metadata: direct .git reads + one `git log` vs four git subprocesses."""
+    from step_1_analyze import get_git_metadata
+
+    def legacy(repo_path):
+        def run_git(*git_args):
+            r = subprocess.run(["git", "-C", str(repo_path)] + list(git_args),
+                               capture_output=True, text=True, timeout=30)
+            return r.stdout.strip()
+        return {
+            "current_branch": run_git("rev-parse", "--abbrev-ref", "HEAD"),
+            "head_commit": run_git("rev-parse", "HEAD"),
+            "recent_commits": [c for c in run_git("log", "--oneline", "-10").split("\n") if c],
+            "branches": [b.strip().lstrip("* ") for b in run_git("branch", "-a").split("\n")
+                         if b.strip()][:20],
+            "remotes": sorted({line.split()[0] for line in run_git("remote", "-v").split("\n")
+                               if line.strip()}),
+        }
+
+    rows = []
+    for repo in args.repos:
+        repo_path = Path(repo).resolve()
+        current = get_git_metadata(repo_path)
+        current["remotes"] = sorted(current["remotes"])
+        if legacy(repo_path) != current:
+            raise AssertionError(f"git metadata differs for {repo_path}")
+        t_old = best_of(lambda: legacy(repo_path), args.repeat)
+        t_new = best_of(lambda: get_git_metadata(repo_path), args.repeat)
+        rows.append({
+            "repo": repo_path.name,
+            "branches": len(current["branches"]),
+            "four_calls_ms": round(t_old * 1000, 1),
+            "batched_ms": round(t_new * 1000, 1),
+            "speedup": f"{t_old / t_new:.1f}x" if t_new else "n/a",
+        })
+    print_table("Git metadata collection (best of %d)" % args.repeat, rows)
+    return rows
+
+
+# ── catalog-memory ──────────────────────────────────────────────────────────────
+
+def _peak_rss_kb() -> int:
+    # VmHWM belongs to this process image; ru_maxrss can carry the parent's
+    # peak over fork + exec on Linux
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def catalog_memory_child(impl: str, n_files: int) -> None:
+    """
+    Run in a fresh interpreter: build one catalog of `n_files` synthetic paths
+    plus what the detectors derive from it, then print peak RSS as JSON.
+    """
+    import step_1_analyze as s1
+    rels = synthetic_rel_paths(n_files) if impl != "none" else []
+    repo_path = Path("/synthetic-repo")
+    if impl == "legacy":
+        # One object per file with an absolute Path and parts tuple, and the
+        # whole-path sets/dicts the detectors used to build
+        class Entry:
+            __slots__ = ("path", "rel", "name", "suffix", "parts", "size")
+
+            def __init__(self, path, rel, size):
+                self.path, self.rel, self.size = path, rel, size
+                self.parts = tuple(rel.split("/"))
+                self.name = self.parts[-1]
+                self.suffix = s1.path_suffix(self.name)
+
+        entries = [Entry(repo_path / rel, rel, 1000 + i) for i, rel in enumerate(rels)]
+        derived = (
+            {e.rel: e for e in entries}, {e.name: e for e in entries},
+            {e.rel for e in entries}, {e.rel.lower() for e in entries},
+            {e.name for e in entries},
+            {part.lower() for e in entries for part in e.parts[:-1]},
+        )
+    elif impl == "table":
+        catalog = s1.FileCatalog(repo_path)
+        for i, rel in enumerate(rels):
+            catalog.add(rel, 1000 + i)
+        derived = (
+            s1.detect_languages(catalog), s1.detect_frameworks(catalog),
+            s1.detect_architecture(catalog), s1.detect_tests(catalog),
+            s1.build_dir_tree(catalog),
+        )
+    del rels
+    print(json.dumps({"peak_rss_kb": _peak_rss_kb()}))
+
+
+def bench_catalog_memory(args) -> list:
+    """Peak RSS of the file catalog: compact column table vs one object per file."""
+    here = str(Path(__file__).resolve().parent)
+
+    def measure(impl, n_files):
+        code = f"import bench_analyze; bench_analyze.catalog_memory_child({impl!r}, {n_files})"
+        r = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True,
+                           text=True, check=True, env={**os.environ, "PYTHONPATH": here})
+        return json.loads(r.stdout.strip().splitlines()[-1])
+
+    base = measure("none", 0)["peak_rss_kb"]
+    rows = []
+    for n_files in args.files:
+        old, new = measure("legacy", n_files), measure("table", n_files)
+        old_mb = (old["peak_rss_kb"] - base) / 1024
+        new_mb = (new["peak_rss_kb"] - base) / 1024
+        rows.append({
+            "files": n_files,
+            "objects_mb": round(old_mb, 1),
+            "table_mb": round(new_mb, 1),
+            "saved": f"{1 - new_mb / old_mb:.0%}" if old_mb > 0 else "n/a",
+        })
+    print_table(f"File catalog peak RSS above interpreter baseline ({base // 1024} MB)", rows)
+    return rows
+
+
+# ── mmap-scan ───────────────────────────────────────────────────────────────────
+
+def mmap_index_child(path: str, impl: str) -> None:
+    """
+    Run in a fresh interpreter: index one file read + decoded ("decode") or
+    through FileReader.source ("mmap"), then print peak RSS as JSON. Mapped
+    pages the scan touches count towards RSS, unlike tracemalloc figures.
+    """
+    import step_1_analyze
+    from step_1_analyze import FileReader, index_java_file, index_js_ts_file
+    fp = Path(path)
+    indexer = index_java_file if fp.suffix == ".java" else index_js_ts_file
+    index = {"classes": [], "functions": [], "api_endpoints": [], "db_entities": [],
+             "interfaces": []}
+    if impl == "decode":
+        indexer(fp, fp.read_bytes().decode("utf-8", errors="replace"), fp.name, index)
+    elif impl == "mmap":
+        step_1_analyze.MMAP_MIN_BYTES = 0
+        with FileReader().source(fp) as content:
+            indexer(fp, content, fp.name, index)
+    print(json.dumps({"peak_rss_kb": _peak_rss_kb()}))
+
+
+def bench_mmap_scan(args) -> list:
+    """
+    Indexing one large file: mmap + byte scan vs read + decode + str scan.
+
+    The mmap side is forced (MMAP_MIN_BYTES = 0) whatever the file size, so
+    the table shows where the threshold should sit.
+    """
+    import step_1_analyze
+    from step_1_analyze import FileReader, index_java_file, index_js_ts_file
+
+    step_1_analyze.MMAP_MIN_BYTES = 0
+
+    def legacy(fp, indexer):
+        index = {"classes": [], "functions": [], "api_endpoints": [],
+                 "db_entities": [], "interfaces": []}
+        indexer(fp, fp.read_bytes().decode("utf-8", errors="replace"), fp.name, index)
+        return index
+
+    def current(fp, indexer):
+        index = {"classes": [], "functions": [], "api_endpoints": [],
+                 "db_entities": [], "interfaces": []}
+        with FileReader().source(fp) as content:
+            indexer(fp, content, fp.name, index)
+        return index
+
+    here = str(Path(__file__).resolve().parent)
+
+    def peak_rss_kb(fp, impl):
+        code = f"import bench_analyze; bench_analyze.mmap_index_child({str(fp)!r}, {impl!r})"
+        r = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True,
+                           text=True, check=True, env={**os.environ, "PYTHONPATH": here})
+        return json.loads(r.stdout.strip().splitlines()[-1])["peak_rss_kb"]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        base = None
+        for mb in args.mb:
+            n_lines = mb * 1024 ** 2 // 32  # ~32 bytes per generated line
+            for lang, text, indexer in (
+                ("java", synthetic_java(n_lines), index_java_file),
+                ("ts", synthetic_ts(n_lines), index_js_ts_file),
+            ):
+                fp = Path(tmp) / f"Big{mb}.{lang}"
+                fp.write_text(text, encoding="utf-8")
+                del text
+                if legacy(fp, indexer) != current(fp, indexer):
+                    raise AssertionError(f"index differs for {fp.name}")
+                t_old = best_of(lambda: legacy(fp, indexer), args.repeat)
+                t_new = best_of(lambda: current(fp, indexer), args.repeat)
+                if base is None:
+                    base = peak_rss_kb(fp, "none")
+                rows.append({
+                    "file": fp.name,
+                    "size_mb": round(fp.stat().st_size / 1024 ** 2, 1),
+                    "decode_s": round(t_old, 3),
+                    "mmap_s": round(t_new, 3),
+                    "decode_rss_mb": round((peak_rss_kb(fp, "decode") - base) / 1024, 1),
+                    "mmap_rss_mb": round((peak_rss_kb(fp, "mmap") - base) / 1024, 1),
+                })
+    print_table(f"Large-file indexing (best of {args.repeat}; *_rss_mb = peak RSS above the "
+                f"interpreter baseline, mapped pages included)", rows)
+    return rows
+
+
+# ── scanner-fuzz ────────────────────────────────────────────────────────────────
+
+def adversarial_sources(n_chars: int) -> list:
+    """(case, language, text) inputs of about n_chars built to hurt backtracking regexes."""
+    def fill(unit, tail=""):
+        return unit * max(1, (n_chars - len(tail)) // len(unit)) + tail
+
+    return [
+        ("java modifier run", "java", fill("public ")),
+        ("java spaces", "java", " " * n_chars + "x"),
+        ("java @Entity, no class", "java", fill("@Entity ")),
+        ("java open comment", "java", "/*" + fill("class A { void m() {} } ")),
+        ("java starry comment", "java", "/*" + fill("* ")),
+        ("java open string", "java", fill('@GetMapping("/x') + "\n"),
+        ("java generics run", "java", fill("Map<List<", "x(")),
+        ("ts long word, no colon", "ts", fill("a")),
+        ("ts word-space run", "ts", fill("a ") + ":"),
+        ("ts open template", "ts", "`" + fill("function f() {} ")),
+        ("ts escaped string", "ts", "'" + fill("\\'")),
+        ("ts minified line", "ts", fill("var a=function(b){return b};const c=(d)=>d;")),
+        ("ts paren run", "ts", "const x = " + fill("(")),
+    ]
+
+
+def random_token_soup(rng: random.Random, n_tokens: int) -> str:
+    """Random mix of keywords, punctuation and quote/comment openers."""
+    vocab = ["class", "interface", "enum", "record", "function", "const", "=", "=>", "(", ")",
+             "{", "}", "[", "]", "<", ">", "@", "@Entity", "@GetMapping(", "app", ".", "get",
+             '"', "'", "`", "/*", "*/", "//", "\n", ";", ",", ":", "*", "async", "x", "Foo",
+             '"/p"', "\\", "\0", "é",
+             # Non-ASCII digits and letters: \d and \w match them in str, not in bytes
+             "٣", "１", "数据１", "=١;", "(１)", "名前"]
+    return " ".join(rng.choice(vocab) for _ in range(n_tokens))
+
+
+# Sources that once raised in the scanners (KeyError on a non-ASCII digit)
+SCANNER_REGRESSIONS = [
+    ("java", "int x = ٣;"),
+    ("ts", "const a = １;"),
+    ("ts", "const 数据１ = 1;"),
+    ("java", "class A { int f() { return ١٢; } }"),
+]
+
+
+def bench_scanner_fuzz(args) -> list:
+    """Token scanners vs the legacy regexes on adversarial inputs, plus a random-soup fuzz."""
+    from step_1_analyze import scan_java, scan_js_ts
+
+    scanners = {"java": scan_java, "ts": scan_js_ts}
+    legacy_patterns = {"java": LEGACY_JAVA_PATTERNS, "ts": LEGACY_JS_TS_PATTERNS}
+
+    def legacy(lang, text):
+        for pattern in legacy_patterns[lang].values():
+            for _ in pattern.finditer(text):
+                pass
+
+    rows = []
+    failures = []
+    for case, _, _ in adversarial_sources(1):
+        row = {"case": case}
+        for n_chars in args.legacy_chars:
+            _, lang, text = next(s for s in adversarial_sources(n_chars) if s[0] == case)
+            row[f"regex_{n_chars}_s"] = round(best_of(lambda: legacy(lang, text), 1), 3)
+        times = []
+        for n_chars in args.chars:
+            _, lang, text = next(s for s in adversarial_sources(n_chars) if s[0] == case)
+            scan = scanners[lang]
+            for data in (text, text.encode("utf-8")):
+                if scan(data) != scan(text):
+                    failures.append(f"{case}: str and bytes scans differ at {n_chars} chars")
+            times.append(best_of(lambda: scan(text), args.repeat))
+            row[f"scan_{n_chars}_s"] = round(times[-1], 3)
+        # Linear scaling: time per char between the two largest sizes stays within
+        # 3x; runs under 20 ms are floored, as fixed costs and timer noise dominate
+        growth = (times[-1] / args.chars[-1]) / (max(times[-2], 0.02) / args.chars[-2]) \
+            if len(times) > 1 else 1.0
+        row["per_char_growth"] = f"{growth:.2f}x"
+        if growth > 3:
+            failures.append(f"{case}: scan time per char grew {growth:.1f}x")
+        rows.append(row)
+    print_table("Adversarial inputs (regex = legacy patterns, single run; scan = best of %d)"
+                % args.repeat, rows)
+
+    # Ordinary code, for the cost of the scanners next to the regexes they replaced
+    normal_rows = []
+    for lang, source in (("java", synthetic_java), ("ts", synthetic_ts)):
+        text = source(args.normal_lines)
+        regex_s = best_of(lambda: legacy(lang, text), args.repeat)
+        scan_s = best_of(lambda: scanners[lang](text), args.repeat)
+        normal_rows.append({"lang": lang, "lines": args.normal_lines,
+                            "regex_s": round(regex_s, 3), "scan_s": round(scan_s, 3),
+                            "ratio": f"{regex_s / scan_s:.2f}x"})
+    print_table("Ordinary generated code (best of %d)" % args.repeat, normal_rows)
+
+    # Inputs that once crashed a scanner: each must scan, str and bytes alike
+    for lang, text in SCANNER_REGRESSIONS:
+        scan = scanners[lang]
+        try:
+            if scan(text) != scan(text.encode("utf-8")):
+                failures.append(f"regression {text!r} ({lang}): str and bytes scans differ")
+        except Exception as e:
+            failures.append(f"regression {text!r} ({lang}): {type(e).__name__}: {e}")
+
+    rng = random.Random(args.seed)
+    for i in range(args.fuzz):
+        text = random_token_soup(rng, rng.randint(1, 400))
+        for lang, scan in scanners.items():
+            try:
+                result = scan(text)
+                if result != scan(text.encode("utf-8")):
+                    failures.append(f"fuzz #{i} ({lang}): str and bytes scans differ")
+            except Exception as e:
+                failures.append(f"fuzz #{i} ({lang}): {type(e).__name__}: {e}")
+    print(f"\nScanned {len(SCANNER_REGRESSIONS)} regression inputs; fuzzed {args.fuzz} "
+          f"random token soups per language (seed {args.seed}).")
+    for failure in failures:
+        print(f"  [FAIL] {failure}")
+    if failures:
+        args.exit_code = 1
+    else:
+        print("  [OK] no exceptions, str/bytes scans agree, scan time linear in input size")
+    return rows
+
+
+# ── keyword-match ───────────────────────────────────────────────────────────────
+
+def bench_keyword_match(args) -> list:
+    """Keyword counts and per-line hits: one KeywordMatcher pass vs one search per keyword."""
+    import step_3_map
+    from step_1_analyze import LineIndex
+    from step_3_map import KeywordMatcher
+
+    def legacy(text, keywords):
+        counts = [text.count(kw) for kw in keywords]
+        lines = LineIndex(text)
+        n_lines = len(lines)
+        line_hits = {}
+        for kw in keywords:
+            pos = text.find(kw)
+            while pos != -1:
+                line = lines.line_of(pos)
+                line_hits.setdefault(line, set()).add(kw)
+                if line >= n_lines:
+                    break
+                pos = text.find(kw, lines.line_start(line + 1))
+        return counts, line_hits
+
+    def current(text, matcher):
+        lines = LineIndex(text)
+        line_hits = {}
+        for start, i in matcher.hits(text):
+            line_hits.setdefault(lines.line_of(start), set()).add(matcher.keywords[i])
+        return matcher.counts(text), line_hits
+
+    text = (synthetic_java(4000) + "\n" + synthetic_ts(2000)).lower()
+    vocabulary = sorted({w.lower() for w in re.findall(r"[A-Za-z]{3,}", text)})
+    # Requirement keywords: mostly absent words plus a few that occur
+    rng = random.Random(0)
+    absent = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+              for _ in range(max(args.keywords))]
+    backend = "aho-corasick" if step_3_map.HAS_AHOCORASICK else "trie regex"
+    threshold = step_3_map.AUTOMATON_MIN_KEYWORDS[backend]
+    rows = []
+    for n_keywords in args.keywords:
+        keywords = list(dict.fromkeys(vocabulary[:max(1, n_keywords // 10)]
+                                      + absent[:n_keywords]))[:n_keywords]
+        t_build = best_of(lambda: KeywordMatcher(keywords), args.repeat)
+        matcher = KeywordMatcher(keywords)  # built once per requirement, reused per file
+        if legacy(text, keywords) != current(text, matcher):
+            raise AssertionError(f"keyword hits differ for {n_keywords} keywords")
+        t_old = best_of(lambda: legacy(text, keywords), args.repeat)
+        t_new = best_of(lambda: current(text, matcher), args.repeat)
+        rows.append({
+            "keywords": n_keywords,
+            "text_kb": round(len(text) / 1024),
+            "per_keyword_s": round(t_old, 4),
+            "matcher_s": round(t_new, 4),
+            "matcher_build_s": round(t_build, 4),
+            "backend": matcher.backend,
+            "speedup": f"{t_old / t_new:.1f}x" if t_new else "n/a",
+        })
+    print_table(f"Keyword counts + line hits ({backend} from {threshold} keywords, "
+                f"best of {args.repeat})", rows)
+    return rows
+
+
+# ── detect ──────────────────────────────────────────────────────────────────────
+
+def bench_detect(args) -> list:
+    """detect_architecture / detect_tests: segment index + one glob alternation vs loops."""
+    from step_1_analyze import (ARCH_PATTERNS, TEST_FRAMEWORKS, FileCatalog,
+                                detect_architecture, detect_tests)
+
+    # The detectors as they were: a substring scan of every segment per signal,
+    # and one regex per glob re-run against every file name
+    def legacy_architecture(catalog):
+        path_parts = catalog.path_parts_lower
+        found = []
+        for pattern, signals in ARCH_PATTERNS.items():
+            for sig in signals:
+                sig_l = sig.lower().rstrip("/").rstrip("\\")
+                if sig_l in catalog.dir_parts_lower or any(sig_l in p for p in path_parts):
+                    found.append(pattern)
+                    break
+        service_dirs = [d for d in catalog.dir_parts_lower if any(
+            d.endswith(x) for x in ["-service", "-api", "-gateway", "service", "microservice"])]
+        if len(service_dirs) >= 3 and "Microservices" not in found:
+            found.append("Microservices")
+        return list(dict.fromkeys(found)) if found else ["Monolith"]
+
+    def legacy_test_frameworks(catalog):
+        found = {}
+        for fw, patterns in TEST_FRAMEWORKS.items():
+            for pat in patterns:
+                if pat.endswith("/"):
+                    if pat.rstrip("/").lower() in catalog.path_parts_lower:
+                        found[fw] = pat.rstrip("/")
+                        break
+                else:
+                    for fn in catalog.names:
+                        if re.match(pat.replace("*", ".*").replace(".", "\\."), fn):
+                            found[fw] = pat
+                            break
+        return found
+
+    def fresh(rels):
+        # Derived sets are cached per catalog; time each run on a new one
+        catalog = FileCatalog(Path("/synthetic-repo"))
+        for rel in rels:
+            catalog.add(rel, 1)
+        return catalog
+
+    rows = []
+    for n_files in args.files:
+        rels = synthetic_rel_paths(n_files)
+        if legacy_architecture(fresh(rels)) != detect_architecture(fresh(rels)):
+            raise AssertionError("architecture signals differ")
+        if legacy_test_frameworks(fresh(rels)) != detect_tests(fresh(rels))["frameworks"]:
+            raise AssertionError("test frameworks differ")
+        catalogs = [fresh(rels) for _ in range(2 * args.repeat)]
+        t_old = best_of(lambda: (legacy_architecture(catalogs[-1]),
+                                 legacy_test_frameworks(catalogs.pop())), args.repeat)
+        t_new = best_of(lambda: (detect_architecture(catalogs[-1]),
+                                 detect_tests(catalogs.pop())), args.repeat)
+        rows.append({
+            "files": n_files,
+            "loops_s": round(t_old, 3),
+            "indexed_s": round(t_new, 3),
+            "speedup": f"{t_old / t_new:.1f}x" if t_new else "n/a",
+        })
+    print_table("Architecture + test detection (best of %d)" % args.repeat, rows)
+    return rows
+
+
+# ── ignore-match ────────────────────────────────────────────────────────────────
+
+IGNORE_TREE_RULES = {
+    "": "*.log\n/dist/\ncoverage/\n*.tmp\n!keep.tmp\n",
+    "pkg{p}": "generated/\n*.snap\n",
+    "pkg{p}/mod{m}": "/local-*.json\n",
+}
+
+
+def make_ignore_tree(root: Path, n_paths: int) -> int:
+    """A tree of ~n_paths empty files with nested .gitignore files; returns the count."""
+    names = ("Main.java", "util.py", "index.ts", "run.log", "cache.tmp", "keep.tmp",
+             "view.snap", "local-dev.json", "config.json", "README.md")
+    created = 0
+    p = 0
+    while created < n_paths:
+        for m in range(10):
+            base = root / f"pkg{p}" / f"mod{m}"
+            for sub in ("src", "src/impl", "generated", "dist", "coverage"):
+                d = base / sub
+                d.mkdir(parents=True, exist_ok=True)
+                for name in names:
+                    (d / name).touch()
+                created += len(names)
+            (base / ".gitignore").write_text(IGNORE_TREE_RULES["pkg{p}/mod{m}"])
+        (root / f"pkg{p}" / ".gitignore").write_text(IGNORE_TREE_RULES["pkg{p}"])
+        p += 1
+    (root / ".gitignore").write_text(IGNORE_TREE_RULES[""])
+    return created
+
+
+def bench_ignore_match(args) -> list:
+    """IgnoreEngine (nested .gitignores, cached directory verdicts) vs should_skip."""
+    from step_1_analyze import SKIP_DIRS, IgnoreEngine, git_walk_rels, to_posix_rel
+
+    # The walker as it was: every path part against SKIP_DIRS, then the root
+    # .gitignore only, one pathspec match per path
+    def load_spec(repo):
+        gitignore = repo / ".gitignore"
+        if not HAS_PATHSPEC or not gitignore.exists():
+            return None
+        with open(gitignore, encoding="utf-8", errors="ignore") as f:
+            return pathspec.PathSpec.from_lines("gitwildmatch", f)
+
+    def should_skip(path, base, spec):
+        for part in path.relative_to(base).parts:
+            if part in SKIP_DIRS:
+                return True
+        return bool(spec) and spec.match_file(to_posix_rel(path, base))
+
+    def legacy_walk(repo):
+        spec = load_spec(repo)
+        out = []
+        for root, dirs, files in os.walk(repo):
+            root_path = Path(root)
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS
+                       and not should_skip(root_path / d, repo, spec)]
+            out.extend(root_path / f for f in files if not should_skip(root_path / f, repo, spec))
+        return out
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / "tree"
+        n_paths = make_ignore_tree(repo, args.paths)
+        subprocess.run(["git", "init", "-q", str(repo)], check=True)
+        expected = set(git_walk_rels(repo, {}))
+        if set(IgnoreEngine(repo).walk()) != expected:
+            raise AssertionError("IgnoreEngine disagrees with git ls-files --exclude-standard")
+
+        rels = [to_posix_rel(Path(r) / f, repo) for r, _, files in os.walk(repo)
+                if ".git" not in Path(r).relative_to(repo).parts for f in files]
+        paths = [repo / rel for rel in rels]
+        spec = load_spec(repo)
+
+        def engine_match():
+            engine = IgnoreEngine(repo)
+            return [engine.is_ignored(rel) for rel in rels]
+
+        t_old = best_of(lambda: [should_skip(fp, repo, spec) for fp in paths], args.repeat)
+        t_new = best_of(engine_match, args.repeat)
+        rows.append({"bench": f"match {len(rels)} paths", "should_skip_s": round(t_old, 3),
+                     "engine_s": round(t_new, 3), "speedup": f"{t_old / t_new:.1f}x",
+                     "kept_old": sum(not should_skip(fp, repo, spec) for fp in paths),
+                     "kept_new": len(expected)})
+
+        t_old = best_of(lambda: legacy_walk(repo), args.repeat)
+        t_new = best_of(lambda: list(IgnoreEngine(repo).walk()), args.repeat)
+        rows.append({"bench": f"walk {n_paths}-file tree", "should_skip_s": round(t_old, 3),
+                     "engine_s": round(t_new, 3), "speedup": f"{t_old / t_new:.1f}x",
+                     "kept_old": len(legacy_walk(repo)), "kept_new": len(expected)})
+    note = "" if HAS_PATHSPEC else " — pathspec not installed, should_skip checks SKIP_DIRS only"
+    print_table(f"Ignore matching (best of {args.repeat}; kept_new == git ls-files){note}", rows)
+    return rows
+
+
+# ── synthetic-repo ──────────────────────────────────────────────────────────────
+
+SYNTHETIC_GITIGNORE = """\
+*.log
+.env.local
+dist/
+coverage/
+third_party/
+"""
+
+
+def _java_source(svc: str, i: int, n_lines: int) -> str:
+    out = [f"package com.acme.{svc};", "", "import org.springframework.web.bind.annotation.*;", ""]
+    if i % 5 == 0:
+        out += ["@Entity", f'@Table(name = "{svc}_record_{i}")',
+                f"public class Record{i} {{", "    private Long id;"]
+    else:
+        out += ["@RestController", f'@RequestMapping("/{svc}/r{i}")',
+                f"public class Resource{i}Controller {{"]
+    m = 0
+    while len(out) < n_lines - 1:
+        out += [f'    @GetMapping("/item{m}")',
+                f"    public String getItem{m}(@PathVariable String id) {{",
+                f"        return service{i}.lookup{m}(id);", "    }", ""]
+        m += 1
+    out.append("}")
+    return "\n".join(out) + "\n"
+
+
+def _python_source(mod: str, i: int, n_lines: int) -> str:
+    out = ["from flask import Blueprint, jsonify", "",
+           f'bp = Blueprint("{mod}_{i}", __name__)', ""]
+    m = 0
+    while len(out) < n_lines:
+        out += [f'@bp.route("/{mod}/v{i}/item{m}")', f"def item_{i}_{m}():",
+                f'    return jsonify(id={m}, name="{mod}")', "", ""]
+        if m % 4 == 3:
+            out += [f"class Model{i}x{m}:", "    pass", "", ""]
+        m += 1
+    return "\n".join(out) + "\n"
+
+
+def _ts_source(area: str, i: int, n_lines: int) -> str:
+    out = ["import { Router } from 'express';", "", "const router = Router();", "",
+           f"export interface Payload{i} {{ id: string; total: number }}", ""]
+    m = 0
+    while len(out) < n_lines - 1:
+        out += [f"router.get('/{area}/r{i}/item{m}', handle{i}x{m});",
+                f"function handle{i}x{m}(req, res) {{ return res.json({{ id: {m} }}); }}",
+                f"export class Service{i}x{m} {{ run(): number {{ return {m}; }} }}", ""]
+        m += 1
+    out.append("export default router;")
+    return "\n".join(out) + "\n"
+
+
+def synthetic_repo_files(n_files: int, mix: dict, n_lines: int) -> list:
+    """
+    (rel_path, text) for a multi-stack repository: Java/Spring services,
+    a Python/Flask app and a TS/Express web tier, in proportions `mix`, plus
+    their build/config files, tests and a tracked vendor/ directory.
+    """
+    files = [(".gitignore", SYNTHETIC_GITIGNORE),
+             ("README.md", "# Synthetic benchmark repository\n")]
+    total = sum(mix.values()) or 1
+    counts = {stack: round(n_files * share / total) for stack, share in mix.items()}
+
+    for i in range(counts.get("java", 0)):
+        svc = f"svc{i % 8}"
+        if i < 8:
+            files.append((f"services/{svc}-service/pom.xml",
+                          "<project><artifactId>spring-boot-starter-web</artifactId></project>\n"))
+            files.append((f"services/{svc}-service/src/main/resources/application.yml",
+                          f"server:\n  port: {8080 + i}\n"))
+        layer = ("controller", "service", "repository", "domain")[i % 4]
+        if i % 7 == 6:
+            files.append((f"services/{svc}-service/src/test/java/com/acme/{svc}/Resource{i}Test.java",
+                          _java_source(svc, i, n_lines)))
+        else:
+            files.append((f"services/{svc}-service/src/main/java/com/acme/{svc}/{layer}/Resource{i}.java",
+                          _java_source(svc, i, n_lines)))
+
+    if counts.get("python"):
+        files += [("flaskapp/app.py", "from flask import Flask\napp = Flask(__name__)\n"),
+                  ("flaskapp/requirements.txt", "flask\npytest\n"),
+                  ("flaskapp/.env", "DATABASE_URL=sqlite://\nSECRET_KEY=dev\n")]
+    for i in range(counts.get("python", 0)):
+        mod = f"mod{i % 6}"
+        if i % 7 == 6:
+            files.append((f"flaskapp/tests/test_{mod}_{i}.py", _python_source(mod, i, n_lines)))
+        else:
+            files.append((f"flaskapp/views/{mod}/view_{i}.py", _python_source(mod, i, n_lines)))
+
+    if counts.get("ts"):
+        files += [("web/package.json", '{"dependencies": {"express": "^4.18.0"}}\n'),
+                  ("web/tsconfig.json", '{"compilerOptions": {"strict": true}}\n')]
+    for i in range(counts.get("ts", 0)):
+        area = f"area{i % 6}"
+        if i % 7 == 6:
+            files.append((f"web/src/routes/{area}/r{i}.spec.ts", _ts_source(area, i, n_lines)))
+        elif i % 11 == 10:
+            files.append((f"web/vendor/lib{i}.js", _ts_source(area, i, n_lines)))
+        else:
+            files.append((f"web/src/routes/{area}/r{i}.ts", _ts_source(area, i, n_lines)))
+    return files
+
+
+def _git(cwd: Path, *git_args) -> None:
+    subprocess.run(["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com",
+                    "-c", "init.defaultBranch=main", *git_args],
+                   cwd=str(cwd), check=True, capture_output=True)
+
+
+def make_synthetic_repo(root: Path, n_files: int, mix: dict, n_lines: int) -> Path:
+    """
+    Generate the repository under root: commit it, publish it to a local bare
+    repo (root/origin.git) and return a fresh clone of that bare repo, with
+    ignored build output and a node_modules tree added to its work tree.
+    """
+    seed = root / "seed"
+    for rel, text in synthetic_repo_files(n_files, mix, n_lines):
+        fp = seed / rel
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fp.write_text(text, encoding="utf-8")
+    _git(seed, "init", "-q")
+    _git(seed, "add", "-A")
+    _git(seed, "commit", "-q", "-m", "synthetic")
+    bare = root / "origin.git"
+    _git(root, "clone", "-q", "--bare", str(seed), str(bare))
+    shutil.rmtree(seed)
+    work = root / "work"
+    _git(root, "clone", "-q", bare.as_uri(), str(work))
+
+    # Ignored / vendored content that analysis has to skip
+    noise = [f"dist/bundle{i}.js" for i in range(20)]
+    noise += [f"third_party/lib{i}/src/Lib{i}.java" for i in range(20)]
+    noise += [f"web/node_modules/pkg{i}/index.js" for i in range(max(n_files // 10, 20))]
+    noise += ["logs/server.log", "flaskapp/.env.local"]
+    for rel in noise:
+        fp = work / rel
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fp.write_text(_ts_source("vendored", 0, 20), encoding="utf-8")
+    return work
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        stack, _, share = part.partition("=")
+        if stack.strip() not in ("java", "python", "ts"):
+            raise argparse.ArgumentTypeError(f"unknown stack in --mix: {stack!r}")
+        mix[stack.strip()] = float(share or 1)
+    return mix
+
+
+def compare_to_baseline(rows: list, baseline: dict, tolerance: float) -> list:
+    """Rows slower (files/sec) or hungrier (peak memory) than baseline beyond tolerance."""
+    previous = {(r["target"], r["files"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for row in rows:
+        old = previous.get((row["target"], row["files"]))
+        if old is None:
+            continue
+        if row["files_per_s"] < old["files_per_s"] * (1 - tolerance):
+            regressions.append(f"{row['target']}: {row['files_per_s']} files/s "
+                               f"(baseline {old['files_per_s']})")
+        if row["peak_mb"] > old["peak_mb"] * (1 + tolerance) + 1:
+            regressions.append(f"{row['target']}: {row['peak_mb']} MB peak "
+                               f"(baseline {old['peak_mb']})")
+    return regressions
+
+
+def bench_synthetic_repo(args) -> list:
+    """analyze(), walk_files and build_code_index on a generated multi-stack repository."""
+    from step_1_analyze import FileCatalog, analyze, build_code_index, walk_files
+
+    def peak_alloc_mb(fn):
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return round(peak / 1024 ** 2, 1)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = make_synthetic_repo(Path(tmp), args.files, args.mix, args.lines)
+        catalog = FileCatalog.scan(repo)
+        indexed = [e for e in catalog if e.suffix in (".java", ".py", ".js", ".ts")]
+        walked = list(walk_files(repo))
+        targets = (
+            ("walk_files", lambda: sum(1 for _ in walk_files(repo)),
+             len(walked), sum(fp.stat().st_size for fp in walked)),
+            ("build_code_index", lambda: build_code_index(catalog, jobs=args.jobs),
+             len(indexed), sum(e.size for e in indexed)),
+            ("analyze", lambda: analyze(repo, [], jobs=args.jobs),
+             len(catalog), sum(max(e.size, 0) for e in catalog)),
+        )
+        for name, fn, n_files, n_bytes in targets:
+            seconds = best_of(fn, args.repeat)
+            rows.append({
+                "target": name,
+                "files": n_files,
+                "mb": round(n_bytes / 1024 ** 2, 2),
+                "seconds": round(seconds, 3),
+                "files_per_s": round(n_files / seconds) if seconds else 0,
+                "mb_per_s": round(n_bytes / 1024 ** 2 / seconds, 2) if seconds else 0,
+                "peak_mb": peak_alloc_mb(fn),
+            })
+        catalog.close()
+    print_table(f"Synthetic repo, {args.files} source files (best of {args.repeat}; "
+                f"peak_mb = traced Python allocations)", rows)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(rows, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n[FAIL] {len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  - {line}")
+            args.exit_code = 1
+        else:
+            print(f"\n[OK] Within {args.tolerance:.0%} of {args.baseline}")
+    return rows
+
+
+# ── map-score ───────────────────────────────────────────────────────────────────
+
+# Requirement scored against the synthetic repository by map-score
+SYNTHETIC_REQUIREMENT = {
+    "ticket_id": "BENCH-1",
+    "summary": "Record lookup returns a stale item from the resource controller",
+    "description": "The payload router and the service lookup should refresh the record "
+                   "item cache; jsonify the model and the blueprint route response.",
+    "acceptance_criteria": "Resource controller lookups return the current record.",
+    "labels": ["records"],
+}
+
+
+def bench_map_score(args) -> list:
+    """Step 3 content scoring: token-index postings and BM25 vs reading every file and counting."""
+    import step_3_map
+    from step_1_analyze import FileCatalog, TokenIndex
+    from step_3_map import (CONTENT_EXTENSIONS, extract_keywords, score_bm25,
+                            score_file_content, score_token_postings)
+
+    keywords = extract_keywords(SYNTHETIC_REQUIREMENT)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = make_synthetic_repo(Path(tmp), args.files, args.mix, args.lines)
+        catalog = FileCatalog.scan(repo)
+        sidecar = Path(tmp) / "report.tokens.json"
+
+        def build():
+            index = TokenIndex.build(catalog)
+            index.save(sidecar)
+            return index
+
+        def legacy():
+            scores = {}
+            for entry in catalog:
+                if entry.suffix in CONTENT_EXTENSIONS:
+                    content = catalog.read(entry, max_bytes=100_000)
+                    score = score_file_content(entry.rel, content, keywords) if content else 0
+                    if score > 0:
+                        scores[entry.rel] = score
+            return scores
+
+        t_build = best_of(build, 1)
+        sidecar_mb = sidecar.stat().st_size / 1024 ** 2
+        index = TokenIndex.load(sidecar)
+        def bm25(use_numpy):
+            saved, step_3_map.HAS_NUMPY = step_3_map.HAS_NUMPY, use_numpy
+            try:
+                return score_bm25(index, keywords)
+            finally:
+                step_3_map.HAS_NUMPY = saved
+
+        targets = [
+            ("read + str.count", legacy),
+            ("load sidecar + postings", lambda: score_token_postings(TokenIndex.load(sidecar),
+                                                                      keywords)),
+            ("postings (index in memory)", lambda: score_token_postings(index, keywords)),
+            ("bm25, pure Python", lambda: bm25(False)),
+        ]
+        if step_3_map.HAS_NUMPY:
+            targets.append(("bm25, numpy", lambda: bm25(True)))
+        for target, fn in targets:
+            seconds = best_of(fn, args.repeat)
+            scores = fn()
+            rows.append({
+                "target": target,
+                "seconds": round(seconds, 4),
+                "files_scored": len(scores),
+            })
+        if step_3_map.HAS_NUMPY:
+            pure, vectorised = bm25(False), bm25(True)
+            if pure.keys() != vectorised.keys() or any(
+                    abs(pure[f] - vectorised[f]) > 1e-9 for f in pure):
+                raise AssertionError("numpy and pure-Python BM25 scores differ")
+        catalog.close()
+    base = rows[0]["seconds"]
+    for row in rows:
+        row["speedup"] = f"{base / row['seconds']:.0f}x" if row["seconds"] else "n/a"
+    print_table(f"Step 3 content scoring, {args.files} source files, {len(keywords)} keywords "
+                f"(best of {args.repeat}; token index built in {t_build:.2f}s, "
+                f"{sidecar_mb:.1f} MB sidecar)", rows)
+    return rows
+
+
+def big_ranked_source(n_bytes: int) -> str:
+    """
+    A keyword-dense Java file of about n_bytes whose densest cluster is at its
+    end, so clusters over a truncated read would miss it.
+    """
+    line = "    // record lookup for the resource item\n"
+    tail = "    // record item lookup: resource controller payload router jsonify model\n"
+    return "class BigRecords {\n" + line * (n_bytes // len(line)) + tail * 5 + "}\n"
+
+
+def bench_map_rank(args) -> list:
+    """score_files without a token index: candidate text cache vs reading the ranked files again."""
+    import step_3_map
+    from step_1_analyze import FileCatalog
+    from step_3_map import CONTENT_MAX_BYTES, extract_keywords, score_files
+
+    keywords = extract_keywords(SYNTHETIC_REQUIREMENT)
+    report = {"code_index": {}}
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = make_synthetic_repo(Path(tmp), args.files, args.mix, args.lines)
+        # Files past the scoring read: their clusters must still cover the whole file
+        big = [e for e in FileCatalog.scan(repo) if e.suffix == ".java"][:args.big_files]
+        big_text = big_ranked_source(3 * CONTENT_MAX_BYTES)
+        for entry in big:
+            entry.path.write_text(big_text, encoding="utf-8")
+        tail_line = big_text.count("\n") - 5
+        cache_class = step_3_map.CandidateCache
+
+        def rank(top_k, cached):
+            catalog = FileCatalog.scan(repo)
+            step_3_map.CandidateCache = cache_class if cached else (lambda size: cache_class(0))
+            try:
+                results = score_files(report, keywords, repo, catalog=catalog, top_k=top_k)
+            finally:
+                step_3_map.CandidateCache = cache_class
+            return results, catalog.bytes_read
+
+        for top_k in args.top_k:
+            (reread, reread_bytes), (cached, cached_bytes) = rank(top_k, False), rank(top_k, True)
+            if reread != cached:
+                raise AssertionError(f"ranked files differ for top-k {top_k}")
+            for result in cached:
+                if result["file"] in {e.rel for e in big} and not any(
+                        loc["end_line"] >= tail_line for loc in result["keyword_locations"]):
+                    raise AssertionError(f"clusters of {result['file']} miss the end of the file")
+            t_reread = best_of(lambda: rank(top_k, False), args.repeat)
+            t_cached = best_of(lambda: rank(top_k, True), args.repeat)
+            rows.append({
+                "top_k": top_k,
+                "reread_s": round(t_reread, 4),
+                "cached_s": round(t_cached, 4),
+                "reread_kb": round(reread_bytes / 1024),
+                "cached_kb": round(cached_bytes / 1024),
+                "speedup": f"{t_reread / t_cached:.2f}x" if t_cached else "n/a",
+            })
+    print_table(f"score_files, substring fallback, {args.files} source files, {len(big)} over "
+                f"{CONTENT_MAX_BYTES // 1000} KB (best of {args.repeat}; "
+                f"kb = bytes read from the catalog)", rows)
+    return rows
+
+
+# ── name-score ──────────────────────────────────────────────────────────────────
+
+NAME_WORDS = ["record", "item", "order", "user", "account", "payload", "route", "service",
+              "lookup", "cache", "model", "resource", "controller", "invoice", "ledger",
+              "session", "token", "report", "batch", "event", "profile", "address"]
+NAME_VERBS = ["get", "set", "find", "load", "save", "build", "handle", "update", "delete",
+              "create", "parse", "render", "validate", "refresh"]
+
+
+def synthetic_code_index(n_elements: int, seed: int = 0) -> dict:
+    """A step 1 code index with camelCase, PascalCase, snake_case and route names."""
+    rng = random.Random(seed)
+    index = {"classes": [], "functions": [], "api_endpoints": [], "db_entities": [],
+             "interfaces": []}
+    for i in range(n_elements):
+        words = [w.capitalize() for w in rng.sample(NAME_WORDS, rng.randint(1, 3))]
+        kind = rng.random()
+        if kind < 0.2:
+            index["classes"].append({"name": "".join(words) + rng.choice(["", "Impl", "Dto"]),
+                                     "file": f"src/C{i % 500}.java", "line": 1})
+        elif kind < 0.75:
+            name = rng.choice(NAME_VERBS) + "".join(words)
+            if rng.random() < 0.3:
+                name = "_".join(w.lower() for w in [rng.choice(NAME_VERBS)] + words)
+            index["functions"].append({"name": name, "file": f"src/C{i % 500}.java",
+                                       "line": 1 + i % 300})
+        elif kind < 0.85:
+            index["api_endpoints"].append({"path": "/api/" + "/".join(w.lower() for w in words),
+                                           "file": f"src/R{i % 50}.java"})
+        elif kind < 0.95:
+            index["db_entities"].append({"name": "".join(words) + "Entity",
+                                         "file": f"src/E{i % 200}.java"})
+        else:
+            index["interfaces"].append({"name": "I" + "".join(words),
+                                        "file": f"src/I{i % 100}.ts"})
+    return index
+
+
+def bench_name_score(args) -> list:
+    """Step 3 element scoring: NameIndex candidates vs score_element over every element."""
+    from step_1_analyze import add_name_parts, sorted_name_parts
+    from step_3_map import ELEMENT_TYPES, NameIndex, extract_keywords, score_element
+
+    keywords = extract_keywords(SYNTHETIC_REQUIREMENT)
+    rows = []
+    for n_elements in args.elements:
+        code_index = synthetic_code_index(n_elements)
+
+        def legacy():
+            hits = []
+            for element_type in ELEMENT_TYPES:
+                for element in code_index[element_type]:
+                    name = element.get("name") or element.get("path", "")
+                    score = score_element(name, keywords)
+                    if score > 0:
+                        hits.append((element_type, element, score))
+            return hits
+
+        def name_parts():
+            sorted_name_parts.cache_clear()
+            add_name_parts(code_index)
+
+        t_parts = best_of(name_parts, 1)
+        name_index = NameIndex(code_index)
+        if legacy() != name_index.scored_elements(keywords):
+            raise AssertionError(f"element scores differ for {n_elements} elements")
+        t_old = best_of(legacy, args.repeat)
+        t_build = best_of(lambda: NameIndex(code_index), args.repeat)
+        t_score = best_of(lambda: name_index.scored_elements(keywords), args.repeat)
+        rows.append({
+            "elements": n_elements,
+            "names": len(name_index.names),
+            "matched": len(name_index.scored_elements(keywords)),
+            "score_element_s": round(t_old, 4),
+            "step1_parts_s": round(t_parts, 4),
+            "index_build_s": round(t_build, 4),
+            "index_score_s": round(t_score, 4),
+            "speedup": f"{t_old / (t_build + t_score):.1f}x",
+        })
+    print_table(f"Element scoring, {len(keywords)} keywords (best of {args.repeat}; "
+                f"speedup counts index build + score, name parts cached at step 1 index time)", rows)
+    return rows
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for step_1 / step_3 analysis")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    parser.add_argument("--json-out", help="Also write the results table to this JSON file")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("line-index", help="Line-number resolution in the regex indexers")
+    p.add_argument("--lines", type=int, nargs="+", default=[5_000, 20_000, 50_000],
+                   help="Synthetic file sizes, in lines")
+    p.set_defaults(func=bench_line_index)
+
+    p = sub.add_parser("git-metadata", help="Batched get_git_metadata vs four git calls")
+    p.add_argument("--repos", nargs="+", default=["."], help="Git work trees to measure")
+    p.set_defaults(func=bench_git_metadata)
+
+    p = sub.add_parser("catalog-memory", help="Peak RSS of the compact file catalog")
+    p.add_argument("--files", type=int, nargs="+", default=[100_000, 1_000_000],
+                   help="Synthetic repository sizes, in files")
+    p.set_defaults(func=bench_catalog_memory)
+
+    p = sub.add_parser("mmap-scan", help="mmap + byte patterns vs decoding large files")
+    p.add_argument("--mb", type=int, nargs="+", default=[2, 20], help="Synthetic file sizes, in MB")
+    p.set_defaults(func=bench_mmap_scan)
+
+    p = sub.add_parser("scanner-fuzz",
+                       help="Java / JS-TS token scanners vs legacy regexes on adversarial input")
+    p.add_argument("--chars", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                   help="Adversarial input sizes for the scanners, in characters")
+    p.add_argument("--legacy-chars", type=int, nargs="+", default=[200, 400, 800],
+                   help="Input sizes for the legacy regexes (they are super-linear; keep small)")
+    p.add_argument("--normal-lines", type=int, default=100_000,
+                   help="Lines of ordinary generated code to time scanners and regexes on")
+    p.add_argument("--fuzz", type=int, default=500, help="Random token soups to scan per language")
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the fuzz inputs")
+    p.set_defaults(func=bench_scanner_fuzz)
+
+    p = sub.add_parser("keyword-match", help="Step 3 multi-keyword matcher vs per-keyword search")
+    p.add_argument("--keywords", type=int, nargs="+", default=[20, 50, 150, 300],
+                   help="Requirement keyword counts")
+    p.set_defaults(func=bench_keyword_match)
+
+    p = sub.add_parser("detect", help="Index-backed architecture / test detection vs loops")
+    p.add_argument("--files", type=int, nargs="+", default=[100_000, 500_000],
+                   help="Synthetic repository sizes, in files")
+    p.set_defaults(func=bench_detect)
+
+    p = sub.add_parser("ignore-match", help="Nested-.gitignore IgnoreEngine vs should_skip")
+    p.add_argument("--paths", type=int, default=100_000, help="Files in the generated tree")
+    p.set_defaults(func=bench_ignore_match)
+
+    p = sub.add_parser("synthetic-repo",
+                       help="analyze / walk_files / build_code_index on a generated repository")
+    p.add_argument("--files", type=int, default=2000, help="Source files to generate")
+    p.add_argument("--mix", type=parse_mix, default=parse_mix("java=0.4,python=0.3,ts=0.3"),
+                   help="Language mix, e.g. java=0.4,python=0.3,ts=0.3")
+    p.add_argument("--lines", type=int, default=80, help="Lines per generated source file")
+    p.add_argument("--jobs", type=int, default=1, help="Index workers passed to the pipeline")
+    p.add_argument("--baseline", help="Results JSON (from --json-out) to compare against")
+    p.add_argument("--tolerance", type=float, default=0.2,
+                   help="Allowed throughput drop / memory growth vs the baseline (default 0.2)")
+    p.set_defaults(func=bench_synthetic_repo)
+
+    p = sub.add_parser("map-score", help="Step 3 content scoring from the token index vs reads")
+    p.add_argument("--files", type=int, default=2000, help="Source files to generate")
+    p.add_argument("--mix", type=parse_mix, default=parse_mix("java=0.4,python=0.3,ts=0.3"),
+                   help="Language mix, e.g. java=0.4,python=0.3,ts=0.3")
+    p.add_argument("--lines", type=int, default=80, help="Lines per generated source file")
+    p.set_defaults(func=bench_map_score)
+
+    p = sub.add_parser("map-rank", help="Step 3 top-K ranking: cached candidate text vs re-reads")
+    p.add_argument("--files", type=int, default=2000, help="Source files to generate")
+    p.add_argument("--mix", type=parse_mix, default=parse_mix("java=0.4,python=0.3,ts=0.3"),
+                   help="Language mix, e.g. java=0.4,python=0.3,ts=0.3")
+    p.add_argument("--lines", type=int, default=80, help="Lines per generated source file")
+    p.add_argument("--top-k", type=int, nargs="+", default=[30, 300],
+                   help="Ranked files to return")
+    p.add_argument("--big-files", type=int, default=5,
+                   help="Generated Java files to grow past the 100 KB content-scoring read")
+    p.set_defaults(func=bench_map_rank)
+
+    p = sub.add_parser("name-score", help="Step 3 element scoring: NameIndex vs every element")
+    p.add_argument("--elements", type=int, nargs="+", default=[10_000, 100_000],
+                   help="Synthetic code index sizes, in elements")
+    p.set_defaults(func=bench_name_score)
+
+    args = parser.parse_args()
+    rows = args.func(args)
+
+    if args.json_out:
+        out = Path(args.json_out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"bench": args.bench, "results": rows}, f, indent=2)
+        print(f"\n[OK] Results saved to {out}")
+    return getattr(args, "exit_code", 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
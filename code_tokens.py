@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+code_tokens.py — Word and name tokenization shared by step 1 and step 3.
+
+Step 1 builds its token index with the same rules step 3 uses to extract
+keywords and score files, so both import them from here rather than from
+each other:
+
+  * a raw word is a run of letters/digits starting with a letter
+    (WORD_RE); it contributes itself, lowercased, plus its camelCase parts
+    (word_tokens), keeping only parts of 3+ characters that are not
+    STOP_WORDS;
+  * a code element's name splits into its lowercased whole, camelCase and
+    snake_case parts of 3+ characters (get_name_parts);
+  * CONTENT_EXTENSIONS are the source and config files whose contents are
+    tokenized.
+"""
+import re
+
+
+STOP_WORDS = {
+    "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for",
+    "of", "with", "by", "from", "as", "is", "was", "are", "were", "be",
+    "been", "being", "have", "has", "had", "do", "does", "did", "will",
+    "would", "could", "should", "may", "might", "must", "shall", "can",
+    "not", "no", "nor", "so", "yet", "both", "either", "neither", "each",
+    "few", "more", "most", "other", "some", "such", "than", "too", "very",
+    "just", "this", "that", "these", "those", "it", "its", "their", "they",
+    "we", "you", "he", "she", "him", "her", "his", "our", "your", "my",
+    "any", "all", "one", "two", "new", "also", "when", "where", "how",
+    "what", "which", "who", "need", "update", "add", "use", "get", "set",
+    "null", "true", "false", "return", "if", "else", "then", "fix", "bug",
+    "change", "test", "run", "make", "into", "up", "out", "over",
+}
+
+CONTENT_EXTENSIONS = {
+    ".java", ".py", ".js", ".jsx", ".ts", ".tsx",
+    ".xml", ".yml", ".yaml", ".json", ".properties",
+}
+
+
+def split_camel_case(text: str) -> list:
+    """Split camelCase and PascalCase into individual words."""
+    words = re.sub(r"([A-Z][a-z]+)", r" \1", text)
+    words = re.sub(r"([A-Z]+)(?=[A-Z][a-z])", r"\1 ", words)
+    return [w.lower() for w in words.split() if w]
+
+
+def split_snake_case(text: str) -> list:
+    """Split snake_case and kebab-case into words."""
+    return [w.lower() for w in re.split(r"[_\-\s]+", text) if w]
+
+
+# Raw words: split on whitespace and punctuation (underscores included)
+WORD_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9]*")
+
+
+def get_name_parts(name: str) -> list:
+    """Get all meaningful parts of a code element name."""
+    parts = set()
+    parts.add(name.lower())
+    parts.update(split_camel_case(name))
+    parts.update(split_snake_case(name))
+    return [p for p in parts if len(p) >= 3]
+
+
+def word_tokens(word: str) -> list:
+    """Tokens one raw word contributes: itself, lowercased, plus its camelCase parts."""
+    lw = word.lower()
+    if len(lw) < 3 or lw in STOP_WORDS:
+        return []
+    tokens = [lw]
+    for part in split_camel_case(word):
+        if len(part) >= 3 and part not in STOP_WORDS and part not in tokens:
+            tokens.append(part)
+    return tokens
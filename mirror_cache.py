@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+mirror_cache.py — Persistent bare-mirror cache for repository clones.
+
+Keeps one bare mirror per clone URL under a cache directory. A mirror is
+refreshed with `git fetch` instead of being re-cloned, and checkouts are cheap:
+
+  * multi-repo analysis checks out a detached `git worktree` of the mirror
+    (no object copy at all) and removes it again after analysis;
+  * clone_or_pull() makes a `git clone --reference <mirror> --dissociate`, so
+    only objects missing from the mirror cross the network and the working
+    clone stays valid even if the mirror is evicted later.
+
+The cache has a size cap; least-recently-used mirrors that have no live
+worktree are evicted when it is exceeded. Credentials are never written to a
+mirror's config: fetches pass the authenticated URL on the command line only.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3  # 20 GB
+INDEX_FILE = "mirrors.json"
+
+
+def repo_name_from_url(repo_url: str) -> str:
+    return repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+
+
+def redact(text: str, secret: str) -> str:
+    """Strip a password/token from git output before it reaches the logs."""
+    return text.replace(secret, "****") if secret else text
+
+
+def dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class MirrorCache:
+    """
+    One bare mirror per clone URL, with LRU eviction above `max_bytes`.
+
+    Safe to share between threads: the index is guarded by one lock and every
+    mirror has its own lock, so two repos can fetch concurrently while the
+    same URL is never fetched twice at once.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES, timeout: int = 600):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._mirror_locks = {}
+        self._pins = Counter()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index = self._load_index()
+
+    # ── Index bookkeeping ────────────────────────────────────────────────────────
+
+    def _load_index(self) -> dict:
+        path = self.root / INDEX_FILE
+        if not path.exists():
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        path = self.root / INDEX_FILE
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def key_for(repo_url: str) -> str:
+        return hashlib.sha1(repo_url.rstrip("/").encode("utf-8")).hexdigest()[:16]
+
+    def mirror_path(self, repo_url: str) -> Path:
+        return self.root / f"{repo_name_from_url(repo_url)}-{self.key_for(repo_url)}.git"
+
+    def _mirror_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._mirror_locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def pinned(self, key: str):
+        """Protect a mirror from eviction while a checkout is in progress."""
+        with self._lock:
+            self._pins[key] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins[key] -= 1
+                if self._pins[key] <= 0:
+                    del self._pins[key]
+
+    def _git(self, *args, cwd_git_dir: Path = None, secret: str = "") -> subprocess.CompletedProcess:
+        cmd = ["git"]
+        if cwd_git_dir is not None:
+            cmd += ["--git-dir", str(cwd_git_dir)]
+        r = subprocess.run(cmd + list(args), capture_output=True, text=True,
+                           timeout=self.timeout)
+        r.stdout = redact(r.stdout, secret)
+        r.stderr = redact(r.stderr, secret)
+        return r
+
+    # ── Mirrors ──────────────────────────────────────────────────────────────────
+
+    def ensure(self, repo_url: str, auth_url: str, logs: list, secret: str = "") -> Path:
+        """Create the bare mirror for repo_url, or fetch it if it already exists."""
+        key = self.key_for(repo_url)
+        mirror = self.mirror_path(repo_url)
+        with self._mirror_lock(key):
+            if (mirror / "HEAD").exists():
+                logs.append(f"[MIRROR] Fetching into cached mirror {mirror.name}...")
+                r = self._git("fetch", "--prune", "--quiet", auth_url,
+                              "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*",
+                              cwd_git_dir=mirror, secret=secret)
+                if r.returncode != 0:
+                    logs.append(f"[WARN] Mirror fetch failed: {r.stderr.strip()}")
+                self._git("worktree", "prune", cwd_git_dir=mirror)
+            else:
+                logs.append(f"[MIRROR] Creating bare mirror {mirror.name}...")
+                tmp = mirror.with_name(mirror.name + ".partial")
+                shutil.rmtree(tmp, ignore_errors=True)
+                r = self._git("clone", "--bare", "--quiet", auth_url, str(tmp), secret=secret)
+                if r.returncode != 0:
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    raise RuntimeError(f"Mirror clone failed: {r.stderr.strip()}")
+                # Keep credentials out of the mirror's config
+                self._git("remote", "set-url", "origin", repo_url, cwd_git_dir=tmp)
+                os.replace(tmp, mirror)
+
+            size = dir_size(mirror)
+            with self._lock:
+                self.index[key] = {
+                    "url": repo_url,
+                    "path": mirror.name,
+                    "last_used": time.time(),
+                    "size": size,
+                }
+                self._save_index()
+        self.evict(keep={key}, logs=logs)
+        return mirror
+
+    def resolve_ref(self, mirror: Path, branch: str) -> str:
+        """Return `branch` if the mirror has it, else the mirror's HEAD."""
+        if branch:
+            r = self._git("rev-parse", "--verify", "--quiet", f"refs/heads/{branch}",
+                          cwd_git_dir=mirror)
+            if r.returncode == 0:
+                return f"refs/heads/{branch}"
+        return "HEAD"
+
+    @staticmethod
+    def in_use(mirror: Path) -> bool:
+        """A mirror with registered worktrees must not be evicted."""
+        wt = mirror / "worktrees"
+        return wt.is_dir() and any(wt.iterdir())
+
+    def total_size(self) -> int:
+        with self._lock:
+            return sum(e.get("size", 0) for e in self.index.values())
+
+    def evict(self, keep: set = (), logs: list = None) -> list:
+        """Remove least-recently-used mirrors until the cache fits max_bytes."""
+        evicted = []
+        with self._lock:
+            total = sum(e.get("size", 0) for e in self.index.values())
+            for key, entry in sorted(self.index.items(), key=lambda kv: kv[1].get("last_used", 0)):
+                if total <= self.max_bytes:
+                    break
+                mirror = self.root / entry["path"]
+                lock = self._mirror_locks.get(key)
+                if (key in keep or key in self._pins or self.in_use(mirror)
+                        or (lock is not None and lock.locked())):
+                    continue
+                shutil.rmtree(mirror, ignore_errors=True)
+                total -= entry.get("size", 0)
+                evicted.append(key)
+                if logs is not None:
+                    logs.append(f"[MIRROR] Evicted {entry['path']} (cache over size cap).")
+            for key in evicted:
+                del self.index[key]
+            if evicted:
+                self._save_index()
+        return evicted
+
+    # ── Checkouts ────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def is_worktree(path: Path) -> bool:
+        """Linked worktrees have a `.git` *file* pointing at the mirror."""
+        return (path / ".git").is_file()
+
+    def add_worktree(self, repo_url: str, auth_url: str, dest: Path, branch: str,
+                     logs: list, secret: str = "") -> Path:
+        """
+        Check out `branch` of the mirror as a detached worktree at `dest`.
+
+        An existing worktree at dest is moved to the fetched tip instead.
+        Returns None if dest is occupied by something other than a worktree.
+        """
+        key = self.key_for(repo_url)
+        with self.pinned(key):
+            mirror = self.ensure(repo_url, auth_url, logs, secret)
+            return self._add_worktree(key, mirror, dest, branch, logs)
+
+    def _add_worktree(self, key: str, mirror: Path, dest: Path, branch: str,
+                      logs: list) -> Path:
+        with self._mirror_lock(key):
+            ref = self.resolve_ref(mirror, branch)
+            if dest.exists():
+                if not self.is_worktree(dest):
+                    logs.append(f"[MIRROR] {dest} is not a mirror worktree; not touching it.")
+                    return None
+                r = self._git("-C", str(dest), "checkout", "--quiet", "--force", "--detach", ref)
+            else:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                r = self._git("worktree", "add", "--quiet", "--force", "--detach", str(dest), ref,
+                              cwd_git_dir=mirror)
+            if r.returncode != 0:
+                raise RuntimeError(f"Worktree checkout failed: {r.stderr.strip()}")
+        logs.append(f"[MIRROR] Checked out {ref} as worktree {dest}")
+        return dest
+
+    def remove_worktree(self, repo_url: str, dest: Path, logs: list) -> None:
+        mirror = self.mirror_path(repo_url)
+        with self._mirror_lock(self.key_for(repo_url)):
+            r = self._git("worktree", "remove", "--force", str(dest), cwd_git_dir=mirror)
+            if r.returncode != 0:
+                shutil.rmtree(dest, ignore_errors=True)
+                self._git("worktree", "prune", cwd_git_dir=mirror)
+        logs.append(f"[CLEANUP] Removed worktree: {dest}")
+
+    def reference_clone(self, repo_url: str, auth_url: str, dest: Path, branch: str,
+                        logs: list, secret: str = "") -> Path:
+        """
+        Full working clone at dest that borrows objects from the mirror.
+
+        --dissociate copies the borrowed objects in, so the clone does not
+        break if the mirror is evicted later; only objects missing from the
+        mirror are downloaded.
+        """
+        key = self.key_for(repo_url)
+        with self.pinned(key):
+            mirror = self.ensure(repo_url, auth_url, logs, secret)
+            return self._reference_clone(key, repo_url, auth_url, mirror, dest, branch,
+                                         logs, secret)
+
+    def _reference_clone(self, key: str, repo_url: str, auth_url: str, mirror: Path,
+                         dest: Path, branch: str, logs: list, secret: str) -> Path:
+        with self._mirror_lock(key):
+            args = ["clone", "--quiet", "--reference", str(mirror), "--dissociate"]
+            r = self._git(*args, "--branch", branch, auth_url, str(dest), secret=secret)
+            if r.returncode != 0:
+                shutil.rmtree(dest, ignore_errors=True)
+                r = self._git(*args, auth_url, str(dest), secret=secret)
+            if r.returncode != 0:
+                raise RuntimeError(f"Clone failed: {r.stderr.strip()}")
+        logs.append(f"Cloned {repo_url} into {dest} (objects from mirror cache).")
+        return dest
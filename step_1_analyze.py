@@ -4,19 +4,34 @@ Step 1: Clone & Analyze Repository
 Clones/pulls repo, detects tech stack, builds code index, extracts configs.
 """
 import argparse
+import ast
+import hashlib
 import json
+import mmap
+import multiprocessing
 import os
 import re
 import subprocess
 import sys
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_right
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import cached_property, lru_cache
 from pathlib import Path
+from typing import Optional
+
+from code_tokens import CONTENT_EXTENSIONS, WORD_RE, get_name_parts, word_tokens
 
 try:
-    import pathspec
-    HAS_PATHSPEC = True
-except ImportError:
-    HAS_PATHSPEC = False
+    import resource
+    HAS_RESOURCE = True
+except ImportError:  # Windows
+    HAS_RESOURCE = False
 
 # ── Cross-platform helpers ──────────────────────────────────────────────────────
 
@@ -125,12 +140,95 @@ def build_auth_url(url: str, username: str, password: str) -> str:
     return url
 
 
+def analysis_sparse_patterns() -> list:
+    """
+    Non-cone sparse-checkout patterns for the files analysis actually reads:
+    every LANGUAGE_EXTENSIONS suffix, the config/build/framework/test marker
+    files by name, and .gitignore files; SKIP_DIRS are excluded again.
+    """
+    names = set(CONFIG_FILES) | {".gitignore"}
+    for group in (FRAMEWORK_INDICATORS, BUILD_TOOL_FILES, TEST_FRAMEWORKS):
+        for entries in group.values():
+            names.update(e.split("/")[-1] for e in entries if "*" not in e and not e.endswith("/"))
+    patterns = [f"*{ext}" for ext in sorted(LANGUAGE_EXTENSIONS)]
+    patterns += sorted(names)
+    patterns += [f"!{d}/" for d in sorted(SKIP_DIRS)]
+    return patterns
+
+
+def git_objects_size(repo_path: Path) -> Optional[int]:
+    """
+    Bytes of packed + loose objects in a clone, None if git cannot tell.
+    This is what the clone holds on disk after checkout, not the bytes sent
+    over the network (blobs a checkout fetched lazily are included).
+    """
+    r = subprocess.run(["git", "-C", str(repo_path), "count-objects", "-v"],
+                       capture_output=True, text=True, timeout=60)
+    if r.returncode != 0:
+        return None
+    sizes = dict(line.split(": ", 1) for line in r.stdout.splitlines() if ": " in line)
+    return (int(sizes.get("size", 0)) + int(sizes.get("size-pack", 0))) * 1024
+
+
+def fast_clone(auth_url: str, repo_path: Path, branch: str, logs: list,
+               blob_limit: str = None, sparse: bool = False) -> dict:
+    """
+    Analysis-only clone: tip commit of one branch, no tags.
+
+    blob_limit adds `--filter=blob:limit=<size>` (partial clone); sparse
+    checks out only analysis_sparse_patterns(), so vendored binaries and large
+    assets are neither checked out nor, with a blob filter, downloaded.
+    """
+    args = ["git", "clone", "--depth", "1", "--single-branch", "--no-tags"]
+    if blob_limit:
+        args.append(f"--filter=blob:limit={blob_limit}")
+    if sparse:
+        args.append("--no-checkout")
+    result = subprocess.run(args + ["--branch", branch, auth_url, str(repo_path)],
+                            capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        # Try the remote's default branch
+        result = subprocess.run(args + [auth_url, str(repo_path)],
+                                capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"Clone failed: {result.stderr.strip()}")
+
+    if sparse:
+        patterns = analysis_sparse_patterns()
+        for cmd, stdin in ((["sparse-checkout", "set", "--no-cone", "--stdin"], "\n".join(patterns)),
+                           (["checkout", "--quiet"], None)):
+            result = subprocess.run(["git", "-C", str(repo_path)] + cmd, input=stdin,
+                                    capture_output=True, text=True, timeout=300)
+            if result.returncode != 0:
+                raise RuntimeError(f"Sparse checkout failed: {result.stderr.strip()}")
+        logs.append(f"Sparse checkout: {len(patterns)} analysis patterns.")
+
+    return {
+        "strategy": "fast",
+        "depth": 1,
+        "blob_limit": blob_limit,
+        "sparse": sparse,
+        "objects_bytes": git_objects_size(repo_path),
+    }
+
+
 def clone_or_pull(repo_url: str, username: str, password: str,
-                  workspace: Path, branch: str = "main") -> tuple:
-    """Clone or pull repository. Returns (repo_path, log_lines)."""
+                  workspace: Path, branch: str = "main",
+                  mirror_cache=None, clone_options: dict = None) -> tuple:
+    """
+    Clone or pull repository. Returns (repo_path, log_lines, clone_info).
+
+    With a MirrorCache, new clones borrow objects from the cached bare mirror
+    (`--reference ... --dissociate`) so only missing objects are downloaded.
+    clone_options {"strategy": "full"|"fast", "blob_limit": str, "sparse": bool}
+    selects the analysis-only fast_clone() for new clones; it does not combine
+    with a MirrorCache (the options are ignored with a warning). clone_info
+    records the strategy used and the size of the clone's objects on disk.
+    """
     repo_name = repo_url.rstrip("/").split("/")[-1].replace(".git", "")
     repo_path = workspace / repo_name
     auth_url = build_auth_url(repo_url, username, password)
+    options = clone_options or {}
     logs = []
 
     workspace.mkdir(parents=True, exist_ok=True)
@@ -144,6 +242,23 @@ def clone_or_pull(repo_url: str, username: str, password: str,
         logs.append(result.stdout.strip())
         if result.returncode != 0:
             logs.append(f"[WARN] Pull failed: {result.stderr.strip()}")
+        clone_info = {"strategy": "pull", "objects_bytes": None}
+    elif mirror_cache is not None:
+        if options.get("strategy") == "fast" or options.get("blob_limit") or options.get("sparse"):
+            logs.append("[WARN] Clone options (fast / blob limit / sparse) do not apply to "
+                        "mirror-cache clones; ignoring them.")
+        mirror_cache.reference_clone(repo_url, auth_url, repo_path, branch, logs,
+                                     secret=password)
+        clone_info = {"strategy": "mirror-reference",
+                      "objects_bytes": git_objects_size(repo_path)}
+    elif options.get("strategy") == "fast":
+        logs.append(f"Cloning {repo_url} into {repo_path} (analysis-only: depth 1"
+                    f"{', blob filter ' + options['blob_limit'] if options.get('blob_limit') else ''}"
+                    f"{', sparse' if options.get('sparse') else ''})...")
+        clone_info = fast_clone(auth_url, repo_path, branch, logs,
+                                blob_limit=options.get("blob_limit"),
+                                sparse=bool(options.get("sparse")))
+        logs.append(f"Cloned successfully ({clone_info['objects_bytes'] or 0:,} bytes of objects on disk).")
     else:
         logs.append(f"Cloning {repo_url} into {repo_path}...")
         result = subprocess.run(
@@ -159,128 +274,920 @@ def clone_or_pull(repo_url: str, username: str, password: str,
         if result.returncode != 0:
             raise RuntimeError(f"Clone failed: {result.stderr.strip()}")
         logs.append(result.stdout.strip() or "Cloned successfully.")
+        clone_info = {"strategy": "full", "depth": 50,
+                      "objects_bytes": git_objects_size(repo_path)}
 
-    return repo_path, logs
+    return repo_path, logs, clone_info
 
 
-def get_git_metadata(repo_path: Path) -> dict:
+GIT_METADATA_BRANCHES = 20
+GIT_METADATA_COMMITS = 10
+
+
+def git_dirs(repo_path: Path) -> tuple:
+    """
+    (git_dir, common_dir) of a work tree; (None, None) if it is not one.
+
+    Linked worktrees (e.g. MirrorCache checkouts) have a `.git` *file* that
+    points at their private git dir, whose `commondir` holds refs and config.
+    """
+    dot_git = repo_path / ".git"
+    if dot_git.is_dir():
+        git_dir = dot_git
+    elif dot_git.is_file():
+        content = dot_git.read_text(encoding="utf-8").strip()
+        if not content.startswith("gitdir:"):
+            return None, None
+        git_dir = Path(content[len("gitdir:"):].strip())
+        if not git_dir.is_absolute():
+            git_dir = (repo_path / git_dir).resolve()
+    else:
+        return None, None
+    common_dir = git_dir
+    commondir_file = git_dir / "commondir"
+    if commondir_file.is_file():
+        common_dir = Path(commondir_file.read_text(encoding="utf-8").strip())
+        if not common_dir.is_absolute():
+            common_dir = (git_dir / common_dir).resolve()
+    return git_dir, common_dir
+
+
+def read_git_refs(common_dir: Path, prefixes: tuple = ("refs/heads/", "refs/remotes/")) -> dict:
+    """
+    refname -> SHA (or "ref: <target>" for symbolic refs) for refs under
+    `prefixes`, read from packed-refs and loose ref files; loose refs win.
+    """
+    refs = {}
+    packed = common_dir / "packed-refs"
+    if packed.is_file():
+        for line in packed.read_text(encoding="utf-8", errors="replace").splitlines():
+            if not line or line[0] in "#^":
+                continue
+            sha, _, name = line.partition(" ")
+            if name.startswith(prefixes):
+                refs[name] = sha
+    for prefix in prefixes:
+        for root, _, files in os.walk(common_dir / prefix):
+            for fname in files:
+                if fname.endswith(".lock"):
+                    continue
+                path = Path(root, fname)
+                try:
+                    refs[path.relative_to(common_dir).as_posix()] = (
+                        path.read_text(encoding="utf-8").strip())
+                except OSError:
+                    pass
+    return refs
+
+
+def git_remote_names(common_dir: Path) -> list:
+    """Remote names from the `[remote "<name>"]` sections of the repo config."""
+    try:
+        config = (common_dir / "config").read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return []
+    return list(dict.fromkeys(re.findall(r'^\s*\[remote\s+"([^"]+)"\]', config, re.MULTILINE)))
+
+
+def branch_listing(refs: dict, limit: int = GIT_METADATA_BRANCHES) -> list:
+    """First `limit` entries of `git branch -a`, in its order, from a refs dict."""
+    listing = []
+    for name in sorted(refs):
+        if name.startswith("refs/heads/"):
+            listing.append(name[len("refs/heads/"):])
+        else:
+            entry = "remotes/" + name[len("refs/remotes/"):]
+            target = refs[name]
+            if target.startswith("ref: refs/remotes/"):
+                entry += " -> " + target[len("ref: refs/remotes/"):]
+            listing.append(entry)
+        if len(listing) >= limit:
+            break
+    return listing
+
+
+def _git_metadata_from_git(repo_path: Path, commits: list) -> dict:
+    """Fallback for ref storage read_git_refs() does not understand (e.g. reftable)."""
     def run_git(*args):
         r = subprocess.run(["git", "-C", str(repo_path)] + list(args),
                            capture_output=True, text=True, timeout=30)
         return r.stdout.strip()
 
-    commits_raw = run_git("log", "--oneline", "-10")
-    commits = [c for c in commits_raw.split("\n") if c]
+    head = run_git("rev-parse", "HEAD", "--abbrev-ref", "HEAD").split("\n")
+    refs_raw = run_git("for-each-ref", f"--count={GIT_METADATA_BRANCHES}",
+                       "--format=%(refname) %(symref)", "refs/heads", "refs/remotes")
+    refs = {}
+    for line in refs_raw.split("\n"):
+        name, _, symref = line.partition(" ")
+        if name:
+            refs[name] = f"ref: {symref}" if symref else ""
+    current_branch = head[1] if len(head) > 1 else ""
+    return {
+        "current_branch": current_branch,
+        "head_commit": head[0] if len(head) > 1 else "",
+        "recent_commits": commits,
+        "branches": _with_detached_head(branch_listing(refs), current_branch == "HEAD", commits),
+        "remotes": run_git("remote").split(),
+    }
+
+
+def _with_detached_head(branches: list, detached: bool, commits: list) -> list:
+    """Prepend the `(HEAD detached at <sha>)` entry `git branch -a` shows."""
+    if detached and commits:
+        branches = [f"(HEAD detached at {commits[0].split()[0]})"] + branches
+    return branches[:GIT_METADATA_BRANCHES]
 
-    branches_raw = run_git("branch", "-a")
-    branches = [b.strip().lstrip("* ") for b in branches_raw.split("\n") if b.strip()]
 
-    remotes_raw = run_git("remote", "-v")
-    remotes = list({line.split()[0] for line in remotes_raw.split("\n") if line.strip()})
+def get_git_metadata(repo_path: Path) -> dict:
+    """
+    Branch, HEAD commit, recent commits, branches and remotes of a work tree.
 
-    current_branch = run_git("rev-parse", "--abbrev-ref", "HEAD")
+    HEAD, loose refs, packed-refs and the remote list are read straight from
+    the git directory (worktree `.git` files and `commondir` are followed), so
+    the only subprocess is one `git log` for the recent commits. Branches are
+    listed like `git branch -a`, capped at GIT_METADATA_BRANCHES.
+    """
+    r = subprocess.run(["git", "-C", str(repo_path), "log", "--format=%h %s",
+                        f"-{GIT_METADATA_COMMITS}"],
+                       capture_output=True, text=True, timeout=30)
+    commits = [c for c in r.stdout.strip().split("\n") if c]
+
+    git_dir, common_dir = git_dirs(repo_path)
+    if git_dir is None:
+        return {"current_branch": "", "head_commit": "", "recent_commits": commits,
+                "branches": [], "remotes": []}
+    if (common_dir / "reftable").exists():
+        return _git_metadata_from_git(repo_path, commits)
+
+    refs = read_git_refs(common_dir)
+    head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    if head.startswith("ref: "):
+        head_ref = head[len("ref: "):]
+        current_branch = head_ref[len("refs/heads/"):] if head_ref.startswith("refs/heads/") else head_ref
+        head_commit = refs.get(head_ref, "")
+    else:
+        current_branch = "HEAD"
+        head_commit = head
 
     return {
         "current_branch": current_branch,
+        "head_commit": head_commit,
         "recent_commits": commits,
-        "branches": branches[:20],
-        "remotes": remotes,
+        "branches": _with_detached_head(branch_listing(refs), current_branch == "HEAD", commits),
+        "remotes": git_remote_names(common_dir),
     }
 
 
 # ── File walker ─────────────────────────────────────────────────────────────────
 
-def load_gitignore_spec(repo_path: Path):
-    if not HAS_PATHSPEC:
+def _translate_glob(glob: str) -> str:
+    """gitignore glob (without anchoring / trailing slash) -> regex body."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if c == "*":
+            if glob.startswith("**", i):
+                before = i == 0 or glob[i - 1] == "/"
+                after = i + 2 == n or glob[i + 2] == "/"
+                if before and after:
+                    if i + 2 == n:                   # "a/**": everything inside
+                        out.append(".+" if i else ".*")
+                    else:                            # "**/" or "a/**/b"
+                        out.append("(?:.*/)?")
+                        i += 1                       # swallow the slash
+                    i += 2
+                    continue
+                while i < n and glob[i] == "*":
+                    i += 1
+                out.append("[^/]*")
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and glob[j] in "!^":
+                j += 1
+            if j < n and glob[j] == "]":
+                j += 1
+            while j < n and glob[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1:j]
+                negate = body[:1] in ("!", "^")
+                if negate:
+                    body = body[1:]
+                body = "".join(ch if ch == "-" else re.escape(ch) for ch in body if ch != "/")
+                out.append(f"[{'^/' if negate else ''}{body}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """
+    One compiled .gitignore (or info/exclude): its rules in file order as
+    (regex, negated, dir_only), plus one combined alternation per file/dir
+    kind so the common "nothing matches" case costs a single regex call.
+    Paths are POSIX and relative to the directory holding the file.
+    """
+
+    __slots__ = ("rules", "_any_file", "_any_dir")
+
+    def __init__(self, lines):
+        self.rules = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip("\r")
+            # Trailing spaces are ignored unless escaped
+            while line.endswith(" ") and not line.endswith("\\ "):
+                line = line[:-1]
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            if "/" in line:
+                body = _translate_glob(line.lstrip("/"))
+            else:
+                body = "(?:.*/)?" + _translate_glob(line)
+            self.rules.append((re.compile(f"(?s:{body})\\Z"), negated, dir_only))
+        file_bodies = [r.pattern for r, _, dir_only in self.rules if not dir_only]
+        dir_bodies = [r.pattern for r, _, _ in self.rules]
+        self._any_file = re.compile("|".join(file_bodies)) if file_bodies else None
+        self._any_dir = re.compile("|".join(dir_bodies)) if dir_bodies else None
+
+    @classmethod
+    def from_file(cls, path: Path) -> "IgnoreRules":
+        try:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                rules = cls(f)
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def verdict(self, rel: str, is_dir: bool):
+        """True (ignored), False (re-included by "!") or None (no rule matches)."""
+        combined = self._any_dir if is_dir else self._any_file
+        if combined is None or not combined.match(rel):
+            return None
+        for regex, negated, dir_only in reversed(self.rules):
+            if (is_dir or not dir_only) and regex.match(rel):
+                return not negated
+        return None
+
+
+class IgnoreEngine:
+    """
+    Git-compatible ignore matching for the os.walk walker.
+
+    Every .gitignore in the tree (nested ones included) and .git/info/exclude
+    are compiled once into per-directory IgnoreRules, loaded as the walk
+    reaches each directory. Each directory keeps the chain of matchers that
+    applies to it (deepest .gitignore first, so deeper files override higher
+    ones and the last matching rule within a file wins), and its own
+    ignored/kept verdict is cached — ignored or SKIP_DIRS subtrees are pruned
+    and never descended into, which also means nothing below an ignored
+    directory can be re-included, as in git.
+    """
+
+    def __init__(self, repo_path: Path):
+        self.repo_path = repo_path
+        root_chain = []
+        exclude = IgnoreRules.from_file(repo_path / ".git" / "info" / "exclude")
+        if exclude is not None:
+            root_chain.append(("", exclude))
+        own = IgnoreRules.from_file(repo_path / ".gitignore")
+        if own is not None:
+            root_chain.insert(0, ("", own))
+        self._chains = {"": root_chain}
+        self._verdicts = {"": False}
+
+    def _chain(self, rel_dir: str) -> list:
+        """Matchers for entries of rel_dir, deepest .gitignore first."""
+        chain = self._chains.get(rel_dir)
+        if chain is None:
+            parent = self._chain(rel_dir.rpartition("/")[0])
+            own = IgnoreRules.from_file(self.repo_path / rel_dir / ".gitignore")
+            chain = [(rel_dir + "/", own)] + parent if own is not None else parent
+            self._chains[rel_dir] = chain
+        return chain
+
+    def _matches(self, rel: str, is_dir: bool) -> bool:
+        for prefix, rules in self._chain(rel.rpartition("/")[0]):
+            verdict = rules.verdict(rel[len(prefix):], is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def is_dir_ignored(self, rel_dir: str) -> bool:
+        verdict = self._verdicts.get(rel_dir)
+        if verdict is None:
+            verdict = (rel_dir.rpartition("/")[2] in SKIP_DIRS
+                       or self.is_dir_ignored(rel_dir.rpartition("/")[0])
+                       or self._matches(rel_dir, True))
+            self._verdicts[rel_dir] = verdict
+        return verdict
+
+    def is_ignored(self, rel: str, is_dir: bool = False) -> bool:
+        """Verdict for a POSIX rel path (its parent directories included)."""
+        if is_dir:
+            return self.is_dir_ignored(rel)
+        return self.is_dir_ignored(rel.rpartition("/")[0]) or self._matches(rel, False)
+
+    def walk(self):
+        """Yield POSIX rel paths of the files that are not ignored."""
+        root_len = len(str(self.repo_path)) + 1
+        for root, dirs, files in os.walk(self.repo_path):
+            rel_dir = root[root_len:].replace(os.sep, "/") if len(root) >= root_len else ""
+            prefix = rel_dir + "/" if rel_dir else ""
+            # Prune ignored directories in place; their verdicts are cached
+            kept = []
+            for d in dirs:
+                if d in SKIP_DIRS:
+                    continue
+                rel = prefix + d
+                if not self._matches(rel, True):
+                    self._verdicts[rel] = False
+                    kept.append(d)
+                else:
+                    self._verdicts[rel] = True
+            dirs[:] = kept
+            for name in files:
+                rel = prefix + name
+                if not self._matches(rel, False):
+                    yield rel
+
+
+def walk_rels(repo_path: Path):
+    """POSIX rel paths of the non-ignored files under repo_path (os.walk)."""
+    return IgnoreEngine(repo_path).walk()
+
+
+def walk_files(repo_path: Path):
+    for rel in walk_rels(repo_path):
+        yield repo_path.joinpath(*rel.split("/"))
+
+
+# ── Git-native enumeration ──────────────────────────────────────────────────────
+
+def is_git_repo(repo_path: Path) -> bool:
+    return (repo_path / ".git").exists()
+
+
+def _run_git_bytes(repo_path: Path, *args) -> bytes:
+    """Run git and return raw stdout, or None if git failed or is unavailable."""
+    try:
+        r = subprocess.run(["git", "-C", str(repo_path)] + list(args),
+                           capture_output=True, timeout=300)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return r.stdout if r.returncode == 0 else None
+
+
+def git_list_files(repo_path: Path) -> dict:
+    """
+    Map every tracked rel path to its blob SHA, in git's (sorted) order.
+
+    Uses `git ls-files -s -z` so nested .gitignore files are honoured by git
+    itself. A no-checkout clone has an empty index, so the listing falls back
+    to `git ls-tree -r HEAD`. Submodules (gitlinks) and files outside a sparse
+    checkout (skip-worktree) are left out — in a partial clone their blobs
+    may not even be local. Returns None for non-git paths.
+    """
+    if not is_git_repo(repo_path):
         return None
-    gitignore = repo_path / ".gitignore"
-    if not gitignore.exists():
+    files = {}
+    out = _run_git_bytes(repo_path, "ls-files", "-s", "-t", "-z")
+    if out is None:
         return None
-    with open(gitignore, encoding="utf-8", errors="ignore") as f:
-        return pathspec.PathSpec.from_lines("gitwildmatch", f)
+    for record in out.split(b"\0"):
+        if not record:
+            continue
+        # "<tag> <mode> <sha> <stage>\t<path>"
+        meta, _, path = record.partition(b"\t")
+        tag, mode, sha = meta.split()[:3]
+        if mode != b"160000" and tag != b"S":
+            files[path.decode("utf-8", errors="replace")] = sha.decode("ascii")
+
+    if not files:
+        out = _run_git_bytes(repo_path, "ls-tree", "-r", "-z", "HEAD") or b""
+        for record in out.split(b"\0"):
+            if not record:
+                continue
+            # "<mode> <type> <sha>\t<path>"
+            meta, _, path = record.partition(b"\t")
+            mode, obj_type, sha = meta.split()[:3]
+            if obj_type == b"blob":
+                files[path.decode("utf-8", errors="replace")] = sha.decode("ascii")
+    return files
+
+
+def git_blob_shas(repo_path: Path, tracked: dict = None) -> dict:
+    """
+    Map tracked rel paths to their git blob SHA.
+
+    Files modified in the working tree are left out so readers go to disk and
+    the index cache falls back to size+mtime. Returns {} for non-git paths.
+    """
+    if tracked is None:
+        tracked = git_list_files(repo_path)
+    if not tracked:
+        return {}
+    modified = _run_git_bytes(repo_path, "ls-files", "-m", "-z") or b""
+    dirty = {p.decode("utf-8", errors="replace") for p in modified.split(b"\0") if p}
+    return {rel: sha for rel, sha in tracked.items() if rel not in dirty}
+
+
+def git_walk_rels(repo_path: Path, tracked: dict = None) -> list:
+    """
+    POSIX rel paths of the files git knows about: tracked files plus
+    untracked files that are not ignored (`--others --exclude-standard`).
+    SKIP_DIRS still apply (checked once per directory).
+    """
+    if tracked is None:
+        tracked = git_list_files(repo_path) or {}
+    others = _run_git_bytes(repo_path, "ls-files", "-o", "--exclude-standard", "-z") or b""
+    rels = list(tracked)
+    rels.extend(p.decode("utf-8", errors="replace") for p in others.split(b"\0") if p)
+    skipped = {}
+    kept = []
+    for rel in rels:
+        d = rel.rpartition("/")[0]
+        skip = skipped.get(d)
+        if skip is None:
+            skip = skipped[d] = any(part in SKIP_DIRS for part in d.split("/"))
+        if not skip:
+            kept.append(rel)
+    return kept
+
+
+def git_walk_files(repo_path: Path) -> list:
+    """git_walk_rels() as absolute Paths (the os.walk replacement)."""
+    return [repo_path.joinpath(*rel.split("/")) for rel in git_walk_rels(repo_path)]
+
+
+def enumerate_rels(repo_path: Path, walker: str = "auto") -> tuple:
+    """
+    Return (rel_paths, blob_shas) for `repo_path`.
+
+    walker: "git" uses git_walk_rels, "fs" the os.walk-based walk_files and
+    "auto" picks git whenever the path is a git work tree. blob_shas maps rel
+    paths of clean tracked files to their blob SHA ({} for the fs walker).
+    """
+    if walker != "fs" and is_git_repo(repo_path):
+        tracked = git_list_files(repo_path)
+        if tracked is not None:
+            return git_walk_rels(repo_path, tracked), git_blob_shas(repo_path, tracked)
+    return list(walk_rels(repo_path)), {}
+
 
+def enumerate_files(repo_path: Path, walker: str = "auto") -> tuple:
+    """enumerate_rels() with absolute Paths: (all_files, blob_shas)."""
+    rels, blob_shas = enumerate_rels(repo_path, walker)
+    return [repo_path.joinpath(*rel.split("/")) for rel in rels], blob_shas
 
-def should_skip(path: Path, base: Path, spec) -> bool:
-    for part in path.relative_to(base).parts:
-        if part in SKIP_DIRS:
-            return True
-    if spec:
+
+class FileReader:
+    """Reads file text from the working tree (the default reader)."""
+
+    def read(self, fp: Path, max_bytes: int = 500_000, rel: str = None) -> str:
+        return read_file_safe(fp, max_bytes)
+
+    def load_source(self, fp: Path, rel: str = None):
+        return read_source(fp)
+
+    @contextmanager
+    def source(self, fp: Path, rel: str = None):
+        """
+        Whole-file content for the indexers: str for ordinary files, a
+        read-only mmap (scanned with byte patterns) for files of at least
+        MMAP_MIN_BYTES, None for binary or unreadable files.
+        """
+        content = self.load_source(fp, rel)
+        try:
+            yield content
+        finally:
+            if isinstance(content, mmap.mmap):
+                content.close()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GitBlobReader(FileReader):
+    """
+    Streams file contents from the object store through one long-lived
+    `git cat-file --batch` process, so no working tree is needed (works in a
+    no-checkout clone). Files without a known blob SHA are read from disk.
+    """
+
+    def __init__(self, repo_path: Path, blob_shas: dict):
+        self.repo_path = repo_path
+        self.blob_shas = blob_shas
+        self.proc = None
+
+    def _start(self):
+        self.proc = subprocess.Popen(
+            ["git", "-C", str(self.repo_path), "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    def read_blob(self, sha: str, max_bytes: int = 500_000) -> bytes:
+        if self.proc is None:
+            self._start()
+        self.proc.stdin.write(sha.encode("ascii") + b"\n")
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().split()
+        # "<sha> <type> <size>" or "<sha> missing"
+        if len(header) != 3:
+            return b""
+        size = int(header[2])
+        data = self.proc.stdout.read(size + 1)  # trailing LF
+        return data[:size if max_bytes is None else min(size, max_bytes)]
+
+    def read(self, fp: Path, max_bytes: int = 500_000, rel: str = None) -> str:
+        sha = self.blob_shas.get(rel if rel is not None else to_posix_rel(fp, self.repo_path))
+        if not sha:
+            return read_file_safe(fp, max_bytes)
         try:
-            # pathspec requires forward-slash paths on all platforms
-            rel = to_posix_rel(path, base)
-            if spec.match_file(rel):
-                return True
-        except Exception:
+            raw = self.read_blob(sha, max_bytes)
+        except (OSError, ValueError):
+            self.close()
+            return read_file_safe(fp, max_bytes)
+        return "" if is_binary(raw) else raw.decode("utf-8", errors="replace")
+
+    def load_source(self, fp: Path, rel: str = None):
+        sha = self.blob_shas.get(rel if rel is not None else to_posix_rel(fp, self.repo_path))
+        if not sha:
+            return read_source(fp)
+        # Clean large files are mapped from the working tree rather than piped
+        try:
+            if os.stat(fp).st_size >= MMAP_MIN_BYTES:
+                return read_source(fp)
+        except OSError:
             pass
-    return False
+        try:
+            raw = self.read_blob(sha, None)
+        except (OSError, ValueError):
+            self.close()
+            return read_source(fp)
+        if is_binary(raw):
+            return None
+        # No-checkout clone: scan big blobs as bytes instead of decoding them
+        return raw if len(raw) >= MMAP_MIN_BYTES else raw.decode("utf-8", errors="replace")
+
+    def close(self) -> None:
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=10)
+            except (OSError, subprocess.SubprocessError):
+                self.proc.kill()
+            self.proc = None
+
+
+def make_reader(repo_path: Path, blob_shas: dict) -> FileReader:
+    return GitBlobReader(repo_path, blob_shas) if blob_shas else FileReader()
+
+
+# ── File catalog ────────────────────────────────────────────────────────────────
+
+def git_blob_sizes(repo_path: Path, shas: list) -> dict:
+    """Map blob SHAs to their size with a single `git cat-file --batch-check`."""
+    if not shas:
+        return {}
+    try:
+        r = subprocess.run(
+            ["git", "-C", str(repo_path), "cat-file", "--batch-check"],
+            input="\n".join(shas) + "\n", capture_output=True, text=True, timeout=300
+        )
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    sizes = {}
+    for line in r.stdout.splitlines():
+        parts = line.split()
+        # "<sha> <type> <size>" or "<sha> missing"
+        if len(parts) == 3:
+            sizes[parts[0]] = int(parts[2])
+    return sizes
 
 
-def walk_files(repo_path: Path):
-    spec = load_gitignore_spec(repo_path)
-    for root, dirs, files in os.walk(repo_path):
-        root_path = Path(root)
-        # Prune skip dirs in-place
-        dirs[:] = [d for d in dirs
-                   if d not in SKIP_DIRS
-                   and not should_skip(root_path / d, repo_path, spec)]
-        for fname in files:
-            fpath = root_path / fname
-            if not should_skip(fpath, repo_path, spec):
-                yield fpath
+def path_suffix(name: str) -> str:
+    """Lower-cased suffix with the same rules as Path.suffix ('.env' has none)."""
+    i = name.rfind(".")
+    return name[i:].lower() if 0 < i < len(name) - 1 else ""
+
+
+class FileEntry:
+    """
+    One catalog row, materialised on demand: POSIX rel path, basename,
+    suffix and size. The absolute `path` is only built when asked for.
+    """
+
+    __slots__ = ("repo_path", "rel", "name", "suffix", "size", "_path")
+
+    def __init__(self, repo_path: Path, rel: str, name: str, suffix: str, size: int):
+        self.repo_path = repo_path
+        self.rel = rel
+        self.name = name
+        self.suffix = suffix
+        self.size = size
+        self._path = None
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = self.repo_path.joinpath(*self.rel.split("/"))
+        return self._path
+
+    @property
+    def parts(self) -> tuple:
+        return tuple(self.rel.split("/"))
+
+
+class FileCatalog:
+    """
+    The result of one scan of a repository, shared by every analysis phase.
+
+    Files are stored as a compact column table rather than one object per
+    file: an interned directory table (`dirs`, one id per directory), interned
+    basenames, suffix codes into `suffixes`, and array-backed directory ids and
+    sizes. Detectors work on the columns and per-directory data directly;
+    iterating yields FileEntry views built on the fly. Contents are loaded
+    lazily through a single reader — git cat-file when blob SHAs are known,
+    the working tree otherwise. Step 3 reloads it from the sidecar written
+    next to analysis_report.json instead of re-walking the repository.
+    """
+
+    def __init__(self, repo_path: Path, blob_shas: dict = None, walker: str = "fs"):
+        self.repo_path = repo_path
+        self.blob_shas = blob_shas or {}
+        self.walker = walker
+        self.dirs = [""]            # dir id -> POSIX rel dir ("" = repo root)
+        self._dir_ids = {"": 0}
+        self.suffixes = [""]        # suffix code -> lower-cased suffix
+        self._suffix_codes = {"": 0}
+        self.dir_ids = array("I")
+        self.basenames = []
+        self.suffix_codes = array("I")
+        self.sizes = array("q")
+        self._reader = None
+        self._texts = {}
+        self.bytes_read = 0
+
+    def add(self, rel: str, size: int) -> None:
+        d, _, name = rel.rpartition("/")
+        dir_id = self._dir_ids.get(d)
+        if dir_id is None:
+            dir_id = self._dir_ids[d] = len(self.dirs)
+            self.dirs.append(d)
+        suffix = path_suffix(name)
+        code = self._suffix_codes.get(suffix)
+        if code is None:
+            code = self._suffix_codes[suffix] = len(self.suffixes)
+            self.suffixes.append(suffix)
+        self.dir_ids.append(dir_id)
+        self.basenames.append(sys.intern(name))
+        self.suffix_codes.append(code)
+        self.sizes.append(size)
+
+    @classmethod
+    def scan(cls, repo_path: Path, walker: str = "auto") -> "FileCatalog":
+        rels, blob_shas = enumerate_rels(repo_path, walker)
+        catalog = cls(repo_path, blob_shas, "git" if blob_shas else "fs")
+        root = str(repo_path)
+        unsized = []
+        for rel in rels:
+            try:
+                size = os.stat(os.path.join(root, rel)).st_size
+            except OSError:
+                size = -1
+                if rel in blob_shas:
+                    unsized.append((len(catalog), rel))
+            catalog.add(rel, size)
+        # No-checkout clone: the files only exist as blobs
+        if unsized:
+            sizes = git_blob_sizes(repo_path, [blob_shas[rel] for _, rel in unsized])
+            for i, rel in unsized:
+                catalog.sizes[i] = sizes.get(blob_shas[rel], -1)
+        return catalog
+
+    # ── Rows ─────────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.basenames)
+
+    def __iter__(self):
+        return (self.entry(i) for i in range(len(self.basenames)))
+
+    def rel(self, i: int) -> str:
+        d = self.dirs[self.dir_ids[i]]
+        return f"{d}/{self.basenames[i]}" if d else self.basenames[i]
+
+    def entry(self, i: int) -> FileEntry:
+        return FileEntry(self.repo_path, self.rel(i), self.basenames[i],
+                         self.suffixes[self.suffix_codes[i]], self.sizes[i])
+
+    def iter_rels(self):
+        return (self.rel(i) for i in range(len(self.basenames)))
+
+    def indices_with_suffix(self, suffixes) -> list:
+        """Row numbers (in scan order) of files whose suffix is in `suffixes`."""
+        codes = {code for suffix, code in self._suffix_codes.items() if suffix in suffixes}
+        return [i for i, code in enumerate(self.suffix_codes) if code in codes]
+
+    def suffix_counts(self) -> dict:
+        """Lower-cased suffix -> number of files."""
+        counts = defaultdict(int)
+        for code in self.suffix_codes:
+            counts[code] += 1
+        return {self.suffixes[code]: n for code, n in counts.items()}
+
+    def find(self, rel: str) -> FileEntry:
+        """Entry for a POSIX rel path, or None."""
+        d, _, name = rel.rpartition("/")
+        dir_id = self._dir_ids.get(d)
+        if dir_id is None:
+            return None
+        start = 0
+        basenames = self.basenames
+        while True:
+            try:
+                i = basenames.index(name, start)
+            except ValueError:
+                return None
+            if self.dir_ids[i] == dir_id:
+                return self.entry(i)
+            start = i + 1
+
+    def has_rel(self, rel: str) -> bool:
+        return self.find(rel) is not None
+
+    def last_by_name(self, names) -> dict:
+        """Basename -> entry of the last file with that name (scan order)."""
+        last = {}
+        for i, name in enumerate(self.basenames):
+            if name in names:
+                last[name] = i
+        return {name: self.entry(i) for name, i in last.items()}
+
+    # ── Name / directory sets ────────────────────────────────────────────────
+
+    @cached_property
+    def names(self) -> set:
+        return set(self.basenames)
+
+    @cached_property
+    def dir_parts_lower(self) -> set:
+        """Lower-cased directory names appearing anywhere in the tree."""
+        used = set(self.dir_ids)
+        return {part.lower() for dir_id in used if self.dirs[dir_id]
+                for part in self.dirs[dir_id].split("/")}
+
+    @cached_property
+    def path_parts_lower(self) -> set:
+        """Lower-cased directory names and basenames."""
+        return self.dir_parts_lower | {name.lower() for name in self.names}
+
+    @cached_property
+    def segment_text(self) -> str:
+        """
+        Path-segment index: every distinct lower-cased segment, NUL-separated,
+        so "does any segment contain X" is one substring search.
+        """
+        return "\0".join(self.path_parts_lower)
+
+    # ── Contents ─────────────────────────────────────────────────────────────
+
+    def reader(self) -> FileReader:
+        if self._reader is None:
+            self._reader = make_reader(self.repo_path, self.blob_shas)
+        return self._reader
+
+    def read(self, entry: FileEntry, max_bytes: int = 500_000) -> str:
+        if entry.size > 0:
+            self.bytes_read += entry.size if max_bytes is None else min(entry.size, max_bytes)
+        return self.reader().read(entry.path, max_bytes, rel=entry.rel)
+
+    def text(self, rel: str, max_bytes: int = 500_000) -> str:
+        """Memoised read of a single file by rel path ("" if not in the catalog)."""
+        key = (rel, max_bytes)
+        if key not in self._texts:
+            entry = self.find(rel)
+            self._texts[key] = self.read(entry, max_bytes) if entry else ""
+        return self._texts[key]
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._texts.clear()
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+
+    def to_dict(self) -> dict:
+        files = []
+        for i in range(len(self)):
+            rel = self.rel(i)
+            files.append([rel, self.sizes[i], self.blob_shas.get(rel, "")])
+        return {"repo_path": str(self.repo_path), "walker": self.walker, "files": files}
+
+    @classmethod
+    def from_dict(cls, data: dict, repo_path: Path = None) -> "FileCatalog":
+        repo_path = repo_path or Path(data.get("repo_path", "."))
+        catalog = cls(repo_path, {}, data.get("walker", "fs"))
+        for rel, size, sha in data.get("files", []):
+            catalog.add(rel, size)
+            if sha:
+                catalog.blob_shas[rel] = sha
+        return catalog
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: Path, repo_path: Path = None) -> "FileCatalog":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), repo_path)
+
+
+def catalog_path_for(report_path: Path) -> Path:
+    """Sidecar file holding the FileCatalog for a given analysis report."""
+    return report_path.with_name(report_path.stem + ".catalog.json")
+
+
+def load_report_catalog(analysis_report: dict, repo_path: Path) -> FileCatalog:
+    """Reuse the catalog persisted by step 1, or scan once if it is missing."""
+    sidecar = analysis_report.get("file_catalog")
+    if sidecar and Path(sidecar).exists():
+        try:
+            return FileCatalog.load(Path(sidecar), repo_path)
+        except (OSError, ValueError):
+            pass
+    return FileCatalog.scan(repo_path)
 
 
 # ── Tech stack detection ────────────────────────────────────────────────────────
 
-def detect_languages(repo_path: Path, all_files: list) -> dict:
+def detect_languages(catalog: FileCatalog) -> dict:
     counts = defaultdict(int)
-    for fp in all_files:
-        lang = LANGUAGE_EXTENSIONS.get(fp.suffix.lower())
+    for suffix, n in catalog.suffix_counts().items():
+        lang = LANGUAGE_EXTENSIONS.get(suffix)
         if lang:
-            counts[lang] += 1
+            counts[lang] += n
     total = sum(counts.values()) or 1
     return {lang: {"count": cnt, "percent": round(cnt / total * 100, 1)}
             for lang, cnt in sorted(counts.items(), key=lambda x: -x[1])}
 
 
-def detect_frameworks(repo_path: Path, all_files: list) -> list:
-    file_set = {to_posix_rel(fp, repo_path) for fp in all_files}
-    file_names = {fp.name for fp in all_files}
+def detect_frameworks(catalog: FileCatalog) -> list:
+    file_names = catalog.names
     found = []
 
     for fw, indicators in FRAMEWORK_INDICATORS.items():
         for ind in indicators:
-            if ind in file_names or ind in file_set:
+            if ind in file_names or ("/" in ind and catalog.has_rel(ind)):
                 # Refine package.json frameworks
                 if ind == "package.json" and fw in ("React", "Express", "npm"):
-                    pkg = repo_path / "package.json"
-                    if pkg.exists():
-                        try:
-                            content = pkg.read_text(encoding="utf-8", errors="ignore")
-                            if fw == "React" and '"react"' in content:
-                                found.append(fw)
-                            elif fw == "Express" and '"express"' in content:
-                                found.append(fw)
-                            elif fw == "npm":
-                                found.append(fw)
-                        except Exception:
-                            pass
+                    if catalog.has_rel("package.json"):
+                        content = catalog.text("package.json")
+                        if fw == "React" and '"react"' in content:
+                            found.append(fw)
+                        elif fw == "Express" and '"express"' in content:
+                            found.append(fw)
+                        elif fw == "npm":
+                            found.append(fw)
                     break
                 # Refine FastAPI/Flask
                 elif ind == "main.py" and fw == "FastAPI":
-                    try:
-                        content = (repo_path / "main.py").read_text(encoding="utf-8", errors="ignore")
-                        if "fastapi" in content.lower():
-                            found.append(fw)
-                    except Exception:
-                        pass
+                    if "fastapi" in catalog.text("main.py").lower():
+                        found.append(fw)
                     break
                 elif ind == "app.py" and fw == "Flask":
-                    try:
-                        content = (repo_path / "app.py").read_text(encoding="utf-8", errors="ignore")
-                        if "flask" in content.lower():
-                            found.append(fw)
-                    except Exception:
-                        pass
+                    if "flask" in catalog.text("app.py").lower():
+                        found.append(fw)
                     break
                 else:
                     found.append(fw)
@@ -289,8 +1196,8 @@ def detect_frameworks(repo_path: Path, all_files: list) -> list:
     return list(dict.fromkeys(found))  # deduplicate preserving order
 
 
-def detect_build_tools(repo_path: Path, all_files: list) -> list:
-    file_names = {fp.name for fp in all_files}
+def detect_build_tools(catalog: FileCatalog) -> list:
+    file_names = catalog.names
     found = []
     for tool, indicators in BUILD_TOOL_FILES.items():
         for ind in indicators:
@@ -300,20 +1207,18 @@ def detect_build_tools(repo_path: Path, all_files: list) -> list:
     return list(dict.fromkeys(found))
 
 
-def detect_architecture(repo_path: Path, all_files: list) -> list:
-    file_set = {to_posix_rel(fp, repo_path).lower() for fp in all_files}
-    dir_set = set()
-    for fp in all_files:
-        for part in fp.relative_to(repo_path).parts[:-1]:
-            dir_set.add(part.lower())
+def detect_architecture(catalog: FileCatalog) -> list:
+    # Signals hold no "/", so a substring of a rel path is a substring of
+    # one of its directory names or of its basename: search the segment index
+    segments = catalog.segment_text
+    dir_set = catalog.dir_parts_lower
 
     patterns = []
     for pattern, signals in ARCH_PATTERNS.items():
         for sig in signals:
             # Strip both slash variants so patterns match on Windows and Linux
             sig_l = sig.lower().rstrip("/").rstrip("\\")
-            if (sig_l in dir_set or
-                    any(sig_l in f for f in file_set)):
+            if sig_l in segments:
                 patterns.append(pattern)
                 break
 
@@ -327,12 +1232,36 @@ def detect_architecture(repo_path: Path, all_files: list) -> list:
     return list(dict.fromkeys(patterns)) if patterns else ["Monolith"]
 
 
-def detect_tests(repo_path: Path, all_files: list) -> dict:
-    file_names = {fp.name for fp in all_files}
-    dir_parts = set()
-    for fp in all_files:
-        for part in fp.relative_to(repo_path).parts:
-            dir_parts.add(part.lower())
+def _test_glob_regex(pat: str) -> str:
+    # Kept exactly as detection has always translated TEST_FRAMEWORKS globs
+    # (matched from the start of the name, "*" then "." escaped)
+    return pat.replace("*", ".*").replace(".", "\\.")
+
+
+TEST_FILE_GLOBS = list(dict.fromkeys(
+    pat for patterns in TEST_FRAMEWORKS.values() for pat in patterns if not pat.endswith("/")
+))
+TEST_GLOB_REGEXES = [re.compile(_test_glob_regex(pat)) for pat in TEST_FILE_GLOBS]
+# One alternation of every glob: names matching none are rejected in one call
+TEST_GLOBS_RE = re.compile("|".join(f"(?:{rx.pattern})" for rx in TEST_GLOB_REGEXES))
+
+
+def matched_test_globs(file_names) -> set:
+    """The TEST_FILE_GLOBS that match at least one of file_names."""
+    matched = set()
+    for fn in file_names:
+        if TEST_GLOBS_RE.match(fn):
+            for pat, rx in zip(TEST_FILE_GLOBS, TEST_GLOB_REGEXES):
+                if pat not in matched and rx.match(fn):
+                    matched.add(pat)
+            if len(matched) == len(TEST_FILE_GLOBS):
+                break
+    return matched
+
+
+def detect_tests(catalog: FileCatalog) -> dict:
+    dir_parts = catalog.path_parts_lower
+    matched = matched_test_globs(catalog.names)
 
     found = {}
     test_file_count = 0
@@ -343,30 +1272,362 @@ def detect_tests(repo_path: Path, all_files: list) -> dict:
                 if pat.rstrip("/").lower() in dir_parts:
                     found[fw] = pat.rstrip("/")
                     break
-            else:
-                for fn in file_names:
-                    if re.match(pat.replace("*", ".*").replace(".", "\\."), fn):
-                        found[fw] = pat
-                        break
+            elif pat in matched:
+                found[fw] = pat
 
-    # Count test files
+    # Count test files: a marker in any directory name or in the basename
     test_markers = ["test", "spec", "__tests__"]
-    for fp in all_files:
-        rel = to_posix_rel(fp, repo_path).lower()
-        if any(m in rel for m in test_markers):
+    marked_dirs = [any(m in d.lower() for m in test_markers) for d in catalog.dirs]
+    marked_names = {}
+    for dir_id, name in zip(catalog.dir_ids, catalog.basenames):
+        if marked_dirs[dir_id]:
             test_file_count += 1
+            continue
+        marked = marked_names.get(name)
+        if marked is None:
+            lower = name.lower()
+            marked = marked_names[name] = any(m in lower for m in test_markers)
+        test_file_count += marked
 
     return {"frameworks": found, "test_file_count": test_file_count}
 
 
-# ── Code indexing ───────────────────────────────────────────────────────────────
+# ── Source scanners ─────────────────────────────────────────────────────────────
+#
+# Java and JS/TS are indexed from a token stream instead of per-category
+# regexes. Every token alternative below cannot fail once it has started (an
+# unterminated string runs to the end of its line, an unterminated comment to
+# the end of the file) and its loops are unrolled so that each character has
+# exactly one way to match, so the tokenizer never backtracks; the scanners
+# then make a single pass over the tokens with a brace stack.
+
+_SCAN_TOKEN_SOURCE = (
+    r"\n"
+    r"|//[^\n]*|/\*[^*]*(?:\*(?!/)[^*]*)*(?:\*/)?"
+    r'|"""[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*(?:""")?'
+    r'|"[^"\\\n]*(?:\\.[^"\\\n]*)*"?'
+    r'|\'[^\'\\\n]*(?:\\.[^\'\\\n]*)*\'?'
+    r"|`[^`\\]*(?:\\.[^`\\]*)*`?"
+    r"|[A-Za-z_$][\w$]*"
+    r"|[0-9][\w.]*"
+    r"|=>"
+    r"|[@{}()\[\];,<>=.:*?]"
+)
+_SCAN_TOKEN_RE = re.compile(_SCAN_TOKEN_SOURCE)
+_SCAN_TOKEN_BYTES_RE = re.compile(_SCAN_TOKEN_SOURCE.encode("ascii"))
+
+# Token kind from a token's first character ('"""' text blocks and "=>"
+# arrows are told apart by the scanners). Every token starts with an ASCII
+# character listed here (numbers with [0-9], not the Unicode \d); lookups
+# still default to "punct" so no character can abort a scan.
+SCAN_KINDS = {"\n": "newline", "/": "comment", '"': "string", "'": "string", "`": "string"}
+SCAN_KINDS.update(dict.fromkeys("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$", "ident"))
+SCAN_KINDS.update(dict.fromkeys("0123456789", "number"))
+SCAN_KINDS.update(dict.fromkeys("@{}()[];,<>=.:*?", "punct"))
+
+# Sources up to this many characters are tokenized into one list with
+# findall (no match objects); longer ones are streamed so memory stays flat
+SCAN_LIST_MAX_CHARS = 1024 * 1024
+
+
+def scan_tokens(content):
+    """
+    Token texts of a C-like source (str, bytes or mmap), always as str, with
+    each newline outside a token as its own "\n" token so scanners count
+    lines without offsets. Whitespace and characters no token starts with
+    (operators such as / + - !) are skipped; comments are kept (they may
+    span lines) and classified through SCAN_KINDS like every other token.
+    """
+    if isinstance(content, str):
+        if len(content) <= SCAN_LIST_MAX_CHARS:
+            return _SCAN_TOKEN_RE.findall(content)
+        return (m.group() for m in _SCAN_TOKEN_RE.finditer(content))
+    return (m.group().decode("utf-8", errors="replace")
+            for m in _SCAN_TOKEN_BYTES_RE.finditer(content))
+
+
+def string_value(token: str) -> str:
+    """Body of a string or text-block token, without its quotes."""
+    if token.startswith('"""'):
+        return token[3:-3] if len(token) >= 6 and token.endswith('"""') else token[3:]
+    return token[1:-1] if len(token) >= 2 and token[-1] == token[0] else token[1:]
+
+
+_NO_TOKEN = (None, None, 0)
+
+JAVA_TYPE_KEYWORDS = {"class": "classes", "enum": "classes", "record": "classes",
+                      "interface": "interfaces"}
+JAVA_ROUTE_ANNOTATIONS = {"RequestMapping", "GetMapping", "PostMapping", "PutMapping",
+                          "DeleteMapping", "PatchMapping"}
+JAVA_ENTITY_ANNOTATIONS = {"Entity", "Table"}
+# `word (` that is a statement or expression, never a method declaration
+JAVA_NOT_METHODS = {"if", "for", "while", "switch", "catch", "synchronized", "return", "new",
+                    "throw", "else", "do", "try", "assert", "super", "this", "case", "yield"}
+
+
+def scan_java(content) -> dict:
+    """
+    Index one Java source in a single pass: classes (class/enum/record),
+    interfaces (interface/@interface), methods and constructors of the
+    enclosing type as functions (with "class"), api_endpoints from Spring
+    mapping annotations (unnamed, value= and path= strings) and db_entities
+    for types annotated @Entity/@Table.
+    """
+    out = {"classes": [], "interfaces": [], "functions": [], "api_endpoints": [], "db_entities": []}
+    # One frame per open brace: [enclosing type name or None, open parens,
+    # inside a field initializer]
+    frames = [[None, 0, False]]
+    prev = prev2 = _NO_TOKEN
+    decl = None             # (category, keyword line) awaiting the type name
+    body_of = None          # type whose "{" opens its body
+    entity = False          # @Entity/@Table seen, waiting for its class
+    # Annotation being read: state is "name", "dot" (name read) or "args"
+    ann_state = ann_name = ann_key = ann_ident = None
+    ann_at = ann_depth = 0
+    ann_paths = []
+    kinds = SCAN_KINDS
+    line = 1
+    newlines = 0            # newlines inside the previous token
+
+    for text in scan_tokens(content):
+        if newlines:
+            line += newlines
+            newlines = 0
+        kind = kinds.get(text[0], "punct")
+        if kind == "newline":
+            line += 1
+            continue
+        if kind == "comment":
+            line += text.count("\n")
+            continue
+        if kind == "string":
+            if text.startswith('"""'):
+                kind = "text_block"
+            newlines = text.count("\n")
+        if ann_state == "name":
+            ann_state = None
+            if kind == "ident":
+                if text == "interface" and ann_name is None:
+                    decl = ("interfaces", ann_at)
+                else:
+                    ann_name, ann_state = text, "dot"
+                prev2, prev = prev, (kind, text, line)
+                continue
+        elif ann_state == "dot":
+            if text == ".":
+                ann_state = "name"
+                continue
+            if text == "(":
+                ann_state, ann_depth, ann_key, ann_ident, ann_paths = "args", 1, None, None, []
+                continue
+            ann_state = None
+            if ann_name in JAVA_ENTITY_ANNOTATIONS:
+                entity = True
+        elif ann_state == "args":
+            if text in ("(", "{", "["):
+                ann_depth += 1
+            elif text in (")", "}", "]"):
+                ann_depth -= 1
+                if ann_depth == 0:
+                    ann_state = None
+                    if ann_name in JAVA_ROUTE_ANNOTATIONS:
+                        out["api_endpoints"].extend({"path": p, "line": ann_at}
+                                                    for p in ann_paths)
+                    elif ann_name in JAVA_ENTITY_ANNOTATIONS:
+                        entity = True
+                    prev2, prev = prev, (kind, text, line)
+            elif ann_depth == 1 and text == ",":
+                ann_key = None
+            elif ann_depth == 1 and text == "=":
+                ann_key = ann_ident
+            elif kind == "ident":
+                ann_ident = text
+            elif kind in ("string", "text_block") and ann_key in (None, "value", "path"):
+                ann_paths.append(string_value(text))
+            continue
+
+        if kind == "ident":
+            if decl is not None:
+                category, at = decl
+                decl = None
+                out[category].append({"name": text, "line": at})
+                if entity and category == "classes":
+                    out["db_entities"].append({"name": text, "line": at})
+                entity = False
+                body_of = text
+            elif text in JAVA_TYPE_KEYWORDS and prev[1] != ".":
+                decl = (JAVA_TYPE_KEYWORDS[text], line)
+        else:
+            decl = None
+            if text == "@":
+                ann_state, ann_name, ann_at = "name", None, line
+                continue
+            if text == "(":
+                frame = frames[-1]
+                if (frame[0] is not None and frame[1] == 0 and not frame[2] and body_of is None
+                        and prev[0] == "ident" and prev[1] not in JAVA_NOT_METHODS
+                        and ((prev2[0] == "ident" and prev2[1] != "new") or prev2[1] in (">", "]")
+                             or (prev[1] == frame[0] and prev2[1] != "."))):
+                    out["functions"].append({"name": prev[1], "class": frame[0],
+                                             "line": prev[2]})
+                frame[1] += 1
+            elif text == ")":
+                if frames[-1][1]:
+                    frames[-1][1] -= 1
+            elif text == "{":
+                frames.append([body_of, 0, False])
+                body_of = None
+            elif text == "}":
+                if len(frames) > 1:
+                    frames.pop()
+            elif text == ";":
+                body_of = None
+                frames[-1][2] = False
+            elif text == "=" and frames[-1][1] == 0:
+                frames[-1][2] = True
+        prev2, prev = prev, (kind, text, line)
+    return out
+
+
+JS_ROUTE_METHODS = {"get", "post", "put", "delete", "patch", "use"}
+JS_NOT_METHODS = {"if", "for", "while", "switch", "catch", "return", "function", "constructor",
+                  "super", "typeof", "await", "new", "import", "require"}
+JS_METHOD_MODIFIERS = {"static", "async", "get", "set", "public", "private", "protected",
+                       "readonly", "override", "abstract", "declare"}
+# Tokens that may precede a class member's name
+JS_MEMBER_START = {None, "{", "}", ";", "*"} | JS_METHOD_MODIFIERS
+
+
+def scan_js_ts(content) -> dict:
+    """
+    Index one JS/TS source in a single pass: classes, interfaces, functions
+    (function declarations, const/let/var arrow or function expressions,
+    `name: function` / `name: (...) =>` properties, class methods and arrow
+    fields, the last two with "class") and api_endpoints from Express-style
+    `<...app|...router>.get/post/put/delete/patch/use("/path")` calls.
+    Single-character function names (minified code) are skipped.
+    """
+    out = {"classes": [], "interfaces": [], "functions": [], "api_endpoints": []}
+    frames = [[None, 0]]
+    prev = prev2 = prev3 = prev4 = _NO_TOKEN
+    decl = None             # (category, keyword line) awaiting a name
+    body_of = None          # "{" opens a class body (name) or an interface body ("")
+    after_function = False  # `function` / `function*` read, name next
+    # Function-valued binding being confirmed: name, line, class, state, paren depth
+    bind = None
+    kinds = SCAN_KINDS
+    line = 1
+    newlines = 0            # newlines inside the previous token
+
+    def add_function(name, at, cls=None):
+        if len(name) > 1:
+            entry = {"name": name, "line": at}
+            if cls:
+                entry["class"] = cls
+            out["functions"].append(entry)
+
+    for text in scan_tokens(content):
+        if newlines:
+            line += newlines
+            newlines = 0
+        kind = kinds.get(text[0], "punct")
+        if kind == "newline":
+            line += 1
+            continue
+        if kind == "comment":
+            line += text.count("\n")
+            continue
+        if kind == "string":
+            if text.startswith('"""'):
+                kind = "text_block"
+            newlines = text.count("\n")
+        elif text == "=>":
+            kind = "arrow"
+        if bind is not None:
+            name, at, cls, state, depth = bind
+            if state == "value":                          # just after `=` or `:`
+                if text == "function":
+                    add_function(name, at, cls)
+                    bind = None
+                elif text == "(":
+                    bind[3:] = ["params", 1]
+                elif kind == "ident" and text != "async":
+                    bind[3] = "param"
+                elif text != "async":
+                    bind = None
+            elif state == "param":                        # `= x =>`
+                if kind == "arrow":
+                    add_function(name, at, cls)
+                bind = None
+            elif state == "params":
+                if text == "(":
+                    bind[4] += 1
+                elif text == ")":
+                    bind[4] -= 1
+                    if bind[4] == 0:
+                        bind[3] = "after"
+            elif kind == "arrow":                         # `(...) =>` / `(...): T =>`
+                add_function(name, at, cls)
+                bind = None
+            elif state == "after" and text == ":":
+                bind[3] = "return_type"
+            elif state == "after" or text in (";", "{", "}", "=", ")"):
+                bind = None
+
+        if kind == "ident":
+            if decl is not None:
+                category, at = decl
+                decl = None
+                if text not in ("extends", "implements"):
+                    out[category].append({"name": text, "line": at})
+                    body_of = text if category == "classes" else ""
+            elif after_function:
+                after_function = False
+                add_function(text, line)
+            elif text in ("class", "interface") and prev[1] != ".":
+                decl = ("classes" if text == "class" else "interfaces", line)
+                body_of = ""
+            elif text == "function" and prev[1] != ".":
+                after_function = True
+        else:
+            decl = None
+            if text != "*":
+                after_function = False
+
+        if kind == "punct":
+            if text in ("=", ":") and bind is None and prev[0] == "ident":
+                frame = frames[-1]
+                if text == "=" and prev2[1] in ("const", "let", "var"):
+                    bind = [prev[1], prev2[2], None, "value", 0]
+                elif text == "=" and frame[0] and frame[1] == 0 and prev2[1] in JS_MEMBER_START:
+                    bind = [prev[1], prev[2], frame[0], "value", 0]
+                elif text == ":" and prev2[1] in ("{", ","):
+                    bind = [prev[1], prev[2], None, "value", 0]
+            elif text == "(":
+                frame = frames[-1]
+                if (frame[0] and frame[1] == 0 and prev[0] == "ident"
+                        and prev[1] not in JS_NOT_METHODS and prev2[1] in JS_MEMBER_START):
+                    add_function(prev[1], prev[2], frame[0])
+                frame[1] += 1
+            elif text == ")":
+                if frames[-1][1]:
+                    frames[-1][1] -= 1
+            elif text == "{":
+                frames.append([body_of or None, 0])
+                body_of = None
+            elif text == "}":
+                if len(frames) > 1:
+                    frames.pop()
+        elif (kind == "string" and prev[1] == "(" and prev2[1] in JS_ROUTE_METHODS
+              and prev3[1] == "." and prev4[0] == "ident"
+              and prev4[1].lower().endswith(("app", "router"))):
+            out["api_endpoints"].append({"path": string_value(text),
+                                         "line": prev4[2]})
+        prev4, prev3, prev2, prev = prev3, prev2, prev, (kind, text, line)
+    return out
 
-JAVA_PATTERNS = {
-    "classes": re.compile(r"(?:public\s+)?(?:abstract\s+)?(?:final\s+)?(?:class|interface|enum)\s+(\w+)"),
-    "methods": re.compile(r"(?:public|protected|private|static|final|synchronized|\s)+\s+\w[\w<>,\[\]]*\s+(\w+)\s*\("),
-    "endpoints": re.compile(r'@(?:RequestMapping|GetMapping|PostMapping|PutMapping|DeleteMapping|PatchMapping)\s*\(\s*(?:value\s*=\s*)?["\']([^"\']+)["\']'),
-    "entities": re.compile(r"@(?:Entity|Table)\s"),
-}
+
+# ── Code indexing ───────────────────────────────────────────────────────────────
 
 PYTHON_PATTERNS = {
     "classes": re.compile(r"^class\s+(\w+)", re.MULTILINE),
@@ -375,105 +1636,756 @@ PYTHON_PATTERNS = {
     "fastapi_routes": re.compile(r'@(?:app|router)\.\s*(?:get|post|put|delete|patch)\s*\(\s*["\']([^"\']+)["\']'),
 }
 
-JS_TS_PATTERNS = {
-    "classes": re.compile(r"(?:^|\s)class\s+(\w+)"),
-    "functions": re.compile(r"(?:function\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s*)?\(|(\w+)\s*:\s*(?:async\s*)?\()"),
-    "express_routes": re.compile(r'(?:app|router)\.\s*(?:get|post|put|delete|patch|use)\s*\(\s*["\']([^"\']+)["\']'),
-    "interfaces": re.compile(r"(?:^|\s)interface\s+(\w+)"),
-}
+
+def byte_patterns(patterns: dict) -> dict:
+    """
+    Bytes twins of compiled str patterns, for scanning mmap'd files without
+    decoding them. \\w and \\s become ASCII-only, which only matters for
+    non-ASCII identifiers.
+    """
+    return {name: re.compile(p.pattern.encode("utf-8"), p.flags & ~re.UNICODE)
+            for name, p in patterns.items()}
+
+
+PYTHON_BYTE_PATTERNS = byte_patterns(PYTHON_PATTERNS)
+
+
+class LineIndex:
+    """
+    Line-start offsets of a text (str, or bytes / mmap for byte-level scans),
+    built once (on first lookup) per file.
+
+    line_of() resolves a character offset with a binary search, replacing the
+    quadratic `content[:offset].count("\\n")` idiom.
+    """
+
+    __slots__ = ("text", "_starts")
+
+    def __init__(self, text: str):
+        self.text = text
+        self._starts = None
+
+    @property
+    def starts(self) -> list:
+        if self._starts is None:
+            newline = _NEWLINE_RE if isinstance(self.text, str) else _NEWLINE_BYTES_RE
+            starts = [0]
+            starts.extend(m.end() for m in newline.finditer(self.text))
+            self._starts = starts
+        return self._starts
+
+    def line_of(self, offset: int) -> int:
+        """1-based line number containing character `offset`."""
+        return bisect_right(self.starts, offset)
+
+    def line_start(self, line: int) -> int:
+        """Offset of the first character of 1-based `line`."""
+        return self.starts[line - 1]
+
+    def line_end(self, line: int) -> int:
+        """Offset just past the last character of 1-based `line` (before its newline)."""
+        starts = self.starts
+        return starts[line] - 1 if line < len(starts) else len(self.text)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+_NEWLINE_RE = re.compile(r"\n")
+_NEWLINE_BYTES_RE = re.compile(rb"\n")
+
+
+# Files at least this large are indexed through mmap with byte patterns.
+# Mapping is 7-15% slower to scan than decoding and saves only ~1-2% peak RSS
+# (touched pages count), so it is kept for huge generated files only, where
+# it avoids holding the raw bytes and the decoded copy at once.
+MMAP_MIN_BYTES = 64 * 1024 * 1024
+# A NUL byte in the first block marks a file as binary
+BINARY_SNIFF_BYTES = 8192
+
+
+def is_binary(head) -> bool:
+    return b"\0" in head[:BINARY_SNIFF_BYTES]
 
 
 def read_file_safe(fp: Path, max_bytes: int = 500_000) -> str:
+    """Read and decode up to max_bytes of `fp` (None = whole file); "" on error or binary."""
     try:
         with open(fp, "rb") as f:
-            raw = f.read(max_bytes)
-        return raw.decode("utf-8", errors="replace")
+            raw = f.read(-1 if max_bytes is None else max_bytes)
+        return "" if is_binary(raw) else raw.decode("utf-8", errors="replace")
     except Exception:
         return ""
 
 
+def read_source(fp: Path):
+    """
+    Whole file for indexing, with no truncation: decoded str below
+    MMAP_MIN_BYTES, a read-only mmap above it (never copied or decoded),
+    None for binary files (checked on the first block only) or on error.
+    """
+    try:
+        with open(fp, "rb") as f:
+            head = f.read(BINARY_SNIFF_BYTES)
+            if is_binary(head):
+                return None
+            size = os.fstat(f.fileno()).st_size
+            if size < MMAP_MIN_BYTES:
+                return (head + f.read()).decode("utf-8", errors="replace")
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def match_text(m, group: int) -> str:
+    """A match group as str, whether the pattern ran over str or bytes."""
+    value = m.group(group)
+    return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else value
+
+
+def patterns_for(content, patterns: dict, byte_patterns: dict) -> dict:
+    return patterns if isinstance(content, str) else byte_patterns
+
+
 def index_java_file(fp: Path, content: str, rel_path: str, index: dict) -> None:
-    for m in JAVA_PATTERNS["classes"].finditer(content):
-        index["classes"].append({"name": m.group(1), "file": rel_path,
-                                  "line": content[:m.start()].count("\n") + 1})
-    for m in JAVA_PATTERNS["endpoints"].finditer(content):
-        index["api_endpoints"].append({"path": m.group(1), "file": rel_path,
-                                        "line": content[:m.start()].count("\n") + 1})
-    if JAVA_PATTERNS["entities"].search(content):
-        # Find class name near @Entity
-        for m in re.finditer(r"@(?:Entity|Table)[\s\S]{0,200}?class\s+(\w+)", content):
-            index["db_entities"].append({"name": m.group(1), "file": rel_path})
+    for category, entries in scan_java(content).items():
+        for entry in entries:
+            entry["file"] = rel_path
+            index[category].append(entry)
+
+
+# Decorator attributes that register a route; verbs only on app/router-like receivers
+PY_ROUTE_DECORATORS = {"route", "api_route", "websocket"}
+PY_ROUTE_VERBS = {"get", "post", "put", "delete", "patch", "head", "options"}
+PY_ROUTE_RECEIVERS = ("app", "bp", "blueprint", "router", "api")
+
+
+def dotted_name(node) -> str:
+    """`a.b.c` for a Name/Attribute chain (the callee for a Call), "" otherwise."""
+    if isinstance(node, ast.Call):
+        node = node.func
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return ""
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _route_of(decorator) -> dict:
+    """{"path", "method"?} for a route-registering decorator call, else None."""
+    if not isinstance(decorator, ast.Call) or not isinstance(decorator.func, ast.Attribute):
+        return None
+    attr = decorator.func.attr
+    receiver = dotted_name(decorator.func.value).rpartition(".")[2].lower()
+    if attr in PY_ROUTE_VERBS:
+        if not receiver.endswith(PY_ROUTE_RECEIVERS):
+            return None
+    elif attr not in PY_ROUTE_DECORATORS:
+        return None
+    path = decorator.args[0] if decorator.args else next(
+        (kw.value for kw in decorator.keywords if kw.arg in ("path", "rule")), None)
+    if not isinstance(path, ast.Constant) or not isinstance(path.value, str):
+        return None
+    route = {"path": path.value}
+    if attr in PY_ROUTE_VERBS:
+        route["method"] = attr.upper()
+    return route
+
+
+def _python_definitions(stmts: list, owner: str, out: dict) -> None:
+    """
+    Collect the classes, functions and routes of a statement list. Descends
+    into class bodies and compound statements (if/try/with/...), not into
+    function bodies, so local helpers and closures are left out.
+    """
+    for node in stmts:
+        if isinstance(node, ast.ClassDef):
+            entry = {"name": node.name, "line": node.lineno, "end_line": node.end_lineno}
+            if owner:
+                entry["class"] = owner
+            decorators = [dotted_name(d) for d in node.decorator_list]
+            if decorators:
+                entry["decorators"] = decorators
+            out["classes"].append(entry)
+            _python_definitions(node.body, f"{owner}.{node.name}" if owner else node.name, out)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            entry = {"name": node.name, "line": node.lineno, "end_line": node.end_lineno}
+            if owner:
+                entry["class"] = owner
+            if isinstance(node, ast.AsyncFunctionDef):
+                entry["async"] = True
+            decorators = [dotted_name(d) for d in node.decorator_list]
+            if decorators:
+                entry["decorators"] = decorators
+            out["functions"].append(entry)
+            for decorator in node.decorator_list:
+                route = _route_of(decorator)
+                if route:
+                    route.update(line=decorator.lineno, handler=node.name)
+                    out["api_endpoints"].append(route)
+        else:
+            for field in ("body", "orelse", "finalbody", "handlers", "cases"):
+                block = getattr(node, field, None)
+                if isinstance(block, list):
+                    _python_definitions(block, owner, out)
+
+
+def parse_python(content: str) -> dict:
+    """
+    Index one Python source from its AST: classes, functions and methods
+    (with "class", "async", "decorators" and "end_line") and routes from
+    Flask/FastAPI-style decorators. Returns None if the source does not parse.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+    out = {"classes": [], "functions": [], "api_endpoints": []}
+    try:
+        _python_definitions(tree.body, "", out)
+    except RecursionError:
+        return None
+    return out
 
 
 def index_python_file(fp: Path, content: str, rel_path: str, index: dict) -> None:
-    for m in PYTHON_PATTERNS["classes"].finditer(content):
-        index["classes"].append({"name": m.group(1), "file": rel_path,
-                                  "line": content[:m.start()].count("\n") + 1})
-    for m in PYTHON_PATTERNS["functions"].finditer(content):
-        index["functions"].append({"name": m.group(1), "file": rel_path,
-                                    "line": content[:m.start()].count("\n") + 1})
-    for m in PYTHON_PATTERNS["flask_routes"].finditer(content):
-        index["api_endpoints"].append({"path": m.group(1), "file": rel_path})
-    for m in PYTHON_PATTERNS["fastapi_routes"].finditer(content):
-        index["api_endpoints"].append({"path": m.group(1), "file": rel_path})
+    # mmap'd sources stay undecoded and go through the byte patterns
+    parsed = parse_python(content) if isinstance(content, str) else None
+    if parsed is not None:
+        for category, entries in parsed.items():
+            for entry in entries:
+                entry["file"] = rel_path
+                index[category].append(entry)
+        return
+    # Not valid Python 3 (e.g. Python 2 sources): top-level regex fallback
+    index_python_file_regex(fp, content, rel_path, index)
+
+
+def index_python_file_regex(fp: Path, content: str, rel_path: str, index: dict) -> None:
+    """Top-level classes, functions and routes by regex (--python-indexer regex)."""
+    patterns = patterns_for(content, PYTHON_PATTERNS, PYTHON_BYTE_PATTERNS)
+    lines = LineIndex(content)
+    for m in patterns["classes"].finditer(content):
+        index["classes"].append({"name": match_text(m, 1), "file": rel_path,
+                                  "line": lines.line_of(m.start())})
+    for m in patterns["functions"].finditer(content):
+        index["functions"].append({"name": match_text(m, 1), "file": rel_path,
+                                    "line": lines.line_of(m.start())})
+    for m in patterns["flask_routes"].finditer(content):
+        index["api_endpoints"].append({"path": match_text(m, 1), "file": rel_path})
+    for m in patterns["fastapi_routes"].finditer(content):
+        index["api_endpoints"].append({"path": match_text(m, 1), "file": rel_path})
 
 
 def index_js_ts_file(fp: Path, content: str, rel_path: str, index: dict) -> None:
-    for m in JS_TS_PATTERNS["classes"].finditer(content):
-        index["classes"].append({"name": m.group(1), "file": rel_path,
-                                  "line": content[:m.start()].count("\n") + 1})
-    for m in JS_TS_PATTERNS["interfaces"].finditer(content):
-        index["interfaces"].append({"name": m.group(1), "file": rel_path})
-    for m in JS_TS_PATTERNS["functions"].finditer(content):
-        name = m.group(1) or m.group(2) or m.group(3)
-        if name and len(name) > 1:
-            index["functions"].append({"name": name, "file": rel_path,
-                                        "line": content[:m.start()].count("\n") + 1})
-    for m in JS_TS_PATTERNS["express_routes"].finditer(content):
-        index["api_endpoints"].append({"path": m.group(1), "file": rel_path})
-
-
-def build_code_index(repo_path: Path, all_files: list) -> dict:
+    for category, entries in scan_js_ts(content).items():
+        for entry in entries:
+            entry["file"] = rel_path
+            index[category].append(entry)
+
+
+INDEX_CATEGORIES = ("classes", "functions", "api_endpoints", "db_entities", "interfaces")
+
+FILE_INDEXERS = {
+    ".java": index_java_file,
+    ".py": index_python_file,
+    ".js": index_js_ts_file, ".jsx": index_js_ts_file,
+    ".ts": index_js_ts_file, ".tsx": index_js_ts_file,
+}
+
+# --python-indexer choices: "ast" is complete (methods, nesting, decorators,
+# end_line) but 4-7.5x slower than the top-level "regex" patterns
+PYTHON_INDEXERS = {"ast": index_python_file, "regex": index_python_file_regex}
+DEFAULT_PYTHON_INDEXER = "ast"
+
+
+def file_indexers(python_indexer: str = DEFAULT_PYTHON_INDEXER) -> dict:
+    """FILE_INDEXERS with the chosen Python indexer."""
+    if python_indexer == DEFAULT_PYTHON_INDEXER:
+        return FILE_INDEXERS
+    return {**FILE_INDEXERS, ".py": PYTHON_INDEXERS[python_indexer]}
+
+
+# Below this many indexable files the process-pool start-up cost outweighs the gain
+PARALLEL_MIN_FILES = 200
+
+
+def new_code_index() -> dict:
+    index = defaultdict(list)
+    for category in INDEX_CATEGORIES:
+        index[category] = []
+    return index
+
+
+@lru_cache(maxsize=65536)
+def sorted_name_parts(name: str) -> list:
+    """code_tokens.get_name_parts, sorted; memoized, as names repeat across files."""
+    return sorted(get_name_parts(name))
+
+
+def add_name_parts(index: dict) -> None:
+    """
+    Store each element's normalised name parts as element["name_parts"], so
+    step 3 scores names without splitting them again. Runs per file at index
+    time, so the parts are stored in the index cache with the entries.
+    """
+    for entries in index.values():
+        for element in entries:
+            name = element.get("name") or element.get("path", "")
+            if name:
+                element["name_parts"] = sorted_name_parts(name)
+
+
+def index_file(repo_path: Path, fp: Path, reader: FileReader,
+               indexers: dict = FILE_INDEXERS) -> dict:
+    """Index one file and return its entries keyed by category (empty if none)."""
+    indexer = indexers.get(fp.suffix.lower())
+    if indexer is None:
+        return {}
+    rel = to_posix_rel(fp, repo_path)
     index = defaultdict(list)
-    index["classes"] = []
-    index["functions"] = []
-    index["api_endpoints"] = []
-    index["db_entities"] = []
-    index["interfaces"] = []
-
-    for fp in all_files:
-        ext = fp.suffix.lower()
-        rel = to_posix_rel(fp, repo_path)
-        content = read_file_safe(fp)
+    with reader.source(fp, rel) as content:
         if not content:
-            continue
+            return {}
+        indexer(fp, content, rel, index)
+    add_name_parts(index)
+    return dict(index)
+
+
+def _index_shard(shard: tuple) -> list:
+    """Process-pool worker: index one contiguous shard, one partial per file."""
+    repo_path, paths, blob_shas, python_indexer = shard
+    base = Path(repo_path)
+    indexers = file_indexers(python_indexer)
+    with make_reader(base, blob_shas) as reader:
+        return [index_file(base, Path(p), reader, indexers) for p in paths]
+
 
-        if ext == ".java":
-            index_java_file(fp, content, rel, index)
-        elif ext == ".py":
-            index_python_file(fp, content, rel, index)
-        elif ext in (".js", ".jsx", ".ts", ".tsx"):
-            index_js_ts_file(fp, content, rel, index)
+def _index_serial(repo_path: Path, files: list, blob_shas: dict,
+                  python_indexer: str = DEFAULT_PYTHON_INDEXER) -> list:
+    indexers = file_indexers(python_indexer)
+    with make_reader(repo_path, blob_shas) as reader:
+        return [index_file(repo_path, fp, reader, indexers) for fp in files]
 
+
+def index_file_partials(repo_path: Path, files: list, jobs: int = 1,
+                        blob_shas: dict = None,
+                        python_indexer: str = DEFAULT_PYTHON_INDEXER) -> list:
+    """
+    Return one partial index per entry of `files`, in the same order.
+
+    With jobs > 1 the files are split into contiguous shards that are indexed
+    in a process pool; pool.map keeps submission order, so the result is
+    identical to the serial path. When blob_shas is given, contents are
+    streamed from git (one cat-file process per worker).
+    """
+    blob_shas = blob_shas or {}
+    jobs = resolve_jobs(jobs)
+    if jobs <= 1 or len(files) < PARALLEL_MIN_FILES:
+        return _index_serial(repo_path, files, blob_shas, python_indexer)
+
+    # Several shards per worker keeps the pool busy when file sizes are skewed
+    n_shards = min(len(files), jobs * 4)
+    size = -(-len(files) // n_shards)
+    shards = []
+    for i in range(0, len(files), size):
+        chunk = files[i:i + size]
+        rels = [to_posix_rel(fp, repo_path) for fp in chunk]
+        shas = {rel: blob_shas[rel] for rel in rels if rel in blob_shas}
+        shards.append((str(repo_path), [str(fp) for fp in chunk], shas, python_indexer))
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            partials = []
+            for shard_partials in pool.map(_index_shard, shards):
+                partials.extend(shard_partials)
+            return partials
+    except (OSError, BrokenProcessPool):
+        # No usable process pool (sandboxed / restricted host) — stay serial
+        return _index_serial(repo_path, files, blob_shas, python_indexer)
+
+
+def merge_code_indexes(partials: list) -> dict:
+    """Concatenate partial indexes in order, so partial order == file order."""
+    index = new_code_index()
+    for partial in partials:
+        for category, entries in partial.items():
+            index[category].extend(entries)
     return dict(index)
 
 
+def resolve_jobs(jobs: int) -> int:
+    """Map the --jobs value to a worker count (0 or negative = all CPUs)."""
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def build_code_index(catalog: FileCatalog, jobs: int = 1,
+                     cache: "IndexCache" = None, stats: dict = None,
+                     python_indexer: str = DEFAULT_PYTHON_INDEXER) -> dict:
+    """
+    Build the code index for the files in `catalog`.
+
+    Contents come from git cat-file when the catalog carries blob SHAs.
+
+    When an IndexCache is given, files whose cache key is unchanged reuse their
+    stored entries and only changed/added files are re-indexed; entries are
+    still merged in file order, so the output matches a cold run.
+    If `stats` is given, it receives the number of files (re-)indexed and
+    their total size in bytes.
+    python_indexer selects the Python indexer ("ast" or "regex", see
+    PYTHON_INDEXERS); cache keys include the indexer, so switching it
+    re-indexes the affected files instead of reusing the other's entries.
+    """
+    repo_path = catalog.repo_path
+    blob_shas = catalog.blob_shas
+    entries = [catalog.entry(i) for i in catalog.indices_with_suffix(FILE_INDEXERS)]
+    files = [e.path for e in entries]
+    if cache is None:
+        if stats is not None:
+            stats["files"] = len(entries)
+            stats["bytes"] = sum(max(e.size, 0) for e in entries)
+        return merge_code_indexes(index_file_partials(repo_path, files, jobs, blob_shas,
+                                                      python_indexer))
+
+    partials = [None] * len(files)
+    keys = [None] * len(files)
+    misses = []
+    first_of_key = {}
+    duplicates = []
+    indexers = file_indexers(python_indexer)
+    for i, entry in enumerate(entries):
+        indexer = indexers[entry.path.suffix.lower()]
+        keys[i] = (entry.rel, cache.key_for(entry.path, entry.rel, indexer.__name__))
+        cached = cache.get(*keys[i])
+        if cached is not None:
+            partials[i] = cached
+        elif keys[i][1] and keys[i][1] in first_of_key:
+            # Same content as a file already queued: index it once
+            duplicates.append((i, first_of_key[keys[i][1]]))
+        else:
+            first_of_key.setdefault(keys[i][1], i)
+            misses.append(i)
+
+    if stats is not None:
+        stats["files"] = len(misses)
+        stats["bytes"] = sum(max(entries[i].size, 0) for i in misses)
+    fresh = index_file_partials(repo_path, [files[i] for i in misses], jobs, blob_shas,
+                                python_indexer)
+    for i, partial in zip(misses, fresh):
+        partials[i] = partial
+        cache.put(keys[i][0], keys[i][1], partial)
+    for i, first in duplicates:
+        partials[i] = rebase_partial(partials[first], keys[i][0])
+        cache.put(keys[i][0], keys[i][1], partials[i])
+
+    cache.retain({rel for rel, _ in keys})
+    return merge_code_indexes(partials)
+
+
+# ── Incremental index cache ─────────────────────────────────────────────────────
+
+CACHE_DIR = Path(__file__).parent / "cache"
+
+# Bump whenever the indexers change what they emit, to invalidate old caches
+INDEX_CACHE_VERSION = 6
+
+
+def index_cache_path(repo_path: Path, cache_dir: Path) -> Path:
+    """One cache file per repo, named after the repo and its absolute path."""
+    resolved = str(repo_path.resolve())
+    digest = hashlib.sha1(resolved.encode("utf-8")).hexdigest()[:12]
+    return cache_dir / f"{repo_path.resolve().name}-{digest}.json"
+
+
+def git_blob_hash(fp: Path) -> str:
+    """The blob SHA `git hash-object` would give fp's content ("" on error)."""
+    try:
+        h = hashlib.sha1(b"blob %d\0" % fp.stat().st_size)
+        with open(fp, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+    except OSError:
+        return ""
+
+
+def rebase_partial(partial: dict, rel: str) -> dict:
+    """Copy of a file's partial index with every entry pointing at `rel`."""
+    return {category: [dict(entry, file=rel) for entry in entries]
+            for category, entries in partial.items()}
+
+
+class IndexCache:
+    """
+    Persistent per-repo store of each file's code-index entries.
+
+    Entries are keyed by indexer and content: the indexer's name plus the git
+    blob SHA for tracked, unmodified files, or the same blob hash computed
+    from disk otherwise (skipped while size+mtime are unchanged). A touched
+    but unchanged file is therefore never re-indexed (or re-parsed, for
+    Python), and a file whose content is already cached under another path —
+    a rename, copy or vendored duplicate — reuses those entries.
+
+    `dirty` records whether anything changed since loading; save() skips the
+    rewrite when nothing did, so a fully warm run writes nothing.
+    """
+
+    def __init__(self, path: Path, blob_shas: dict = None):
+        self.path = path
+        self.blob_shas = blob_shas or {}
+        self.files = {}
+        self.hits = 0
+        self.content_hits = 0
+        self.misses = 0
+        self.removed = 0
+        self._stats = {}
+        self._by_key = None
+        self.dirty = False
+        if path.exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_CACHE_VERSION:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError):
+                self.files = {}
+
+    @classmethod
+    def for_repo(cls, repo_path: Path, cache_dir: Path,
+                 blob_shas: dict = None) -> "IndexCache":
+        if blob_shas is None:
+            blob_shas = git_blob_shas(repo_path)
+        return cls(index_cache_path(repo_path, cache_dir), blob_shas)
+
+    def key_for(self, fp: Path, rel: str, indexer: str) -> str:
+        """Cache key "<indexer>:git:<blob sha>"; empty when the content cannot be hashed."""
+        sha = self.blob_shas.get(rel)
+        if sha:
+            return f"{indexer}:git:{sha}"
+        try:
+            st = fp.stat()
+        except OSError:
+            return ""
+        stat = self._stats[rel] = f"{st.st_size}:{st.st_mtime_ns}"
+        entry = self.files.get(rel)
+        if entry and entry.get("stat") == stat:
+            # Unchanged on disk: reuse the stored blob hash, whatever its indexer
+            return f"{indexer}:{entry['key'].partition(':')[2]}"
+        sha = git_blob_hash(fp)
+        return f"{indexer}:git:{sha}" if sha else ""
+
+    def get(self, rel: str, key: str):
+        if not key:
+            self.misses += 1
+            return None
+        entry = self.files.get(rel)
+        if entry and entry.get("key") == key:
+            self.hits += 1
+            stat = self._stats.get(rel)
+            if stat and entry.get("stat") != stat:
+                # Touched but unchanged: remember the new stat for the fast path
+                entry["stat"] = stat
+                self.dirty = True
+            return entry.get("index", {})
+        if self._by_key is None:
+            self._by_key = {e["key"]: r for r, e in self.files.items()}
+        source = self._by_key.get(key)
+        if source is not None and source != rel and self.files.get(source, {}).get("key") == key:
+            self.content_hits += 1
+            partial = rebase_partial(self.files[source].get("index", {}), rel)
+            self.put(rel, key, partial)
+            return partial
+        self.misses += 1
+        return None
+
+    def put(self, rel: str, key: str, partial: dict) -> None:
+        if key:
+            entry = {"key": key, "index": partial}
+            if rel in self._stats:
+                entry["stat"] = self._stats[rel]
+            self.files[rel] = entry
+            self.dirty = True
+            if self._by_key is not None:
+                self._by_key.setdefault(key, rel)
+
+    def retain(self, rels: set) -> None:
+        """Drop entries for files that no longer exist in the tree."""
+        stale = [rel for rel in self.files if rel not in rels]
+        for rel in stale:
+            del self.files[rel]
+        self.removed += len(stale)
+        if stale:
+            self.dirty = True
+
+    def stats(self) -> dict:
+        looked_up = self.hits + self.content_hits + self.misses
+        return {
+            "path": str(self.path),
+            "hits": self.hits,
+            "content_hits": self.content_hits,
+            "misses": self.misses,
+            "removed": self.removed,
+            "hit_rate": round((self.hits + self.content_hits) / looked_up, 4) if looked_up else 0.0,
+        }
+
+    def save(self) -> None:
+        """Write the cache if anything changed since it was loaded."""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_CACHE_VERSION, "files": self.files}, f)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+# ── Token index ─────────────────────────────────────────────────────────────────
+
+# Same per-file budget as step 3's content scoring
+TOKEN_INDEX_MAX_BYTES = 100_000
+# Bump whenever the token rules or the sidecar layout change
+TOKEN_INDEX_VERSION = 1
+
+
+class TokenIndex:
+    """
+    Inverted index of the words in source and config files, queried by step 3.
+
+    Tokens follow code_tokens.word_tokens, as step 3's do (lowercased words of 3+ characters and
+    their camelCase parts, minus stop words). Each token maps to postings
+    [file id, term frequency, distinct line numbers]; `lengths` holds every
+    file's token count for length-normalised rankers. Files are read once,
+    up to TOKEN_INDEX_MAX_BYTES each.
+
+    On disk each token's postings are one "id:tf:l1,l2;id:tf:l1" string, so
+    loading the sidecar parses no numbers and only queried tokens are decoded.
+    """
+
+    def __init__(self, files: list = None, lengths: list = None, postings: dict = None,
+                 max_bytes: int = TOKEN_INDEX_MAX_BYTES):
+        self.files = files or []
+        self.lengths = lengths or []
+        self.postings = postings or {}
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def build(cls, catalog: FileCatalog, max_bytes: int = TOKEN_INDEX_MAX_BYTES) -> "TokenIndex":
+        index = cls(max_bytes=max_bytes)
+        postings = index.postings
+        word_cache = {}
+        findall = WORD_RE.findall
+        for i in catalog.indices_with_suffix(CONTENT_EXTENSIONS):
+            entry = catalog.entry(i)
+            content = catalog.read(entry, max_bytes=max_bytes)
+            if not content:
+                continue
+            occurrences = defaultdict(list)
+            length = 0
+            for line, text in enumerate(content.split("\n"), 1):
+                for word in findall(text):
+                    tokens = word_cache.get(word)
+                    if tokens is None:
+                        tokens = word_cache[word] = word_tokens(word)
+                    length += len(tokens)
+                    for token in tokens:
+                        occurrences[token].append(line)
+            file_id = len(index.files)
+            index.files.append(entry.rel)
+            index.lengths.append(length)
+            for token, lines in occurrences.items():
+                if len(lines) > 1:
+                    postings.setdefault(token, []).append(
+                        [file_id, len(lines), list(dict.fromkeys(lines))])
+                else:
+                    postings.setdefault(token, []).append([file_id, 1, lines])
+        return index
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def postings_for(self, token: str) -> list:
+        """[[file id, tf, lines], ...] for one token (lowercase), [] if unseen."""
+        postings = self.postings.get(token)
+        if postings is None:
+            return []
+        if isinstance(postings, str):
+            postings = self.postings[token] = [
+                [int(file_id), int(tf), [int(n) for n in lines.split(",")]]
+                for file_id, tf, lines in (p.split(":") for p in postings.split(";"))]
+        return postings
+
+    def document_frequency(self, token: str) -> int:
+        """Number of files containing `token`, without decoding its postings."""
+        postings = self.postings.get(token)
+        if postings is None:
+            return 0
+        return postings.count(";") + 1 if isinstance(postings, str) else len(postings)
+
+    def to_dict(self) -> dict:
+        encoded = {}
+        for token, postings in self.postings.items():
+            if not isinstance(postings, str):
+                postings = ";".join(f"{file_id}:{tf}:{','.join(map(str, lines))}"
+                                    for file_id, tf, lines in postings)
+            encoded[token] = postings
+        return {"version": TOKEN_INDEX_VERSION, "max_bytes": self.max_bytes,
+                "files": self.files, "lengths": self.lengths, "postings": encoded}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TokenIndex":
+        return cls(data.get("files", []), data.get("lengths", []), data.get("postings", {}),
+                   data.get("max_bytes", TOKEN_INDEX_MAX_BYTES))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), separators=(",", ":")))
+
+    @classmethod
+    def load(cls, path: Path) -> "TokenIndex":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != TOKEN_INDEX_VERSION:
+            raise ValueError(f"token index version {data.get('version')} is not supported")
+        return cls.from_dict(data)
+
+
+def token_index_path_for(report_path: Path) -> Path:
+    """Sidecar file holding the TokenIndex for a given analysis report."""
+    return report_path.with_name(report_path.stem + ".tokens.json")
+
+
+def load_report_token_index(analysis_report: dict) -> TokenIndex:
+    """The token index persisted by step 1, or None if it is missing or outdated."""
+    sidecar = analysis_report.get("token_index")
+    if not sidecar or not Path(sidecar).exists():
+        return None
+    try:
+        return TokenIndex.load(Path(sidecar))
+    except (OSError, ValueError):
+        return None
+
+
 # ── Config extraction ───────────────────────────────────────────────────────────
 
-def extract_configs(repo_path: Path, all_files: list) -> dict:
+def extract_configs(catalog: FileCatalog) -> dict:
     configs = {}
     env_vars = []
-    file_names = {fp.name: fp for fp in all_files}
+    file_names = catalog.last_by_name(CONFIG_FILES)
 
     for cfg_name in CONFIG_FILES:
         if cfg_name in file_names:
-            fp = file_names[cfg_name]
-            rel = to_posix_rel(fp, repo_path)
-            content = read_file_safe(fp, max_bytes=10_000)
-            configs[rel] = content[:2000] if len(content) > 2000 else content
+            entry = file_names[cfg_name]
+            content = catalog.read(entry, max_bytes=10_000)
+            configs[entry.rel] = content[:2000] if len(content) > 2000 else content
 
             # Extract .env vars
-            if fp.name.startswith(".env"):
+            if entry.name.startswith(".env"):
                 for line in content.split("\n"):
                     line = line.strip()
                     if "=" in line and not line.startswith("#"):
@@ -485,67 +2397,314 @@ def extract_configs(repo_path: Path, all_files: list) -> dict:
 
 # ── Directory tree ──────────────────────────────────────────────────────────────
 
-def build_dir_tree(repo_path: Path, max_depth: int = 3) -> dict:
-    def recurse(path: Path, depth: int) -> dict:
-        if depth > max_depth:
-            return {}
-        node = {"type": "dir", "children": {}}
-        try:
-            entries = sorted(path.iterdir(), key=lambda p: (p.is_file(), p.name.lower()))
-        except PermissionError:
-            return node
-        for entry in entries:
-            if entry.name in SKIP_DIRS or entry.name.startswith("."):
-                continue
-            if entry.is_dir():
-                node["children"][entry.name] = recurse(entry, depth + 1)
-            else:
-                node["children"][entry.name] = {"type": "file"}
-        return node
+DIR_TREE_DEPTH = 3
+DIR_TREE_MAX_CHILDREN = 50
 
-    return recurse(repo_path, 1)
 
+def _new_dir_node() -> dict:
+    return {"type": "dir", "files": 0, "bytes": 0, "languages": defaultdict(int), "children": {}}
 
-# ── Main analysis ───────────────────────────────────────────────────────────────
 
-def analyze(repo_path: Path, logs: list) -> dict:
-    logs.append("Scanning repository files...")
-    all_files = list(walk_files(repo_path))
-    logs.append(f"Found {len(all_files)} files.")
+def _finish_dir_node(node: dict, max_children: int) -> dict:
+    """Sort children (directories first, then files), cap them and freeze counts."""
+    node["languages"] = dict(sorted(node["languages"].items(), key=lambda kv: -kv[1]))
+    children = sorted(node["children"].items(),
+                      key=lambda kv: (kv[1]["type"] == "file", kv[0].lower()))
+    if len(children) > max_children:
+        node["truncated"] = len(children) - max_children
+        children = children[:max_children]
+    node["children"] = {
+        name: _finish_dir_node(child, max_children) if child["type"] == "dir" else child
+        for name, child in children
+    }
+    return node
 
-    logs.append("Detecting languages...")
-    languages = detect_languages(repo_path, all_files)
 
-    logs.append("Detecting frameworks...")
-    frameworks = detect_frameworks(repo_path, all_files)
+def build_dir_tree(catalog: FileCatalog, max_depth: int = DIR_TREE_DEPTH,
+                   max_children: int = DIR_TREE_MAX_CHILDREN) -> dict:
+    """
+    Directory tree built in memory from the scanned file catalog.
+
+    Directories down to `max_depth` list their children (directories first,
+    at most `max_children`, with "truncated" counting the rest); directories
+    one level deeper appear with counts only. Every directory node carries
+    recursive aggregates: files, bytes and file counts per language.
+    """
+    root = _new_dir_node()
+    # dir id -> (nodes from the root down, node listing its files or None)
+    dir_paths = {}
+    for dir_id, name, code, size in zip(catalog.dir_ids, catalog.basenames,
+                                        catalog.suffix_codes, catalog.sizes):
+        size = max(size, 0)
+        lang = LANGUAGE_EXTENSIONS.get(catalog.suffixes[code])
+        cached = dir_paths.get(dir_id)
+        if cached is None:
+            d = catalog.dirs[dir_id]
+            node, depth = root, 1
+            path = [root]
+            for part in (d.split("/") if d else ()):
+                if depth > max_depth:
+                    node = None
+                    break
+                node = node["children"].setdefault(part, _new_dir_node())
+                depth += 1
+                path.append(node)
+            else:
+                if depth > max_depth:
+                    node = None
+            cached = dir_paths[dir_id] = (path, node)
+        path, node = cached
+        if node is not None:
+            node["children"][name] = {"type": "file", "bytes": size}
+        for dir_node in path:
+            dir_node["files"] += 1
+            dir_node["bytes"] += size
+            if lang:
+                dir_node["languages"][lang] += 1
+    return _finish_dir_node(root, max_children)
+
+
+# ── Phase metrics ───────────────────────────────────────────────────────────────
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (None where unsupported)."""
+    if not HAS_RESOURCE:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(rss / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
 
-    logs.append("Detecting build tools...")
-    build_tools = detect_build_tools(repo_path, all_files)
 
-    logs.append("Detecting architecture patterns...")
-    architecture = detect_architecture(repo_path, all_files)
+def cpu_seconds() -> float:
+    """User + system CPU of this process and its reaped children (index workers)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
 
-    logs.append("Building code index...")
-    code_index = build_code_index(repo_path, all_files)
 
-    logs.append("Extracting configurations...")
-    configs = extract_configs(repo_path, all_files)
+class PhaseMetrics:
+    """
+    Structured per-phase instrumentation for analyze().
+
+    Each phase records wall time, CPU time (including process-pool workers
+    once they have exited), files processed, bytes of file content read and
+    peak memory: the process's peak RSS, plus the peak of traced Python
+    allocations within the phase when trace_memory is set (tracemalloc;
+    slows the analysis down noticeably). to_dict() is stored as
+    report["metrics"]; chrome_trace() renders the same data for a trace
+    viewer (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.phases = []
+        self._origin = time.perf_counter()
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block; set counts["files"] / counts["bytes"] inside it."""
+        counts = {"files": 0, "bytes": 0}
+        if self.trace_memory and hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+            tracemalloc.reset_peak()
+        wall0, cpu0 = time.perf_counter(), cpu_seconds()
+        try:
+            yield counts
+        finally:
+            wall1, cpu1 = time.perf_counter(), cpu_seconds()
+            record = {
+                "name": name,
+                "start_s": round(wall0 - self._origin, 6),
+                "wall_s": round(wall1 - wall0, 6),
+                "cpu_s": round(cpu1 - cpu0, 6),
+                "files": counts["files"],
+                "bytes": counts["bytes"],
+                "peak_rss_mb": peak_rss_mb(),
+            }
+            if self.trace_memory:
+                record["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+            self.phases.append(record)
+
+    def close(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def to_dict(self) -> dict:
+        rss = [p["peak_rss_mb"] for p in self.phases if p["peak_rss_mb"] is not None]
+        return {
+            "memory": "rss+tracemalloc" if self.trace_memory else "rss",
+            "phases": self.phases,
+            "total": {
+                "wall_s": round(sum(p["wall_s"] for p in self.phases), 6),
+                "cpu_s": round(sum(p["cpu_s"] for p in self.phases), 6),
+                "bytes": sum(p["bytes"] for p in self.phases),
+                "peak_rss_mb": max(rss) if rss else None,
+            },
+        }
+
+
+def chrome_trace(metrics: dict, label: str = "analyze") -> dict:
+    """
+    Chrome trace-event JSON for a report's `metrics` section: one complete
+    ("X") event per phase, with its counters as args, and a peak-RSS counter
+    track.
+    """
+    pid = os.getpid()
+    events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+               "args": {"name": label}}]
+    for p in metrics.get("phases", []):
+        ts = int(p["start_s"] * 1_000_000)
+        events.append({
+            "name": p["name"], "cat": "analyze", "ph": "X", "pid": pid, "tid": 0,
+            "ts": ts, "dur": max(int(p["wall_s"] * 1_000_000), 1),
+            "args": {k: v for k, v in p.items() if k not in ("name", "start_s", "wall_s")},
+        })
+        if p.get("peak_rss_mb") is not None:
+            events.append({"name": "peak_rss_mb", "ph": "C", "pid": pid, "tid": 0,
+                           "ts": ts + int(p["wall_s"] * 1_000_000),
+                           "args": {"MB": p["peak_rss_mb"]}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path: Path, metrics: dict, label: str = "analyze") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(metrics, label), f)
+
 
-    logs.append("Detecting test setup...")
-    tests = detect_tests(repo_path, all_files)
+# ── Main analysis ───────────────────────────────────────────────────────────────
 
-    logs.append("Generating directory tree...")
-    dir_tree = build_dir_tree(repo_path)
+def analyze(repo_path: Path, logs: list, jobs: int = 1,
+            cache_dir: Path = None, walker: str = "auto",
+            catalog: FileCatalog = None, clone_info: dict = None,
+            tree_depth: int = DIR_TREE_DEPTH,
+            tree_max_children: int = DIR_TREE_MAX_CHILDREN,
+            metrics: PhaseMetrics = None, token_index_path: Path = None,
+            python_indexer: str = DEFAULT_PYTHON_INDEXER) -> dict:
+    """
+    Run the full single-repo analysis.
+
+    The repository is scanned once into a FileCatalog that every detector and
+    indexer consumes; pass `catalog` to reuse an existing scan.
+    cache_dir enables the incremental index cache: unchanged files reuse their
+    stored code-index entries and only changed/added files are re-indexed.
+    walker selects file enumeration: "git" (ls-files + cat-file), "fs"
+    (os.walk) or "auto" (git when the path is a git work tree).
+    clone_info (from clone_or_pull/checkout_repo) is stored as report["clone"].
+    tree_depth / tree_max_children shape directory_tree (see build_dir_tree).
+    python_indexer picks the Python indexer (see PYTHON_INDEXERS).
+    Every phase is timed into `metrics` (a fresh PhaseMetrics if not given)
+    and stored as report["metrics"].
+    With token_index_path, the inverted TokenIndex step 3 scores from is built
+    and written there, and its path stored as report["token_index"].
+    """
+    if metrics is None:
+        metrics = PhaseMetrics()
 
-    logs.append("Fetching git metadata...")
+    # The catalog may hold a git cat-file process and metrics may have started
+    # tracemalloc: release both even if a phase raises, since multi-repo scans
+    # carry on with the next repository
     try:
-        git_meta = get_git_metadata(repo_path)
-    except Exception as e:
-        git_meta = {"error": str(e)}
+        logs.append("Scanning repository files...")
+        if catalog is None:
+            with metrics.phase("scan") as counts:
+                catalog = FileCatalog.scan(repo_path, walker)
+                counts["files"] = len(catalog)
+        logs.append(f"Found {len(catalog)} files"
+                    f"{' (via git ls-files)' if catalog.walker == 'git' else ''}.")
+
+        logs.append("Detecting languages...")
+        with metrics.phase("languages") as counts:
+            languages = detect_languages(catalog)
+            counts["files"] = len(catalog)
+
+        logs.append("Detecting frameworks...")
+        with metrics.phase("frameworks") as counts:
+            read_before = catalog.bytes_read
+            frameworks = detect_frameworks(catalog)
+            counts["files"] = len(catalog)
+            counts["bytes"] = catalog.bytes_read - read_before
+
+        logs.append("Detecting build tools...")
+        with metrics.phase("build_tools") as counts:
+            build_tools = detect_build_tools(catalog)
+            counts["files"] = len(catalog)
+
+        logs.append("Detecting architecture patterns...")
+        with metrics.phase("architecture") as counts:
+            architecture = detect_architecture(catalog)
+            counts["files"] = len(catalog)
+
+        jobs = resolve_jobs(jobs)
+        logs.append(f"Building code index ({jobs} job{'s' if jobs != 1 else ''})...")
+        with metrics.phase("code_index") as counts:
+            cache = IndexCache.for_repo(repo_path, cache_dir, catalog.blob_shas) if cache_dir else None
+            code_index = build_code_index(catalog, jobs=jobs, cache=cache, stats=counts,
+                                          python_indexer=python_indexer)
+            cache_stats = {"enabled": False}
+            if cache is not None:
+                try:
+                    cache.save()
+                except OSError as e:
+                    logs.append(f"[WARN] Could not write index cache: {e}")
+                cache_stats = {"enabled": True, **cache.stats()}
+                logs.append(f"Index cache: {cache.hits} hit(s), {cache.content_hits} by content, "
+                            f"{cache.misses} miss(es), "
+                            f"{cache.removed} removed (hit rate {cache_stats['hit_rate']:.0%}).")
+
+        token_index_file = None
+        if token_index_path is not None:
+            logs.append("Building token index...")
+            with metrics.phase("token_index") as counts:
+                read_before = catalog.bytes_read
+                token_index = TokenIndex.build(catalog)
+                counts["files"] = len(token_index)
+                counts["bytes"] = catalog.bytes_read - read_before
+                try:
+                    token_index.save(token_index_path)
+                    token_index_file = str(token_index_path.resolve())
+                    logs.append(f"Token index: {len(token_index.postings)} token(s) "
+                                f"over {len(token_index)} file(s).")
+                except OSError as e:
+                    logs.append(f"[WARN] Could not write token index: {e}")
+                del token_index
+
+        logs.append("Extracting configurations...")
+        with metrics.phase("configs") as counts:
+            read_before = catalog.bytes_read
+            configs = extract_configs(catalog)
+            counts["files"] = len(configs["config_files"])
+            counts["bytes"] = catalog.bytes_read - read_before
+        # Nothing reads file contents after this point
+        catalog.close()
+
+        logs.append("Detecting test setup...")
+        with metrics.phase("tests") as counts:
+            tests = detect_tests(catalog)
+            counts["files"] = len(catalog)
+
+        logs.append("Generating directory tree...")
+        with metrics.phase("directory_tree") as counts:
+            dir_tree = build_dir_tree(catalog, tree_depth, tree_max_children)
+            counts["files"] = len(catalog)
+
+        logs.append("Fetching git metadata...")
+        with metrics.phase("git_metadata"):
+            try:
+                git_meta = get_git_metadata(repo_path)
+            except Exception as e:
+                git_meta = {"error": str(e)}
+    finally:
+        if catalog is not None:
+            catalog.close()
+        metrics.close()
 
     report = {
         "repo_path": str(repo_path),
-        "total_files": len(all_files),
+        "total_files": len(catalog),
         "languages": languages,
         "frameworks": frameworks,
         "build_tools": build_tools,
@@ -555,6 +2714,7 @@ def analyze(repo_path: Path, logs: list) -> dict:
         "tests": tests,
         "directory_tree": dir_tree,
         "git": git_meta,
+        "index_cache": cache_stats,
         "stats": {
             "total_classes": len(code_index.get("classes", [])),
             "total_functions": len(code_index.get("functions", [])),
@@ -563,7 +2723,12 @@ def analyze(repo_path: Path, logs: list) -> dict:
             "total_interfaces": len(code_index.get("interfaces", [])),
             "test_files": tests.get("test_file_count", 0),
         },
+        "metrics": metrics.to_dict(),
     }
+    if token_index_file is not None:
+        report["token_index"] = token_index_file
+    if clone_info is not None:
+        report["clone"] = clone_info
     return report
 
 
@@ -577,6 +2742,41 @@ def remove_repo(repo_path: Path, logs: list) -> None:
         logs.append(f"[WARN] Could not remove {repo_path}: {e}")
 
 
+def checkout_repo(repo_url: str, username: str, password: str, branch: str,
+                  workspace: Path, mirror_cache=None, clone_options: dict = None) -> tuple:
+    """
+    Get a working copy of repo_url under workspace.
+
+    Returns (repo_path, logs, worktree, clone_info) — worktree is True when the
+    copy is a detached worktree of the MirrorCache mirror rather than a
+    standalone clone.
+    """
+    logs = []
+    if mirror_cache is not None:
+        repo_name = repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+        repo_path = mirror_cache.add_worktree(
+            repo_url, build_auth_url(repo_url, username, password),
+            workspace / repo_name, branch, logs, secret=password,
+        )
+        if repo_path is not None:
+            return repo_path, logs, True, {"strategy": "mirror-worktree", "objects_bytes": None}
+    repo_path, clone_logs, clone_info = clone_or_pull(
+        repo_url, username, password, workspace, branch,
+        mirror_cache=mirror_cache, clone_options=clone_options,
+    )
+    logs.extend(clone_logs)
+    return repo_path, logs, False, clone_info
+
+
+def release_repo(repo_url: str, repo_path: Path, worktree: bool, mirror_cache,
+                 logs: list) -> None:
+    """Undo checkout_repo: drop the worktree, or remove the standalone clone."""
+    if worktree:
+        mirror_cache.remove_worktree(repo_url, repo_path, logs)
+    else:
+        remove_repo(repo_path, logs)
+
+
 def analyze_single(
     repo_url: str,
     username: str,
@@ -585,50 +2785,101 @@ def analyze_single(
     workspace: Path,
     cleanup: bool = True,
     local_path: str = None,
+    jobs: int = 1,
+    cache_dir: Path = None,
+    walker: str = "auto",
+    mirror_cache=None,
+    clone_options: dict = None,
+    tree_depth: int = DIR_TREE_DEPTH,
+    tree_max_children: int = DIR_TREE_MAX_CHILDREN,
+    python_indexer: str = DEFAULT_PYTHON_INDEXER,
 ) -> dict:
-    """Clone (or use local path), analyze, optionally remove. Returns report dict."""
-    logs = []
+    """
+    Clone (or use local path), analyze, optionally remove. Returns report dict.
+
+    With a MirrorCache the repo is checked out as a detached worktree of its
+    cached bare mirror and cleanup removes only the worktree.
+    """
+    worktree = False
+    clone_info = None
     if local_path:
+        logs = []
         repo_path = Path(local_path)
         if not repo_path.exists():
             raise FileNotFoundError(f"Path not found: {repo_path}")
         logs.append(f"Analyzing local path: {repo_path}")
     else:
-        repo_path, clone_logs = clone_or_pull(repo_url, username, password, workspace, branch)
-        logs.extend(clone_logs)
+        repo_path, logs, worktree, clone_info = checkout_repo(
+            repo_url, username, password, branch, workspace, mirror_cache, clone_options,
+        )
 
-    report = analyze(repo_path, logs)
+    report = analyze(repo_path, logs, jobs=jobs, cache_dir=cache_dir, walker=walker,
+                     clone_info=clone_info, tree_depth=tree_depth,
+                     tree_max_children=tree_max_children, python_indexer=python_indexer)
     report["logs"] = logs
 
     if cleanup and not local_path:
-        remove_repo(repo_path, logs)
+        release_repo(repo_url, repo_path, worktree, mirror_cache, logs)
 
     return report
 
 
-def multi_repo_scan(
+def _analyze_checkout(task: tuple) -> dict:
+    """Process-pool worker for the pipelined scan: analyze one checked-out repo."""
+    (repo_path, logs, cache_dir, walker, clone_info,
+     tree_depth, tree_max_children, python_indexer) = task
+    report = analyze(Path(repo_path), logs, jobs=1,
+                     cache_dir=Path(cache_dir) if cache_dir else None, walker=walker,
+                     clone_info=clone_info, tree_depth=tree_depth,
+                     tree_max_children=tree_max_children, python_indexer=python_indexer)
+    report["logs"] = logs
+    return report
+
+
+def repo_identity(repo: dict, branch: str) -> tuple:
+    """(clone_url, name, branch) for one entry of a discovered repos list."""
+    repo_url = repo.get("clone_url", "")
+    repo_name = repo.get("name", repo_url.split("/")[-1].replace(".git", ""))
+    return repo_url, repo_name, repo.get("default_branch", branch)
+
+
+def repo_summary_line(report: dict) -> str:
+    return (f"Files: {report['total_files']}, "
+            f"Classes: {report['stats']['total_classes']}, "
+            f"Functions: {report['stats']['total_functions']}, "
+            f"Endpoints: {report['stats']['total_api_endpoints']}")
+
+
+def serial_repo_scan(
     repos: list,
     username: str,
     password: str,
     branch: str,
     workspace: Path,
-    output_path: Path,
     cleanup: bool = True,
-) -> dict:
+    jobs: int = 1,
+    cache_dir: Path = None,
+    walker: str = "auto",
+    mirror_cache=None,
+    checkpoint=None,
+    writer=None,
+    clone_options: dict = None,
+    tree_depth: int = DIR_TREE_DEPTH,
+    tree_max_children: int = DIR_TREE_MAX_CHILDREN,
+    python_indexer: str = DEFAULT_PYTHON_INDEXER,
+) -> tuple:
     """
-    Iterate repos list, clone→analyze→remove each repo.
+    Clone→analyze→remove one repo at a time. Returns (results, failed).
 
-    repos: list of dicts with at least { "clone_url": str, "name": str }
-    Returns aggregated multi_analysis_report dict.
+    With a JsonlReportWriter each report is streamed out and only its summary
+    entry is kept in `results`.
     """
     results = []
     total = len(repos)
     failed = []
 
     for idx, repo in enumerate(repos, 1):
-        repo_url = repo.get("clone_url", "")
-        repo_name = repo.get("name", repo_url.split("/")[-1].replace(".git", ""))
-        repo_branch = repo.get("default_branch", branch)
+        repo_url, repo_name, repo_branch = repo_identity(repo, branch)
 
         print(f"\n[{idx}/{total}] Processing: {repo_name} ({repo_url})")
 
@@ -640,20 +2891,157 @@ def multi_repo_scan(
                 branch=repo_branch,
                 workspace=workspace,
                 cleanup=cleanup,
+                jobs=jobs,
+                cache_dir=cache_dir,
+                walker=walker,
+                mirror_cache=mirror_cache,
+                clone_options=clone_options,
+                tree_depth=tree_depth,
+                tree_max_children=tree_max_children,
+                python_indexer=python_indexer,
             )
             report["repo_name"] = repo_name
             report["repo_url"] = repo_url
-            results.append(report)
-            print(f"  [OK] Files: {report['total_files']}, "
-                  f"Classes: {report['stats']['total_classes']}, "
-                  f"Functions: {report['stats']['total_functions']}, "
-                  f"Endpoints: {report['stats']['total_api_endpoints']}")
+            print(f"  [OK] {repo_summary_line(report)}")
+            if checkpoint is not None:
+                checkpoint.save(report, repo_branch)
+            results.append(writer.write(report) if writer is not None else report)
         except Exception as e:
             print(f"  [ERROR] {e}", file=sys.stderr)
             failed.append({"repo_name": repo_name, "repo_url": repo_url, "error": str(e)})
 
-    # Aggregate totals
-    agg = {
+    return results, failed
+
+
+def pipelined_repo_scan(
+    repos: list,
+    username: str,
+    password: str,
+    branch: str,
+    workspace: Path,
+    cleanup: bool = True,
+    cache_dir: Path = None,
+    walker: str = "auto",
+    mirror_cache=None,
+    clone_concurrency: int = 2,
+    analyze_jobs: int = 2,
+    max_in_flight: int = None,
+    checkpoint=None,
+    writer=None,
+    clone_options: dict = None,
+    tree_depth: int = DIR_TREE_DEPTH,
+    tree_max_children: int = DIR_TREE_MAX_CHILDREN,
+    python_indexer: str = DEFAULT_PYTHON_INDEXER,
+) -> tuple:
+    """
+    Overlap network-bound cloning with CPU-bound analysis.
+
+    Clones/fetches run in a thread pool of `clone_concurrency`, analyze() runs
+    in a process pool of `analyze_jobs` (per-repo indexing stays serial inside
+    each worker). At most `max_in_flight` repos are checked out at once —
+    default clone_concurrency + analyze_jobs — so disk usage stays bounded.
+    Returns (results, failed), both in the order of `repos`.
+    """
+    total = len(repos)
+    max_in_flight = max_in_flight or (clone_concurrency + analyze_jobs)
+    reports = {}
+    failures = {}
+    checkouts = {}      # idx -> (repo_path, worktree)
+    checkout_dirs = {}  # idx -> checkout directory reserved for that repo
+    pending = {}        # future -> (stage, idx)
+    queue = list(enumerate(repos, 1))
+    queue.reverse()
+
+    # Workers must not be fork()ed from this process while clone threads have
+    # git subprocesses running: a forked child inherits their pipes and the
+    # clone never sees EOF. forkserver/spawn start workers from a clean process.
+    methods = multiprocessing.get_all_start_methods()
+    mp_context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    clone_pool = ThreadPoolExecutor(max_workers=clone_concurrency)
+    try:
+        analyze_pool = ProcessPoolExecutor(max_workers=analyze_jobs, mp_context=mp_context)
+    except (OSError, NotImplementedError):
+        # No usable process pool on this host — analysis still overlaps cloning
+        analyze_pool = ThreadPoolExecutor(max_workers=analyze_jobs)
+
+    def fail(idx, e):
+        repo_url, repo_name, _ = repo_identity(repos[idx - 1], branch)
+        print(f"[{idx}/{total}] [ERROR] {repo_name}: {e}", file=sys.stderr)
+        failures[idx] = {"repo_name": repo_name, "repo_url": repo_url, "error": str(e)}
+
+    try:
+        while queue or pending:
+            while queue and len(checkouts) + sum(
+                    1 for st, _ in pending.values() if st == "clone") < max_in_flight:
+                idx, repo = queue.pop()
+                repo_url, repo_name, repo_branch = repo_identity(repo, branch)
+                print(f"[{idx}/{total}] Cloning: {repo_name} ({repo_url})")
+                # Two repos with the same name must not share a checkout dir
+                dir_name = repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+                repo_ws = workspace
+                if workspace / dir_name in checkout_dirs.values():
+                    repo_ws = workspace / ".pipeline" / str(idx)
+                checkout_dirs[idx] = repo_ws / dir_name
+                fut = clone_pool.submit(checkout_repo, repo_url, username, password,
+                                        repo_branch, repo_ws, mirror_cache, clone_options)
+                pending[fut] = ("clone", idx)
+
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, idx = pending.pop(fut)
+                repo_url, repo_name, repo_branch = repo_identity(repos[idx - 1], branch)
+                if stage == "clone":
+                    try:
+                        repo_path, logs, worktree, clone_info = fut.result()
+                    except Exception as e:
+                        fail(idx, e)
+                        del checkout_dirs[idx]
+                        continue
+                    checkouts[idx] = (repo_path, worktree)
+                    print(f"[{idx}/{total}] Analyzing: {repo_name}")
+                    task = (str(repo_path), logs, str(cache_dir) if cache_dir else None, walker,
+                            clone_info, tree_depth, tree_max_children, python_indexer)
+                    pending[analyze_pool.submit(_analyze_checkout, task)] = ("analyze", idx)
+                elif stage == "analyze":
+                    try:
+                        report = fut.result()
+                        report["repo_name"] = repo_name
+                        report["repo_url"] = repo_url
+                        print(f"[{idx}/{total}] [OK] {repo_name} — {repo_summary_line(report)}")
+                        if checkpoint is not None:
+                            checkpoint.save(report, repo_branch)
+                        reports[idx] = writer.write(report) if writer is not None else report
+                    except Exception as e:
+                        fail(idx, e)
+                    repo_path, worktree = checkouts[idx]
+                    if cleanup:
+                        logs = reports[idx].get("logs", []) if idx in reports else []
+                        pending[clone_pool.submit(release_repo, repo_url, repo_path, worktree,
+                                                  mirror_cache, logs)] = ("cleanup", idx)
+                    else:
+                        del checkouts[idx]
+                        del checkout_dirs[idx]
+                else:
+                    del checkouts[idx]
+                    repo_ws = checkout_dirs.pop(idx).parent
+                    if repo_ws != workspace:
+                        for d in (repo_ws, repo_ws.parent):
+                            try:
+                                d.rmdir()
+                            except OSError:
+                                break
+    finally:
+        clone_pool.shutdown(wait=True)
+        analyze_pool.shutdown(wait=True)
+
+    results = [reports[i] for i in sorted(reports)]
+    failed = [failures[i] for i in sorted(failures)]
+    return results, failed
+
+
+def aggregate_scan(results: list, failed: list, total: int) -> dict:
+    """Build the multi_analysis_report dict from per-repo reports."""
+    return {
         "scan_type": "multi_repo",
         "total_repos_attempted": total,
         "total_repos_succeeded": len(results),
@@ -670,13 +3058,293 @@ def multi_repo_scan(
         },
     }
 
+
+# ── Scan checkpoints ────────────────────────────────────────────────────────────
+
+def checkpoint_dir_for(output_path: Path) -> Path:
+    """Default checkpoint directory for a multi-repo report: `<stem>.checkpoints/`."""
+    return output_path.with_name(output_path.stem + ".checkpoints")
+
+
+def remote_head(repo_url: str, username: str, password: str, branch: str) -> str:
+    """
+    Commit a fresh checkout of `branch` would land on, from one `git ls-remote`.
+
+    Falls back to the remote HEAD when the branch does not exist, as
+    clone_or_pull does. Returns "" if the remote cannot be reached.
+    """
+    auth_url = build_auth_url(repo_url, username, password)
+    try:
+        r = subprocess.run(["git", "ls-remote", auth_url, "HEAD", f"refs/heads/{branch}"],
+                           capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    if r.returncode != 0:
+        return ""
+    refs = {}
+    for line in r.stdout.splitlines():
+        sha, _, ref = line.partition("\t")
+        refs[ref.strip()] = sha.strip()
+    return refs.get(f"refs/heads/{branch}") or refs.get("HEAD", "")
+
+
+class ScanCheckpoint:
+    """
+    One JSON file per successfully analyzed repo, written as soon as the repo
+    finishes, so an interrupted multi-repo scan can resume where it stopped.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, repo_url: str, branch: str) -> Path:
+        name = repo_url.rstrip("/").split("/")[-1].replace(".git", "") or "repo"
+        key = hashlib.sha1(f"{repo_url.rstrip('/')}#{branch}".encode("utf-8")).hexdigest()[:12]
+        return self.root / f"{name}-{key}.json"
+
+    def save(self, report: dict, branch: str) -> None:
+        path = self.path_for(report["repo_url"], branch)
+        tmp = path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(report, f)
+            os.replace(tmp, path)
+            # Commit sidecar: --resume checks it without parsing the report
+            path.with_suffix(".head").write_text(self.head_of(report), encoding="utf-8")
+        except OSError as e:
+            print(f"[WARN] Could not write checkpoint {path}: {e}", file=sys.stderr)
+
+    def load(self, repo_url: str, branch: str) -> dict:
+        try:
+            with open(self.path_for(repo_url, branch), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def head(self, repo_url: str, branch: str) -> str:
+        """HEAD commit the checkpoint was taken at ("" if there is none)."""
+        path = self.path_for(repo_url, branch)
+        if not path.exists():
+            return ""
+        try:
+            return path.with_suffix(".head").read_text(encoding="utf-8").strip()
+        except OSError:
+            report = self.load(repo_url, branch)
+            return self.head_of(report) if report else ""
+
+    @staticmethod
+    def head_of(report: dict) -> str:
+        return (report.get("git") or {}).get("head_commit", "")
+
+
+def resume_from_checkpoints(repos: list, checkpoint: ScanCheckpoint, username: str,
+                            password: str, branch: str, workers: int = 4) -> dict:
+    """
+    Positions in `repos` whose checkpoint is still current, mapped to its commit.
+
+    A checkpoint is reused only if the remote branch still points at the
+    commit it was analyzed at; the remotes are queried in parallel.
+    """
+    candidates = {}
+    for pos, repo in enumerate(repos):
+        repo_url, _, repo_branch = repo_identity(repo, branch)
+        head = checkpoint.head(repo_url, repo_branch)
+        if head:
+            candidates[pos] = (head, repo_url, repo_branch)
+    if not candidates:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        heads = pool.map(lambda c: remote_head(c[1], username, password, c[2]),
+                         candidates.values())
+        return {
+            pos: head
+            for (pos, (head, _, _)), remote in zip(candidates.items(), heads)
+            if remote and remote == head
+        }
+
+
+# ── Streaming reports ───────────────────────────────────────────────────────────
+
+REPORT_SUMMARY_KEYS = ("repo_name", "repo_url", "total_files", "languages", "frameworks", "stats")
+
+
+def reports_path_for(output_path: Path) -> Path:
+    """JSONL file holding the full per-repo reports of a streamed scan."""
+    return output_path.with_suffix(".jsonl")
+
+
+class JsonlReportWriter:
+    """
+    Streams repo reports to a JSONL file, one line per repo, as they finish.
+
+    Only a small summary entry per repo stays in memory; it records the byte
+    offset and length of the repo's line so a single report can be read back
+    without parsing the rest of the file (see load_repo_report).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "wb")
+
+    def write(self, report: dict) -> dict:
+        line = json.dumps(report).encode("utf-8") + b"\n"
+        offset = self._f.tell()
+        self._f.write(line)
+        self._f.flush()
+        entry = {k: report[k] for k in REPORT_SUMMARY_KEYS if k in report}
+        entry["head_commit"] = ScanCheckpoint.head_of(report)
+        entry["offset"] = offset
+        entry["length"] = len(line)
+        return entry
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_streamed_report(reports_file: Path, entry: dict) -> dict:
+    """Read the one JSONL line a summary entry points at."""
+    with open(reports_file, "rb") as f:
+        f.seek(entry["offset"])
+        return json.loads(f.read(entry["length"]))
+
+
+def load_repo_report(summary_path: Path, repo: str) -> dict:
+    """
+    Full report of one repo (by name or clone URL) from a streamed multi-repo
+    scan. Only the summary file and that repo's JSONL line are read.
+    """
+    summary_path = Path(summary_path)
+    with open(summary_path, encoding="utf-8") as f:
+        summary = json.load(f)
+    if summary.get("format") != "jsonl":
+        for report in summary.get("repos", []):
+            if repo in (report.get("repo_name"), report.get("repo_url")):
+                return report
+        raise KeyError(f"Repo not in report: {repo}")
+    for entry in summary.get("repos", []):
+        if repo in (entry.get("repo_name"), entry.get("repo_url")):
+            reports_file = Path(summary["reports_file"])
+            if not reports_file.is_absolute():
+                reports_file = summary_path.parent / reports_file
+            return read_streamed_report(reports_file, entry)
+    raise KeyError(f"Repo not in report: {repo}")
+
+
+def multi_repo_scan(
+    repos: list,
+    username: str,
+    password: str,
+    branch: str,
+    workspace: Path,
+    output_path: Path,
+    cleanup: bool = True,
+    jobs: int = 1,
+    cache_dir: Path = None,
+    walker: str = "auto",
+    mirror_cache=None,
+    clone_concurrency: int = 1,
+    analyze_jobs: int = 1,
+    checkpoint_dir: Path = None,
+    resume: bool = False,
+    stream: bool = False,
+    clone_options: dict = None,
+    tree_depth: int = DIR_TREE_DEPTH,
+    tree_max_children: int = DIR_TREE_MAX_CHILDREN,
+    python_indexer: str = DEFAULT_PYTHON_INDEXER,
+) -> dict:
+    """
+    Iterate repos list, clone→analyze→remove each repo.
+
+    Pass a MirrorCache to fetch into persistent bare mirrors and analyze
+    worktrees instead of re-cloning every repository on every scan. With
+    clone_concurrency or analyze_jobs above 1 the repos go through the
+    pipelined scheduler (pipelined_repo_scan) instead of one at a time.
+
+    Every finished repo report is checkpointed to `checkpoint_dir` (default
+    `<output stem>.checkpoints/`). With resume=True, repos whose checkpoint
+    was taken at the commit their branch still points to are not re-cloned
+    or re-analyzed; their reports come straight from the checkpoints.
+
+    With stream=True, full reports go to `<output stem>.jsonl` one line per
+    repo as they complete, and output_path gets only the aggregate plus a
+    summary entry (with byte offset/length) per repo — see load_repo_report.
+
+    repos: list of dicts with at least { "clone_url": str, "name": str }
+    Returns aggregated multi_analysis_report dict.
+    """
+    total = len(repos)
+    checkpoint = ScanCheckpoint(checkpoint_dir or checkpoint_dir_for(output_path))
+
+    writer = JsonlReportWriter(reports_path_for(output_path)) if stream else None
+
+    reused = {}
+    if resume:
+        unchanged = resume_from_checkpoints(repos, checkpoint, username, password, branch,
+                                            workers=max(4, clone_concurrency))
+        for pos in sorted(unchanged):
+            repo_url, repo_name, repo_branch = repo_identity(repos[pos], branch)
+            report = checkpoint.load(repo_url, repo_branch)
+            if report is None:
+                continue
+            print(f"[{pos + 1}/{total}] [SKIP] {repo_name} "
+                  f"— unchanged at {unchanged[pos][:10]}, using checkpoint")
+            reused[pos] = writer.write(report) if writer is not None else report
+        print(f"[INFO] Resuming: {len(reused)} of {total} repos unchanged since their checkpoint.")
+    todo = [repo for pos, repo in enumerate(repos) if pos not in reused]
+
+    if clone_concurrency > 1 or analyze_jobs > 1:
+        print(f"[INFO] Pipelined scan: {clone_concurrency} clone worker(s), "
+              f"{analyze_jobs} analysis worker(s).")
+        results, failed = pipelined_repo_scan(
+            todo, username, password, branch, workspace,
+            cleanup=cleanup, cache_dir=cache_dir, walker=walker,
+            mirror_cache=mirror_cache, clone_concurrency=clone_concurrency,
+            analyze_jobs=analyze_jobs, checkpoint=checkpoint, writer=writer,
+            clone_options=clone_options, tree_depth=tree_depth,
+            tree_max_children=tree_max_children, python_indexer=python_indexer,
+        )
+    else:
+        results, failed = serial_repo_scan(
+            todo, username, password, branch, workspace,
+            cleanup=cleanup, jobs=jobs, cache_dir=cache_dir, walker=walker,
+            mirror_cache=mirror_cache, checkpoint=checkpoint, writer=writer,
+            clone_options=clone_options, tree_depth=tree_depth,
+            tree_max_children=tree_max_children, python_indexer=python_indexer,
+        )
+
+    if reused:
+        # Merge checkpointed and fresh reports back into discovery order
+        order = {repo_identity(repo, branch)[:2]: pos for pos, repo in enumerate(repos)}
+        results = sorted(
+            list(reused.values()) + results,
+            key=lambda r: order.get((r.get("repo_url"), r.get("repo_name")), total),
+        )
+
+    agg = aggregate_scan(results, failed, total)
+    if writer is not None:
+        writer.close()
+        agg["format"] = "jsonl"
+        agg["reports_file"] = str(writer.path.resolve())
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(agg, f, indent=2)
 
     print(f"\n[OK] Multi-repo scan complete.")
-    print(f"     Repos: {len(results)} succeeded, {len(failed)} failed.")
+    print(f"     Repos: {len(results)} succeeded, {len(failed)} failed"
+          f"{f' ({len(reused)} from checkpoints)' if reused else ''}.")
     print(f"     Report saved to {output_path}")
+    if writer is not None:
+        print(f"     Per-repo reports streamed to {writer.path}")
 
     return agg
 
@@ -725,6 +3393,61 @@ def main():
     parser.add_argument("--workspace-dir", help="Workspace directory")
     parser.add_argument("--output", default="analysis_report.json", help="Output JSON path")
     parser.add_argument("--local-path", help="Skip clone, analyze existing local path (repo root or workspace dir)")
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="Worker processes for code indexing (0 = all CPUs, default: 1)"
+    )
+    parser.add_argument(
+        "--cache-dir", default=str(CACHE_DIR),
+        help="Directory for the incremental index cache (default: ./cache)"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Re-index every file and do not read or write the index cache"
+    )
+    parser.add_argument(
+        "--walker", choices=["auto", "git", "fs"], default="auto",
+        help="File enumeration: git ls-files/cat-file, os.walk, or auto (git when available)"
+    )
+    parser.add_argument(
+        "--tree-depth", type=int, default=DIR_TREE_DEPTH,
+        help=f"Directory levels listed in directory_tree (default: {DIR_TREE_DEPTH})"
+    )
+    parser.add_argument(
+        "--tree-max-children", type=int, default=DIR_TREE_MAX_CHILDREN,
+        help=f"Max entries listed per directory in directory_tree (default: {DIR_TREE_MAX_CHILDREN})"
+    )
+    parser.add_argument(
+        "--python-indexer", choices=sorted(PYTHON_INDEXERS), default=DEFAULT_PYTHON_INDEXER,
+        help="Python indexer: ast (methods, nesting, decorators, end_line) or regex "
+             "(top-level only, 4-7x faster) (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--trace-out",
+        help="Also write the per-phase metrics as a Chrome trace JSON (single-repo mode)"
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="Record per-phase peak Python allocations with tracemalloc (single-repo mode, slower)"
+    )
+    parser.add_argument(
+        "--token-index", action="store_true",
+        help="Also build the inverted token index step 3 scores file contents from, "
+             "written next to --output as <stem>.tokens.json (single-repo mode)"
+    )
+    parser.add_argument(
+        "--clone-strategy", choices=["full", "fast"], default="full",
+        help="full: --depth 50 clone; fast: analysis-only --depth 1 --single-branch --no-tags"
+    )
+    parser.add_argument(
+        "--blob-limit",
+        help="With --clone-strategy fast --sparse: partial clone, --filter=blob:limit=<size> "
+             "(e.g. 1m); a full checkout would fetch the filtered blobs again"
+    )
+    parser.add_argument(
+        "--sparse", action="store_true",
+        help="With --clone-strategy fast: sparse-checkout only the file types analysis reads"
+    )
 
     # ── Multi-repo scan ──────────────────────────────────────────────────────────
     parser.add_argument(
@@ -747,8 +3470,48 @@ def main():
         "--multi-output", default="multi_analysis_report.json",
         help="Output JSON path for multi-repo scan"
     )
+    parser.add_argument(
+        "--clone-concurrency", type=int, default=1,
+        help="Parallel clone/fetch workers for --multi-repo (default: 1)"
+    )
+    parser.add_argument(
+        "--analyze-jobs", type=int, default=1,
+        help="Parallel analysis processes for --multi-repo; >1 (or clone concurrency >1) "
+             "pipelines cloning with analysis (default: 1)"
+    )
+    parser.add_argument(
+        "--multi-format", choices=["json", "jsonl"], default="json",
+        help="json: one report with every repo inline; jsonl: stream each repo report to "
+             "<multi-output stem>.jsonl and keep only summaries + offsets in --multi-output"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Skip repos whose checkpoint is still at their branch's current commit"
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        help="Per-repo checkpoint directory for --multi-repo (default: <multi-output stem>.checkpoints)"
+    )
+    parser.add_argument(
+        "--mirror-cache", action="store_true",
+        help="Keep a persistent bare mirror per repo; fetch + worktree instead of re-cloning"
+    )
+    parser.add_argument(
+        "--mirror-dir",
+        help="Mirror cache directory (default: <workspace>/.mirrors)"
+    )
+    parser.add_argument(
+        "--mirror-max-gb", type=float, default=20.0,
+        help="Size cap for the mirror cache; LRU mirrors are evicted above it (default: 20)"
+    )
 
     args = parser.parse_args()
+    if args.mirror_cache and (args.clone_strategy == "fast" or args.blob_limit or args.sparse):
+        parser.error("--mirror-cache cannot be combined with --clone-strategy fast, "
+                     "--blob-limit or --sparse (mirror clones borrow every object from the mirror)")
+    if args.blob_limit and not args.sparse:
+        parser.error("--blob-limit needs --sparse: a full checkout fetches every filtered "
+                     "blob again on demand, so the filter would save nothing")
 
     config = load_config()
     # Support both new unified keys and old bitbucket-specific keys for backward compat
@@ -761,6 +3524,16 @@ def main():
     branch = (args.branch or
               config.get("git_branch", config.get("bitbucket_branch", "main")))
     workspace = Path(args.workspace_dir or config.get("workspace_dir", str(Path.home() / "dev-workspace")))
+    cache_dir = None if args.no_cache else Path(args.cache_dir)
+    clone_options = {"strategy": args.clone_strategy, "blob_limit": args.blob_limit,
+                     "sparse": args.sparse}
+    mirror_cache = None
+    if args.mirror_cache:
+        from mirror_cache import MirrorCache
+        mirror_cache = MirrorCache(
+            Path(args.mirror_dir) if args.mirror_dir else workspace / ".mirrors",
+            max_bytes=int(args.mirror_max_gb * 1024 ** 3),
+        )
 
     # ── Multi-repo mode ──────────────────────────────────────────────────────────
     if args.multi_repo:
@@ -791,11 +3564,25 @@ def main():
             workspace=workspace,
             output_path=Path(args.multi_output),
             cleanup=not args.no_cleanup,
+            jobs=args.jobs,
+            cache_dir=cache_dir,
+            walker=args.walker,
+            mirror_cache=mirror_cache,
+            clone_concurrency=max(1, args.clone_concurrency),
+            analyze_jobs=max(1, args.analyze_jobs),
+            checkpoint_dir=Path(args.checkpoint_dir) if args.checkpoint_dir else None,
+            resume=args.resume,
+            stream=args.multi_format == "jsonl",
+            clone_options=clone_options,
+            tree_depth=args.tree_depth,
+            tree_max_children=args.tree_max_children,
+            python_indexer=args.python_indexer,
         )
         return
 
     # ── Single-repo mode (original behaviour) ───────────────────────────────────
     logs = []
+    clone_info = None
 
     if args.local_path:
         repo_path = Path(args.local_path)
@@ -808,18 +3595,41 @@ def main():
         if not repo_url:
             print("[ERROR] Repository URL required. Run step_0_setup.py first.", file=sys.stderr)
             sys.exit(1)
-        repo_path, clone_logs = clone_or_pull(repo_url, username, password, workspace, branch)
+        repo_path, clone_logs, clone_info = clone_or_pull(
+            repo_url, username, password, workspace, branch,
+            mirror_cache=mirror_cache, clone_options=clone_options,
+        )
         logs.extend(clone_logs)
 
-    report = analyze(repo_path, logs)
-    report["logs"] = logs
+    metrics = PhaseMetrics(trace_memory=args.trace_memory)
+    with metrics.phase("scan") as counts:
+        catalog = FileCatalog.scan(repo_path, args.walker)
+        counts["files"] = len(catalog)
+    report = analyze(repo_path, logs, jobs=args.jobs, cache_dir=cache_dir,
+                     catalog=catalog, clone_info=clone_info,
+                     tree_depth=args.tree_depth, tree_max_children=args.tree_max_children,
+                     python_indexer=args.python_indexer, metrics=metrics,
+                     token_index_path=token_index_path_for(Path(args.output))
+                     if args.token_index else None)
 
     output_path = Path(args.output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Persist the scan so step 3 can score files without re-walking the repo
+    catalog_path = catalog_path_for(output_path)
+    try:
+        catalog.save(catalog_path)
+        report["file_catalog"] = str(catalog_path.resolve())
+    except OSError as e:
+        logs.append(f"[WARN] Could not write file catalog: {e}")
+    report["logs"] = logs
+
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2)
 
     print(f"[OK] Analysis report saved to {output_path}")
+    if args.trace_out:
+        write_chrome_trace(Path(args.trace_out), report["metrics"], repo_path.name)
+        print(f"     Phase trace saved to {args.trace_out}")
     print(f"     Files: {report['total_files']}, "
           f"Classes: {report['stats']['total_classes']}, "
           f"Functions: {report['stats']['total_functions']}, "
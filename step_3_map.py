@@ -4,62 +4,39 @@ Step 3: Map Requirements to Code Changes
 Extracts keywords from Jira ticket and scores code elements for relevance.
 """
 import argparse
+import heapq
 import json
+import math
 import re
 import sys
 from collections import defaultdict
 from pathlib import Path
 
+from code_tokens import CONTENT_EXTENSIONS, WORD_RE, get_name_parts, word_tokens
 
-# ── Stop words ──────────────────────────────────────────────────────────────────
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
 
-STOP_WORDS = {
-    "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for",
-    "of", "with", "by", "from", "as", "is", "was", "are", "were", "be",
-    "been", "being", "have", "has", "had", "do", "does", "did", "will",
-    "would", "could", "should", "may", "might", "must", "shall", "can",
-    "not", "no", "nor", "so", "yet", "both", "either", "neither", "each",
-    "few", "more", "most", "other", "some", "such", "than", "too", "very",
-    "just", "this", "that", "these", "those", "it", "its", "their", "they",
-    "we", "you", "he", "she", "him", "her", "his", "our", "your", "my",
-    "any", "all", "one", "two", "new", "also", "when", "where", "how",
-    "what", "which", "who", "need", "update", "add", "use", "get", "set",
-    "null", "true", "false", "return", "if", "else", "then", "fix", "bug",
-    "change", "test", "run", "make", "into", "up", "out", "over",
-}
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
 
 
 # ── Keyword extraction ──────────────────────────────────────────────────────────
 
-def split_camel_case(text: str) -> list:
-    """Split camelCase and PascalCase into individual words."""
-    words = re.sub(r"([A-Z][a-z]+)", r" \1", text)
-    words = re.sub(r"([A-Z]+)(?=[A-Z][a-z])", r"\1 ", words)
-    return [w.lower() for w in words.split() if w]
-
-
-def split_snake_case(text: str) -> list:
-    """Split snake_case and kebab-case into words."""
-    return [w.lower() for w in re.split(r"[_\-\s]+", text) if w]
-
-
 def tokenize(text: str) -> list:
     """Extract all meaningful tokens from text."""
     if not text:
         return []
 
     tokens = set()
-    # Split on whitespace and punctuation first
-    raw_words = re.findall(r"[a-zA-Z][a-zA-Z0-9]*", text)
-
-    for word in raw_words:
-        lw = word.lower()
-        if len(lw) >= 3 and lw not in STOP_WORDS:
-            tokens.add(lw)
-            # Also add camelCase and snake_case splits
-            for part in split_camel_case(word):
-                if len(part) >= 3 and part not in STOP_WORDS:
-                    tokens.add(part)
+    for word in WORD_RE.findall(text):
+        tokens.update(word_tokens(word))
 
     return list(tokens)
 
@@ -106,19 +83,13 @@ def extract_keywords(requirement: dict) -> list:
 
 # ── Relevance scoring ───────────────────────────────────────────────────────────
 
-def get_name_parts(name: str) -> list:
-    """Get all meaningful parts of a code element name."""
-    parts = set()
-    parts.add(name.lower())
-    parts.update(split_camel_case(name))
-    parts.update(split_snake_case(name))
-    return [p for p in parts if len(p) >= 3]
-
-
 def score_element(element_name: str, keywords: list) -> float:
     """Score a code element name against keywords."""
-    name_lower = element_name.lower()
-    name_parts = get_name_parts(element_name)
+    return score_name(element_name.lower(), get_name_parts(element_name), keywords)
+
+
+def score_name(name_lower: str, name_parts: list, keywords: list) -> float:
+    """score_element for a name whose lowercase form and name parts are already known."""
     score = 0.0
 
     for kw in keywords:
@@ -137,33 +108,261 @@ def score_element(element_name: str, keywords: list) -> float:
     return score
 
 
-def score_file_content(file_path: str, content: str, keywords: list) -> float:
-    """Score file content by keyword frequency."""
-    content_lower = content.lower()
-    score = 0.0
-    for kw in keywords:
-        count = content_lower.count(kw.lower())
-        score += count * 0.5
-    return score
-
-
-def find_keyword_clusters(content: str, keywords: list, max_locations: int = 10) -> list:
-    """Find line ranges where keywords cluster, return top locations with snippets."""
+ELEMENT_TYPES = ("classes", "functions", "api_endpoints", "db_entities", "interfaces")
+
+
+class NameIndex:
+    """
+    Token and trigram lookups over the names in a step 1 code index.
+
+    Elements sharing a name are grouped, and each distinct name keeps its
+    lowercase form and name parts — the parts step 1 persisted as
+    element["name_parts"], recomputed only for reports that predate them.
+    `by_token` maps every lowercase name and name part to name ids;
+    `trigrams` maps each 3-character substring of a name or part to name ids.
+
+    score() gives the same totals as score_element over every element, but
+    only visits names that can match a keyword: exact and "name in keyword"
+    matches come from looking up the keyword's substrings in by_token,
+    "keyword in name" matches from the keyword's rarest trigram.
+    """
+
+    def __init__(self, code_index: dict):
+        self.names = []
+        self.lowers = []
+        self.parts = []
+        self.members = []
+        self.by_token = defaultdict(list)
+        self.trigrams = defaultdict(list)
+        self.longest = 0
+        ids = {}
+        seq = 0
+        for element_type in ELEMENT_TYPES:
+            for element in code_index.get(element_type, []):
+                seq += 1
+                name = element.get("name") or element.get("path", "")
+                if not name:
+                    continue
+                name_id = ids.get(name)
+                if name_id is None:
+                    name_id = ids[name] = self._add(name, element.get("name_parts"))
+                self.members[name_id].append((seq, element_type, element))
+
+    def _add(self, name: str, parts: list) -> int:
+        name_id = len(self.names)
+        lower = name.lower()
+        if not isinstance(parts, list):
+            parts = get_name_parts(name)
+        self.names.append(name)
+        self.lowers.append(lower)
+        self.parts.append(parts)
+        self.members.append([])
+        by_token, trigrams = self.by_token, self.trigrams
+        by_token[lower].append(name_id)
+        grams = {lower[i:i + 3] for i in range(len(lower) - 2)}
+        for part in parts:
+            if part != lower:
+                by_token[part].append(name_id)
+                if part not in lower:
+                    grams.update(part[i:i + 3] for i in range(len(part) - 2))
+        for gram in grams:
+            trigrams[gram].append(name_id)
+        self.longest = max(self.longest, len(lower), *map(len, parts))
+        return name_id
+
+    def candidates(self, keyword: str):
+        """Ids of the names score_name can credit for `keyword` (lowercase)."""
+        if len(keyword) < 3:
+            return range(len(self.names))
+        lowers, parts = self.lowers, self.parts
+        rarest = min((self.trigrams.get(keyword[i:i + 3], ()) for i in range(len(keyword) - 2)),
+                     key=len)
+        found = {i for i in rarest
+                 if keyword in lowers[i] or any(keyword in p for p in parts[i])}
+        by_token = self.by_token
+        for start in range(len(keyword)):
+            for end in range(start + 1, min(len(keyword), start + self.longest) + 1):
+                ids = by_token.get(keyword[start:end])
+                if ids:
+                    found.update(ids)
+        return found
+
+    def score(self, keywords: list) -> dict:
+        """{name id: score_element(name, keywords)} for every name scoring above 0."""
+        matched = defaultdict(list)
+        for kw in keywords:
+            for name_id in self.candidates(kw.lower()):
+                matched[name_id].append(kw)
+        scores = {}
+        for name_id, kws in matched.items():
+            score = score_name(self.lowers[name_id], self.parts[name_id], kws)
+            if score > 0:
+                scores[name_id] = score
+        return scores
+
+    def scored_elements(self, keywords: list) -> list:
+        """[(element type, element, score)] for matching elements, in code-index order."""
+        hits = []
+        for name_id, score in self.score(keywords).items():
+            for seq, element_type, element in self.members[name_id]:
+                hits.append((seq, element_type, element, score))
+        hits.sort(key=lambda hit: hit[0])
+        return [hit[1:] for hit in hits]
+
+
+def _trie_regex(words: list) -> str:
+    """
+    Regex finding, at every offset, the longest of `words` starting there.
+
+    Each match consumes only the first character (so overlapping keywords
+    are all seen) and captures the rest of the word in the group of that
+    first character; the alternation of literal first characters lets the
+    regex engine skip offsets that cannot start a keyword.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def walk(node: dict) -> str:
+        branches = [re.escape(ch) + walk(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ends here, so the longer continuations are optional
+        return f"(?:{body})?" if "" in node else body
+
+    return "|".join(f"{re.escape(ch)}(?=({walk(child)}))" for ch, child in sorted(trie.items()))
+
+
+# Keyword counts from which one automaton pass beats one str.count/str.find
+# per keyword (bench_analyze.py keyword-match); below them the C substring
+# search per keyword is faster than a pass of either automaton
+AUTOMATON_MIN_KEYWORDS = {"aho-corasick": 40, "trie regex": 150}
+
+
+class KeywordMatcher:
+    """
+    All keywords of one requirement compiled into one automaton, so a text is
+    scanned once however many keywords there are.
+
+    With pyahocorasick installed this is an Aho-Corasick automaton. Otherwise
+    the keywords become one trie-shaped regex (see _trie_regex): every offset
+    that can start a keyword follows a single trie path to the longest keyword
+    there, and the shorter keywords that are its prefixes come from a
+    precomputed table. Requirements with fewer keywords than
+    AUTOMATON_MIN_KEYWORDS for that backend search for each keyword with
+    str.find/str.count instead; `backend` names the one in use.
+    """
+
+    def __init__(self, keywords: list):
+        self.keywords = [kw for kw in dict.fromkeys(k.lower() for k in keywords)
+                         if kw and "\n" not in kw]
+        self._automaton = self._regex = None
+        automaton = "aho-corasick" if HAS_AHOCORASICK else "trie regex"
+        self.backend = automaton if len(self.keywords) >= AUTOMATON_MIN_KEYWORDS[automaton] \
+            else "per keyword"
+        if not self.keywords or self.backend == "per keyword":
+            return
+        if HAS_AHOCORASICK:
+            self._automaton = ahocorasick.Automaton()
+            for i, kw in enumerate(self.keywords):
+                self._automaton.add_word(kw, i)
+            self._automaton.make_automaton()
+        else:
+            self._regex = re.compile(_trie_regex(self.keywords))
+            ids = {kw: i for i, kw in enumerate(self.keywords)}
+            self._prefixes = {kw: [ids[kw[:n]] for n in range(1, len(kw) + 1) if kw[:n] in ids]
+                              for kw in self.keywords}
+
+    def hits(self, text: str):
+        """
+        Yield (offset, keyword index) for every occurrence in an already-lowercased
+        text; offsets ascend per keyword, not necessarily across keywords.
+        """
+        if self.backend == "per keyword":
+            find = text.find
+            for i, kw in enumerate(self.keywords):
+                pos = find(kw)
+                while pos != -1:
+                    yield pos, i
+                    pos = find(kw, pos + 1)
+        elif self._automaton is not None:
+            for end, i in self._automaton.iter(text):
+                yield end - len(self.keywords[i]) + 1, i
+        elif self._regex is not None:
+            prefixes = self._prefixes
+            for m in self._regex.finditer(text):
+                start = m.start()
+                for i in prefixes[m.group() + m.group(m.lastindex)]:
+                    yield start, i
+
+    def counts(self, text: str) -> list:
+        """Non-overlapping occurrences of each keyword, as str.count() would give them."""
+        if self.backend == "per keyword":
+            return [text.count(kw) for kw in self.keywords]
+        counts = [0] * len(self.keywords)
+        next_start = [0] * len(self.keywords)
+        lengths = [len(kw) for kw in self.keywords]
+        for start, i in self.hits(text):
+            if start >= next_start[i]:
+                counts[i] += 1
+                next_start[i] = start + lengths[i]
+        return counts
+
+
+def score_file_content(file_path: str, content: str, keywords: list,
+                       matcher: KeywordMatcher = None) -> float:
+    """Score file content by keyword frequency (pass `matcher` to reuse one across files)."""
+    if matcher is None:
+        matcher = KeywordMatcher(keywords)
+    return sum(matcher.counts(content.lower())) * 0.5
+
+
+# Bytes of each file read for substring content scoring
+CONTENT_MAX_BYTES = 100_000
+# Ranked files returned by score_files, and the cluster budget for each
+TOP_K_FILES = 30
+MAX_LOCATIONS = 10
+SNIPPET_CHARS = 500
+
+
+def find_keyword_clusters(content: str, keywords: list, max_locations: int = MAX_LOCATIONS,
+                          matcher: KeywordMatcher = None,
+                          snippet_chars: int = SNIPPET_CHARS) -> list:
+    """
+    Find line ranges where keywords cluster, return top locations with snippets.
+
+    Snippets are sliced straight from the content through its line-start
+    offsets (at most `snippet_chars` characters each); the content is never
+    split into lines.
+    """
     if not content or not keywords:
         return []
 
-    lines = content.split("\n")
+    from step_1_analyze import LineIndex
+
     keyword_hits = defaultdict(list)  # line_no -> [keyword]
 
-    kw_set = {kw.lower() for kw in keywords}
-    for i, line in enumerate(lines):
-        line_lower = line.lower()
-        for kw in kw_set:
-            if kw in line_lower:
-                keyword_hits[i].append(kw)
+    # One pass of the keyword automaton; hits map to lines through the offset
+    # table and each keyword is recorded once per line
+    if matcher is None:
+        matcher = KeywordMatcher(keywords)
+    content_lower = content.lower()
+    line_index = LineIndex(content)
+    hit_index = line_index if len(content_lower) == len(content) else LineIndex(content_lower)
+    for start, i in matcher.hits(content_lower):
+        line_hits = keyword_hits[hit_index.line_of(start) - 1]
+        kw = matcher.keywords[i]
+        if kw not in line_hits:
+            line_hits.append(kw)
 
     if not keyword_hits:
         return []
+    keyword_hits = dict(sorted(keyword_hits.items()))
+    n_lines = len(line_index)
 
     # Sort by number of hits
     sorted_hits = sorted(keyword_hits.items(), key=lambda x: -len(x[1]))
@@ -177,7 +376,7 @@ def find_keyword_clusters(content: str, keywords: list, max_locations: int = 10)
             continue
         # Expand context window ±5 lines
         start = max(0, line_no - 5)
-        end = min(len(lines) - 1, line_no + 5)
+        end = min(n_lines - 1, line_no + 5)
 
         # Merge with nearby used blocks
         for l in range(start, end + 1):
@@ -188,12 +387,13 @@ def find_keyword_clusters(content: str, keywords: list, max_locations: int = 10)
         for l in range(start, end + 1):
             range_kws.extend(keyword_hits.get(l, []))
 
-        snippet = "\n".join(lines[start:end + 1])
+        snippet_start = line_index.line_start(start + 1)
+        snippet_end = min(line_index.line_end(end + 1), snippet_start + snippet_chars)
         locations.append({
             "start_line": start + 1,
             "end_line": end + 1,
             "keywords_found": list(set(range_kws)),
-            "snippet": snippet[:500],
+            "snippet": content[snippet_start:snippet_end],
         })
 
         if len(locations) >= max_locations:
@@ -204,60 +404,195 @@ def find_keyword_clusters(content: str, keywords: list, max_locations: int = 10)
 
 # ── Main mapping ────────────────────────────────────────────────────────────────
 
-def score_files(analysis_report: dict, keywords: list, repo_path: Path) -> list:
-    """Score all indexed files and file content for relevance."""
+def score_token_postings(token_index, keywords: list) -> dict:
+    """
+    Content scores from step 1's inverted token index: 0.5 per occurrence of
+    each keyword as a token, summed per file. No file is read.
+    """
+    scores = defaultdict(float)
+    files = token_index.files
+    for kw in dict.fromkeys(kw.lower() for kw in keywords):
+        for file_id, tf, _ in token_index.postings_for(kw):
+            scores[files[file_id]] += tf * 0.5
+    return scores
+
+
+class CandidateCache:
+    """
+    Text of the `size` best-scoring whole files read so far, kept from the
+    content scoring pass so the top-ranked files are not read again for their
+    clusters.
+    On equal scores the file read first is kept, as in the final ranking.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._heap = []  # (score, -seq, rel): smallest is evicted first
+        self._text = {}
+        self._seq = 0
+
+    def offer(self, rel: str, score: float, text: str) -> None:
+        if self.size <= 0:
+            return
+        self._seq += 1
+        item = (score, -self._seq, rel)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            del self._text[heapq.heapreplace(self._heap, item)[2]]
+        else:
+            return
+        self._text[rel] = text
+
+    def get(self, rel: str) -> str:
+        return self._text.get(rel)
+
+
+# BM25 term-frequency saturation and document-length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+RANKERS = ("heuristic", "bm25")
+
+
+def bm25_idf(n_docs: int, df: int) -> float:
+    """BM25 inverse document frequency (the non-negative "+1" variant)."""
+    return math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+def score_bm25(token_index, keywords: list, k1: float = BM25_K1, b: float = BM25_B) -> dict:
+    """
+    Okapi BM25 content scores from the token index's postings, document
+    frequencies and document lengths: rare keywords weigh more, repeated hits
+    saturate and long files are normalised to the average length.
+
+    With NumPy the (file x keyword) weights of all postings are laid out as a
+    sparse matrix in coordinate form and multiplied by the IDF vector in one
+    pass (np.bincount); otherwise the same sums are accumulated in Python.
+    """
+    n_docs = len(token_index)
+    if not n_docs:
+        return {}
+    terms = [kw for kw in dict.fromkeys(kw.lower() for kw in keywords)
+             if token_index.document_frequency(kw)]
+    idf = [bm25_idf(n_docs, token_index.document_frequency(t)) for t in terms]
+    lengths = token_index.lengths
+    avgdl = (sum(lengths) / n_docs) or 1.0
+    files = token_index.files
+
+    if HAS_NUMPY:
+        postings = [token_index.postings_for(t) for t in terms]
+        n = sum(len(p) for p in postings)
+        if not n:
+            return {}
+        doc = np.fromiter((p[0] for ps in postings for p in ps), dtype=np.int64, count=n)
+        tf = np.fromiter((p[1] for ps in postings for p in ps), dtype=np.float64, count=n)
+        term = np.repeat(np.arange(len(terms)), [len(p) for p in postings])
+        doc_len = np.asarray(lengths, dtype=np.float64)[doc]
+        weights = tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avgdl))
+        scores = np.bincount(doc, weights=weights * np.asarray(idf)[term], minlength=n_docs)
+        return {files[i]: float(scores[i]) for i in np.flatnonzero(scores)}
+
+    scores = defaultdict(float)
+    for term_idf, t in zip(idf, terms):
+        for file_id, tf, _ in token_index.postings_for(t):
+            norm = k1 * (1 - b + b * lengths[file_id] / avgdl)
+            scores[files[file_id]] += term_idf * tf * (k1 + 1) / (tf + norm)
+    return dict(scores)
+
+
+def score_files(analysis_report: dict, keywords: list, repo_path: Path,
+                catalog=None, token_index=None, ranker: str = "heuristic",
+                top_k: int = TOP_K_FILES, max_locations: int = MAX_LOCATIONS,
+                snippet_chars: int = SNIPPET_CHARS) -> list:
+    """
+    Score all indexed files and file content for relevance.
+
+    Content scores come from the TokenIndex step 1 persisted (reloaded from
+    its sidecar when `token_index` is not given). Without one, content is
+    read from the step 1 FileCatalog (reloaded from its sidecar when
+    `catalog` is not given) and scored by substring counts, so the
+    repository is not walked again.
+
+    ranker="heuristic" adds 0.5 per keyword occurrence; ranker="bm25" adds
+    the file's BM25 score instead (building the token index from the
+    catalog if step 1 did not persist one). Code-element scores are the same
+    for both.
+
+    The `top_k` best files are selected with a bounded heap and each gets up
+    to `max_locations` keyword clusters with `snippet_chars`-character
+    snippets. Clusters always cover the whole file. When content is scored
+    by reading files, the best candidates' text is kept from that pass and
+    clustered without reading them again; only files larger than the
+    CONTENT_MAX_BYTES scoring read are read again, in full.
+    """
+    if ranker not in RANKERS:
+        raise ValueError(f"unknown ranker {ranker!r} (expected one of {', '.join(RANKERS)})")
     code_index = analysis_report.get("code_index", {})
     file_scores = defaultdict(float)
     file_matches = defaultdict(list)
 
     # Score code index elements
-    for element_type in ["classes", "functions", "api_endpoints", "db_entities", "interfaces"]:
-        for element in code_index.get(element_type, []):
-            fname = element.get("file", "")
-            name = element.get("name") or element.get("path", "")
-            if not name:
-                continue
-            score = score_element(name, keywords)
-            if score > 0:
-                file_scores[fname] += score
-                file_matches[fname].append({
-                    "type": element_type,
-                    "name": name,
-                    "score": score,
-                    "line": element.get("line"),
-                })
+    for element_type, element, score in NameIndex(code_index).scored_elements(keywords):
+        fname = element.get("file", "")
+        file_scores[fname] += score
+        file_matches[fname].append({
+            "type": element_type,
+            "name": element.get("name") or element.get("path", ""),
+            "score": score,
+            "line": element.get("line"),
+        })
 
     # Score file content
-    if repo_path.exists():
-        from step_1_analyze import walk_files, read_file_safe, SKIP_DIRS, to_posix_rel
-        for fp in walk_files(repo_path):
-            ext = fp.suffix.lower()
-            if ext in (".java", ".py", ".js", ".jsx", ".ts", ".tsx",
-                       ".xml", ".yml", ".yaml", ".json", ".properties"):
-                rel = to_posix_rel(fp, repo_path)
-                content = read_file_safe(fp, max_bytes=100_000)
+    matcher = KeywordMatcher(keywords)
+    cache = CandidateCache(top_k)
+    if token_index is None:
+        from step_1_analyze import load_report_token_index
+        token_index = load_report_token_index(analysis_report)
+    if catalog is None and repo_path.exists():
+        from step_1_analyze import load_report_catalog
+        catalog = load_report_catalog(analysis_report, repo_path)
+    if ranker == "bm25" and token_index is None and catalog is not None:
+        from step_1_analyze import TokenIndex
+        token_index = TokenIndex.build(catalog)
+    if token_index is not None:
+        score_content = score_bm25 if ranker == "bm25" else score_token_postings
+        for fname, content_score in score_content(token_index, keywords).items():
+            file_scores[fname] += content_score
+    elif catalog is not None:
+        for entry in catalog:
+            if entry.suffix in CONTENT_EXTENSIONS:
+                content = catalog.read(entry, max_bytes=CONTENT_MAX_BYTES)
                 if content:
-                    content_score = score_file_content(rel, content, keywords)
+                    content_score = score_file_content(entry.rel, content, keywords, matcher)
                     if content_score > 0:
-                        file_scores[rel] += content_score
+                        file_scores[entry.rel] += content_score
+                    # Only whole files: clusters always cover the full file
+                    if file_scores.get(entry.rel, 0) > 0 and 0 <= entry.size <= CONTENT_MAX_BYTES:
+                        cache.offer(entry.rel, file_scores[entry.rel], content)
 
-    # Rank by score
-    ranked = sorted(file_scores.items(), key=lambda x: -x[1])[:30]
+    # Rank by score: bounded top-K, same order as a full sort
+    ranked = heapq.nlargest(max(top_k, 0), file_scores.items(), key=lambda x: x[1])
 
     results = []
     for fname, total_score in ranked:
         # Get line clusters
         clusters = []
-        if repo_path.exists():
-            fp = repo_path / fname
-            if fp.exists():
-                content = ""
-                try:
-                    content = fp.read_text(encoding="utf-8", errors="replace")
-                except Exception:
-                    pass
-                if content:
-                    clusters = find_keyword_clusters(content, keywords)
+        content = cache.get(fname) or ""
+        if not content and max_locations > 0:
+            entry = catalog.find(fname) if catalog is not None else None
+            if entry is not None:
+                content = catalog.read(entry, max_bytes=None)
+            elif repo_path.exists():
+                fp = repo_path / fname
+                if fp.exists():
+                    try:
+                        content = fp.read_text(encoding="utf-8", errors="replace")
+                    except Exception:
+                        pass
+        if content and max_locations > 0:
+            clusters = find_keyword_clusters(content, keywords, max_locations, matcher,
+                                             snippet_chars)
 
         results.append({
             "file": fname,
@@ -267,18 +602,24 @@ def score_files(analysis_report: dict, keywords: list, repo_path: Path) -> list:
             "keyword_locations": clusters,
         })
 
+    if catalog is not None:
+        catalog.close()
     return results
 
 
 def generate_proposal(analysis_report: dict, requirement: dict,
-                       repo_path: Path, logs: list) -> dict:
+                       repo_path: Path, logs: list, ranker: str = "heuristic",
+                       top_k: int = TOP_K_FILES, max_locations: int = MAX_LOCATIONS,
+                       snippet_chars: int = SNIPPET_CHARS) -> dict:
     """Generate change proposal."""
     logs.append("Extracting keywords from Jira ticket...")
     keywords = extract_keywords(requirement)
     logs.append(f"Extracted {len(keywords)} keywords: {', '.join(keywords[:20])}...")
 
-    logs.append("Scoring files for relevance...")
-    scored_files = score_files(analysis_report, keywords, repo_path)
+    logs.append(f"Scoring files for relevance ({ranker} ranker)...")
+    scored_files = score_files(analysis_report, keywords, repo_path, ranker=ranker,
+                               top_k=top_k, max_locations=max_locations,
+                               snippet_chars=snippet_chars)
     logs.append(f"Scored {len(scored_files)} relevant files.")
 
     # Separate by type
@@ -325,6 +666,7 @@ def generate_proposal(analysis_report: dict, requirement: dict,
         "ticket_id": requirement.get("ticket_id"),
         "ticket_summary": requirement.get("summary"),
         "keywords_used": keywords,
+        "ranker": ranker,
         "files_to_modify": files_to_modify,
         "files_to_create": files_to_create,
         "files_to_delete": files_to_delete,
@@ -349,6 +691,15 @@ def main():
                         help="Path to requirement.json")
     parser.add_argument("--output", default="change_proposal.json",
                         help="Output JSON path")
+    parser.add_argument("--ranker", choices=RANKERS, default="heuristic",
+                        help="File content ranking: 0.5 per keyword hit (heuristic, default) "
+                             "or Okapi BM25 over the step 1 token index (bm25)")
+    parser.add_argument("--top-k", type=int, default=TOP_K_FILES,
+                        help=f"Ranked files to return (default {TOP_K_FILES})")
+    parser.add_argument("--max-locations", type=int, default=MAX_LOCATIONS,
+                        help=f"Keyword clusters per ranked file (default {MAX_LOCATIONS})")
+    parser.add_argument("--snippet-chars", type=int, default=SNIPPET_CHARS,
+                        help=f"Characters of code per cluster snippet (default {SNIPPET_CHARS})")
     args = parser.parse_args()
 
     # Load inputs
@@ -370,7 +721,8 @@ def main():
     repo_path = Path(analysis_report.get("repo_path", "."))
 
     logs = []
-    proposal = generate_proposal(analysis_report, requirement, repo_path, logs)
+    proposal = generate_proposal(analysis_report, requirement, repo_path, logs, args.ranker,
+                                 args.top_k, args.max_locations, args.snippet_chars)
     proposal["logs"] = logs
 
     output_path = Path(args.output)